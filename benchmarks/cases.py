@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book import slots
+from reservation_book.constants import SLOT_LABELS
+from reservation_book.models import (
+    Customer,
+    TableReservation,
+    TimeSlotAvailability,
+)
+from reservation_book.services.lifecycle import reservation_booked
+from reservation_book.services.sweeps import run_no_show_sweep
+from reservation_book.views.staff import CUSTOMER_OVERVIEW_SORTS
+
+# Hot paths timed by benchmarks/run.py.
+#
+# A case is a `run(ctx, state)` callable that is timed, plus an optional
+# untimed `setup(ctx)` that prepares per-iteration state (e.g. a booking
+# to cancel). View cases go through the full middleware stack with the
+# test Client, so session/auth queries are part of the numbers, as they
+# are in production.
+
+SLOTS = list(SLOT_LABELS)
+
+
+@dataclass
+class Context:
+    rng: random.Random
+    guest: Client
+    staff: Client
+    customer: Customer
+    search_terms: list[str]
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    run: Callable[[Context, Any], Any]
+    setup: Callable[[Context], Any] | None = None
+
+
+def make_context(rng: random.Random) -> Context:
+    User = get_user_model()
+    guest_user = User.objects.filter(username="bench-guest").first()
+    if guest_user is None:  # --keepdb reruns reuse the first run's users
+        guest_user = User.objects.create_user(
+            username="bench-guest", email="bench-guest@seed.example",
+            password="bench-pass-123")
+    customer, _ = Customer.objects.get_or_create(
+        email="bench-guest@seed.example",
+        defaults={"first_name": "Bench", "last_name": "Guest",
+                  "user": guest_user})
+    staff_user, _ = User.objects.get_or_create(
+        username="bench-staff",
+        defaults={"email": "bench-staff@seed.example", "is_staff": True})
+
+    guest = Client()
+    guest.force_login(guest_user)
+    staff = Client()
+    staff.force_login(staff_user)
+
+    sample = list(
+        Customer.objects.order_by("?")
+        .values_list("last_name", "email", "phone_e164")[:200]
+    )
+    terms = []
+    for last_name, email, phone in sample:
+        terms += [last_name[:4], (email or "")[:6], (phone or "")[-6:]]
+    return Context(rng=rng, guest=guest, staff=staff, customer=customer,
+                   search_terms=[t for t in terms if len(t) >= 2])
+
+
+def _open_slot(ctx, tables=1, duration=1, days=1):
+    """An upcoming (date, slot) with room for the booking (untimed)."""
+    today = timezone.localdate()
+    for _ in range(200):
+        day = today + timedelta(days=ctx.rng.randrange(1, 28))
+        start = ctx.rng.randrange(len(SLOTS) - duration + 1)
+        covered = SLOTS[start:start + duration]
+        rows = TimeSlotAvailability.objects.filter(
+            calendar_date__gte=day,
+            calendar_date__lt=day + timedelta(days=days),
+        )
+        if all(
+            row.left_for(key) >= tables for row in rows for key in covered
+        ):
+            return day, SLOTS[start]
+    raise RuntimeError("No open slot left; seed with lower --occupancy")
+
+
+def _booking_post(ctx, day, slot, **extra):
+    return {
+        "reservation_date": day.isoformat(),
+        "time_slot": slot,
+        "timeslot_availability": day.isoformat(),
+        "duration_hours": 1,
+        "number_of_tables_required_by_patron": 1,
+        "first_name": "Bench",
+        "last_name": "Guest",
+        "email": ctx.customer.email,
+        **extra,
+    }
+
+
+def _check(response, *codes):
+    if response.status_code not in codes:
+        raise RuntimeError(
+            f"Unexpected HTTP {response.status_code} from benchmark request")
+    return response
+
+
+# --- cases ---------------------------------------------------------------
+
+
+def build_next_30_days(ctx, state):
+    slots.build_next_30_days(days=30)
+
+
+def make_reservation_post(ctx, state):
+    day, slot = state
+    _check(ctx.guest.post(reverse("make_reservation"),
+                          _booking_post(ctx, day, slot)), 200, 302)
+
+
+def series_booking_post(ctx, state):
+    day, slot = state
+    _check(ctx.guest.post(
+        reverse("make_reservation"),
+        _booking_post(ctx, day, slot, duration_hours=2, series_days=5),
+    ), 200, 302)
+
+
+def _setup_cancellable(ctx):
+    day, slot = _open_slot(ctx)
+    reservation = TableReservation.objects.create(
+        customer=ctx.customer, timeslot_availability_id=day,
+        reservation_date=day, time_slot=slot,
+        number_of_tables_required_by_patron=1)
+    TimeSlotAvailability.objects.filter(calendar_date=day).update(**{
+        f"total_cust_demand_for_tables_{slot}":
+        F(f"total_cust_demand_for_tables_{slot}") + 1,
+    })
+    reservation_booked(reservation)
+    return reservation.pk
+
+
+def cancel_reservation(ctx, reservation_id):
+    _check(ctx.guest.post(
+        reverse("cancel_reservation", args=[reservation_id])), 200, 302)
+
+
+def ajax_lookup_customer(ctx, state):
+    _check(ctx.staff.get(
+        reverse("ajax_lookup_customer"),
+        {"q": ctx.rng.choice(ctx.search_terms)},
+        HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+    ), 200)
+
+
+def staff_reservations(ctx, state):
+    _check(ctx.staff.get(reverse("staff_reservations")), 200)
+
+
+# The view falls back to sorting by name for an unknown key, which would
+# silently stop measuring the aggregate sort
+OVERVIEW_SORT = "total"
+assert OVERVIEW_SORT in CUSTOMER_OVERVIEW_SORTS, OVERVIEW_SORT
+
+
+def user_reservations_overview(ctx, state):
+    params = ctx.rng.choice((
+        {},
+        {"sort": OVERVIEW_SORT, "dir": "desc"},
+        {"q": ctx.rng.choice(ctx.search_terms)},
+    ))
+    _check(ctx.staff.get(reverse("user_reservations_overview"), params), 200)
+
+
+def _setup_sweep(ctx, rows=50):
+    """Yesterday's service left `rows` reservations unresolved."""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    ids = list(Customer.objects.values_list("pk", flat=True)[:rows])
+    TableReservation.objects.bulk_create([
+        TableReservation(
+            customer_id=ids[i % len(ids)],
+            timeslot_availability_id=yesterday,
+            reservation_date=yesterday,
+            time_slot=SLOTS[i % len(SLOTS)],
+            number_of_tables_required_by_patron=1,
+        )
+        for i in range(rows)
+    ])
+
+
+def no_show_sweep(ctx, state):
+    run_no_show_sweep()
+
+
+CASES = [
+    Case("build_next_30_days", build_next_30_days),
+    Case("make_reservation_post", make_reservation_post,
+         setup=_open_slot),
+    Case("series_booking_post", series_booking_post,
+         setup=lambda ctx: _open_slot(ctx, duration=2, days=5)),
+    Case("cancel_reservation", cancel_reservation,
+         setup=_setup_cancellable),
+    Case("ajax_lookup_customer", ajax_lookup_customer),
+    Case("staff_reservations", staff_reservations),
+    Case("user_reservations_overview", user_reservations_overview),
+    Case("run_no_show_sweep", no_show_sweep, setup=_setup_sweep),
+]
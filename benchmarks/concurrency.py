@@ -0,0 +1,255 @@
+"""
+Throughput of the lookup/availability views, sync vs async, by concurrency.
+
+    python manage.py migrate
+    python manage.py seed_load --customers 2000 --force   # throwaway DB
+    python manage.py collectstatic --noinput
+    python -m benchmarks.concurrency
+    python -m benchmarks.concurrency --workers 4 --concurrency 1 \\
+        --concurrency 64 --duration 30 -o head.json --baseline main.json
+
+For each deployment the benchmark starts gunicorn on --port against the
+database in the caller's environment (DATABASE_URL), waits until it
+answers, logs in one staff user and runs a closed loop of --concurrency
+client threads per endpoint for --duration seconds each:
+
+    sync         gunicorn gambinos.wsgi -w N     (the Procfile deployment:
+                                                 sync views, one request
+                                                 per worker at a time)
+    wsgi-async   the same with ASYNC_VIEWS=True  (async views, each request
+                                                 behind async_to_sync)
+    async        gunicorn gambinos.asgi:application -w N
+                 -k uvicorn.workers.UvicornWorker (async views)
+
+    lookup         ajax_lookup_customer, typed prefixes of seeded names
+                   (served from the worker's customer index)
+    lookup_db      ajax_lookup_customer?mode=existing (one ORM query)
+    availability   the availability feed (cached grid, one query on a
+                   miss)
+
+Each client thread has its own session with the staff cookies, so the
+server sees --concurrency open connections. Requests that fail or answer
+5xx count as errors; a sync deployment at high concurrency shows up as
+queueing (p95) rather than errors.
+
+Results are JSON: requests, errors, rps and latency percentiles per
+"deployment/endpoint/cN", plus each point's rps relative to the sync
+deployment's ("vs_sync_rps"; above 1 is faster). With --baseline the run
+exits non-zero if any point's p95 grew by more than --max-regression.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from benchmarks.loadgen import (
+    Agent,
+    Recorder,
+    prepare_users,
+    reverse,
+    summarize,
+)
+from benchmarks.run import _git_commit, _setup_django, compare
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# name -> (gunicorn arguments, environment)
+DEPLOYMENTS = {
+    "sync": (["gambinos.wsgi"], {"ASYNC_VIEWS": "False"}),
+    "wsgi-async": (["gambinos.wsgi"], {"ASYNC_VIEWS": "True"}),
+    "async": (["gambinos.asgi:application",
+               "-k", "uvicorn.workers.UvicornWorker"],
+              {"ASYNC_VIEWS": "True"}),
+}
+ENDPOINTS = ("lookup", "lookup_db", "availability")
+STAFF_USER = "load-staff-0"
+START_TIMEOUT = 60
+
+
+def start_server(deployment, port, workers):
+    """gunicorn running `deployment`; returns (process, log file)."""
+    log = tempfile.TemporaryFile(mode="w+")
+    command, deployment_env = DEPLOYMENTS[deployment]
+    env = {**os.environ, **deployment_env}
+    env.setdefault("DJANGO_SETTINGS_MODULE", "gambinos.settings")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", *command,
+         "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}{reverse('availability')}"
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            if requests.get(url, timeout=5).ok:
+                return proc, log
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_server(proc)
+    log.seek(0)
+    raise RuntimeError(f"{deployment} server did not start:\n"
+                       + log.read()[-2000:])
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def _terms():
+    from reservation_book.services.seeding import FIRST_NAMES, LAST_NAMES
+
+    return [name[:end] for name in FIRST_NAMES + LAST_NAMES
+            for end in range(2, len(name) + 1)]
+
+
+def _hit(agent, endpoint, rng, terms):
+    if endpoint == "availability":
+        agent.request("GET", reverse("availability"), name=endpoint)
+        return
+    params = {"q": rng.choice(terms)}
+    if endpoint == "lookup_db":
+        params["mode"] = "existing"
+    agent.request("GET", reverse("ajax_lookup_customer"), name=endpoint,
+                  params=params,
+                  headers={"X-Requested-With": "XMLHttpRequest"})
+
+
+def run_point(base_url, cookies, endpoint, concurrency, duration, seed,
+              terms):
+    """Closed loop: `concurrency` threads, each with its own connection."""
+    recorder = Recorder()
+    agents = []
+    for _ in range(concurrency):
+        agent = Agent(base_url, STAFF_USER, "", True, recorder)
+        agent.session.cookies.update(cookies)
+        agents.append(agent)
+
+    def loop(agent, rng, deadline):
+        while time.monotonic() < deadline:
+            _hit(agent, endpoint, rng, terms)
+
+    start = time.monotonic()
+    threads = [
+        threading.Thread(target=loop, args=(
+            agent, random.Random(seed + i), start + duration))
+        for i, agent in enumerate(agents)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seconds = time.monotonic() - start
+    for agent in agents:
+        agent.session.close()
+    total, _urls = summarize(recorder.samples, seconds)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--deployment", action="append", default=[],
+                        choices=sorted(DEPLOYMENTS),
+                        help="Only run this deployment (repeatable).")
+    parser.add_argument("--endpoint", action="append", default=[],
+                        choices=ENDPOINTS,
+                        help="Only run this endpoint (repeatable).")
+    parser.add_argument("--concurrency", type=int, action="append",
+                        default=[],
+                        help="Client threads (repeatable; default 1 16 64).")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="gunicorn worker processes (default 2).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--duration", type=float, default=15,
+                        help="Seconds per endpoint and concurrency.")
+    parser.add_argument("--password", default="load-pass-123")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="Write JSON results here.")
+    parser.add_argument("--baseline", help="Earlier results to compare.")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95 growth vs baseline (0.25 = 25%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="Ignore p95 changes smaller than this.")
+    args = parser.parse_args(argv)
+
+    deployments = args.deployment or list(DEPLOYMENTS)
+    endpoints = args.endpoint or list(ENDPOINTS)
+    levels = args.concurrency or [1, 16, 64]
+
+    _setup_django()
+    prepare_users(0, 1, args.password)
+    terms = _terms()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "args": vars(args),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": {},
+        "vs_sync_rps": {},
+    }
+    for deployment in deployments:
+        proc, log = start_server(deployment, args.port, args.workers)
+        try:
+            staff = Agent(base_url, STAFF_USER, args.password, True,
+                          Recorder())
+            staff.login()
+            for endpoint in endpoints:
+                for concurrency in levels:
+                    name = f"{deployment}/{endpoint}/c{concurrency}"
+                    row = run_point(base_url, staff.session.cookies,
+                                    endpoint, concurrency, args.duration,
+                                    args.seed, terms)
+                    results["results"][name] = row
+                    print(f"{name:28} {row['requests']:7d} req "
+                          f"{row['rps']:8.1f}/s p50 {row['p50_ms']:7.1f} "
+                          f"p95 {row['p95_ms']:7.1f} ms "
+                          f"errors {row['errors']}", file=sys.stderr)
+        finally:
+            stop_server(proc)
+            log.close()
+
+    for name, row in results["results"].items():
+        deployment, point = name.split("/", 1)
+        sync = results["results"].get(f"sync/{point}")
+        if deployment != "sync" and sync and sync["rps"]:
+            results["vs_sync_rps"][name] = round(row["rps"] / sync["rps"], 2)
+
+    text = json.dumps(results, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        problems = compare(results, baseline, args.max_regression,
+                           args.min_delta_ms, section="results")
+        for line in problems:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+"""
+Race many guests for the last tables of a Saturday slot.
+
+    python -m benchmarks.contention                        # SQLite (WAL)
+    DATABASE_URL=postgres://localhost/gambinos \\
+        python -m benchmarks.contention --guests 100 --rounds 5
+
+Each round sets up one upcoming Saturday with only --tables-left tables
+free in the 19:00 slot, then releases --guests processes at once. Each
+process is one guest posting to make_reservation (or, for --phone-share
+of them, a staff member posting to create_phone_reservation) through the
+full middleware stack, with its own database connection. Processes are
+forked after setup, so the requests are not serialised by the GIL
+(rendering the booking pages is CPU-bound).
+
+A booking that hits a lock error (SQLite "database is locked", Postgres
+deadlock/serialization failures) is retried with jittered backoff up to
+--retries times, as a user pressing submit again would.
+
+Reported per round and in total: bookings/sec, request latency, time
+spent in locking statements (SELECT ... FOR UPDATE and writes, which is
+where lock waits show up), retries, sold-out answers and failures.
+
+Afterwards every availability row is checked: demand never above
+capacity, and demand equal to the tables of the ACTIVE reservations
+covering each slot. The exit status is 1 if either check fails.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+
+from benchmarks.run import _git_commit, _percentile, _setup_django
+
+RACE_SLOT = "19_20"
+BARRIER_TIMEOUT = 60
+
+LOCK_ERRORS = (
+    "database is locked",
+    "database table is locked",
+    "deadlock detected",
+    "could not serialize",
+    "lock timeout",
+    "could not obtain lock",
+)
+
+
+@dataclass
+class Outcome:
+    result: str = ""  # booked | sold_out | failed
+    retries: int = 0
+    seconds: float = 0.0
+    lock_wait: float = 0.0
+    tables: int = 0
+    error: str = ""
+
+
+@dataclass
+class Guest:
+    index: int
+    phone: bool
+    tables: int
+    duration: int
+    client: object = None
+    outcome: Outcome = field(default_factory=Outcome)
+
+
+class LockTimer:
+    """
+    connection.execute_wrapper() hook: time spent in statements that take
+    locks, and the last database error (the booking views swallow them).
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.error = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except Exception as exc:
+            self.error = exc
+            raise
+        finally:
+            head = sql.lstrip()[:6].upper()
+            if head in ("INSERT", "UPDATE", "DELETE") or "FOR UPDATE" in sql:
+                self.seconds += time.perf_counter() - start
+
+
+def is_lock_error(exc) -> bool:
+    from django.db import OperationalError
+
+    return (isinstance(exc, OperationalError)
+            and any(text in str(exc).lower() for text in LOCK_ERRORS))
+
+
+def _post_data(guest, day):
+    who = "phone" if guest.phone else "guest"
+    return {
+        "reservation_date": day.isoformat(),
+        "timeslot_availability": day.isoformat(),
+        "time_slot": RACE_SLOT,
+        "duration_hours": guest.duration,
+        "number_of_tables_required_by_patron": guest.tables,
+        "first_name": "Race",
+        "last_name": f"Guest{guest.index}",
+        "email": f"race-{who}-{guest.index}@seed.example",
+    }
+
+
+def _attempt(guest, url, data, timer):
+    """One POST -> (result, error)."""
+    timer.error = None
+    try:
+        response = guest.client.post(url, data)
+    except Exception as exc:  # the phone view lets some DB errors escape
+        return ("retry" if is_lock_error(exc) else "failed"), exc
+    if response.status_code == 302:
+        return "booked", None
+    if timer.error is not None and is_lock_error(timer.error):
+        return "retry", timer.error
+    if b"Not enough tables" in response.content:
+        return "sold_out", None
+    return "failed", timer.error or f"HTTP {response.status_code}"
+
+
+def _run_guest(guest, day, barrier, results, retries, rng_seed):
+    """Body of one guest process; puts (index, Outcome) on `results`."""
+    from django.db import connection, connections
+    from django.urls import reverse
+
+    rng = random.Random(rng_seed)
+    url = reverse("create_phone_reservation" if guest.phone
+                  else "make_reservation")
+    data = _post_data(guest, day)
+    outcome = guest.outcome
+    timer = LockTimer()
+    try:
+        with connection.execute_wrapper(timer):
+            barrier.wait(timeout=BARRIER_TIMEOUT)
+            start = time.perf_counter()
+            while True:
+                result, error = _attempt(guest, url, data, timer)
+                if result == "retry" and outcome.retries < retries:
+                    outcome.retries += 1
+                    time.sleep(rng.uniform(0, 0.01 * 2 ** outcome.retries))
+                    continue
+                outcome.result = "failed" if result == "retry" else result
+                if error is not None and outcome.result == "failed":
+                    outcome.error = str(error)[:200]
+                break
+            outcome.seconds = time.perf_counter() - start
+    except Exception as exc:
+        outcome.result, outcome.error = "failed", repr(exc)[:200]
+    finally:
+        outcome.lock_wait = timer.seconds
+        if outcome.result == "booked":
+            outcome.tables = guest.tables
+        connections.close_all()
+        results.put((guest.index, outcome))
+
+
+def _prepare_day(day, capacity, tables_left, filler):
+    """Availability for `day`, sold out in RACE_SLOT but `tables_left`."""
+    from reservation_book.constants import SLOT_LABELS
+    from reservation_book.models import TableReservation, TimeSlotAvailability
+
+    taken = capacity - tables_left
+    row = TimeSlotAvailability(calendar_date=day)
+    for key in SLOT_LABELS:
+        setattr(row, f"number_of_tables_available_{key}", capacity)
+        setattr(row, f"total_cust_demand_for_tables_{key}",
+                taken if key == RACE_SLOT else 0)
+    row.save()
+    TableReservation.objects.bulk_create([
+        TableReservation(
+            customer=filler, timeslot_availability=row,
+            reservation_date=day, time_slot=RACE_SLOT,
+            number_of_tables_required_by_patron=1,
+            status=TableReservation.STATUS_ACTIVE, reservation_status=True,
+        )
+        for _ in range(taken)
+    ])
+
+
+def _clients(guests):
+    """Logged-in test clients, made before the race (untimed)."""
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    User = get_user_model()
+    staff, _ = User.objects.get_or_create(
+        username="race-staff",
+        defaults={"email": "race-staff@seed.example", "is_staff": True})
+    for guest in guests:
+        if guest.phone:
+            user = staff
+        else:
+            email = f"race-guest-{guest.index}@seed.example"
+            user, _ = User.objects.get_or_create(
+                username=email, defaults={"email": email})
+        guest.client = Client()
+        guest.client.force_login(user)
+
+
+def race(day, args, rng):
+    """
+    One round: a forked process per guest, released together by a
+    barrier. Returns the guests (with outcomes) and the wall time.
+    """
+    from django.db import connections
+
+    guests = [
+        Guest(index=i, phone=rng.random() < args.phone_share,
+              tables=rng.choice((1, 1, 2)), duration=rng.choice((1, 1, 2)))
+        for i in range(args.guests)
+    ]
+    _clients(guests)
+    # children must open their own connections, never share the parent's
+    connections.close_all()
+
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(len(guests) + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=_run_guest,
+            args=(g, day, barrier, results, args.retries,
+                  rng.randrange(2**32)))
+        for g in guests
+    ]
+    for p in processes:
+        p.start()
+    barrier.wait(timeout=BARRIER_TIMEOUT)
+    start = time.perf_counter()
+    for _ in guests:
+        index, outcome = results.get()
+        guests[index].outcome = outcome
+    seconds = time.perf_counter() - start
+    for p in processes:
+        p.join()
+    return guests, seconds
+
+
+def summarize(outcomes, wall_seconds):
+    booked = [o for o in outcomes if o.result == "booked"]
+    latencies = [o.seconds * 1000 for o in outcomes]
+    lock_waits = [o.lock_wait * 1000 for o in outcomes]
+    return {
+        "requests": len(outcomes),
+        "booked": len(booked),
+        "tables_booked": sum(o.tables for o in booked),
+        "sold_out": sum(o.result == "sold_out" for o in outcomes),
+        "failed": sum(o.result == "failed" for o in outcomes),
+        "retries": sum(o.retries for o in outcomes),
+        "wall_s": round(wall_seconds, 3),
+        "bookings_per_s": round(len(booked) / wall_seconds, 1)
+        if wall_seconds else 0.0,
+        "latency_p50_ms": round(_percentile(latencies, 50), 1),
+        "latency_p95_ms": round(_percentile(latencies, 95), 1),
+        "lock_wait_total_ms": round(sum(lock_waits), 1),
+        "lock_wait_p95_ms": round(_percentile(lock_waits, 95), 1),
+    }
+
+
+def demand_problems() -> list[str]:
+    """
+    Availability rows whose demand is over capacity or does not match
+    the ACTIVE reservations covering each slot.
+    """
+    from reservation_book.constants import SLOT_LABELS
+    from reservation_book.models import TableReservation, TimeSlotAvailability
+
+    slots = list(SLOT_LABELS)
+    booked = {}
+    for day, slot, duration, tables in (
+        TableReservation.objects
+        .filter(status=TableReservation.STATUS_ACTIVE)
+        .values_list("reservation_date", "time_slot", "duration_hours",
+                     "number_of_tables_required_by_patron")
+        .iterator()
+    ):
+        start = slots.index(slot)
+        for key in slots[start:start + (duration or 1)]:
+            booked[day, key] = booked.get((day, key), 0) + tables
+
+    problems = []
+    for row in TimeSlotAvailability.objects.order_by("calendar_date"):
+        for key in slots:
+            demand = row.demand_for(key)
+            capacity = row.available_for(key)
+            actual = booked.get((row.calendar_date, key), 0)
+            if demand > capacity:
+                problems.append(f"{row.calendar_date} {key}: demand "
+                                f"{demand} over capacity {capacity}")
+            if demand != actual:
+                problems.append(f"{row.calendar_date} {key}: demand "
+                                f"{demand} but {actual} tables booked")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--guests", type=int, default=50,
+                        help="Concurrent guests per round (default 50).")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="Races, one Saturday each (default 3).")
+    parser.add_argument("--capacity", type=int, default=20,
+                        help="Tables per slot (default 20).")
+    parser.add_argument("--tables-left", type=int, default=8,
+                        help="Free tables in the raced slot (default 8).")
+    parser.add_argument("--phone-share", type=float, default=0.3,
+                        help="Share of staff phone bookings (default 0.3).")
+    parser.add_argument("--retries", type=int, default=5,
+                        help="Retries after a lock error (default 5).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="Write JSON results here.")
+    args = parser.parse_args(argv)
+    if not 0 < args.tables_left <= args.capacity:
+        parser.error("--tables-left must be between 1 and --capacity")
+
+    _setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+    from django.utils import timezone
+
+    from reservation_book.models import Customer
+
+    setup_test_environment()
+    override_settings(STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage."
+                                   "StaticFilesStorage"},
+    }).enable()
+    db = settings.DATABASES["default"]
+    sqlite = db["ENGINE"] == "django.db.backends.sqlite3"
+    if sqlite:
+        # threads need a shared file database, not the in-memory default
+        db.setdefault("TEST", {})["NAME"] = str(
+            Path(tempfile.gettempdir()) / "gambinos-contention.sqlite3")
+    old_name = db["NAME"]
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False)
+
+    try:
+        if sqlite:
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode=WAL")
+        rng = random.Random(args.seed)
+        filler = Customer.objects.create(
+            first_name="Walk", last_name="In",
+            email="race-filler@seed.example")
+        today = timezone.localdate()
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7 or 7)
+
+        rounds = []
+        outcomes = []
+        wall = 0.0
+        for n in range(args.rounds):
+            day = saturday + timedelta(weeks=n)
+            _prepare_day(day, args.capacity, args.tables_left, filler)
+            guests, seconds = race(day, args, rng)
+            round_outcomes = [g.outcome for g in guests]
+            rounds.append({"day": day.isoformat(),
+                           **summarize(round_outcomes, seconds)})
+            outcomes += round_outcomes
+            wall += seconds
+            print(f"round {n + 1} {day}: {rounds[-1]}", file=sys.stderr)
+
+        problems = demand_problems()
+        errors = sorted({o.error for o in outcomes if o.error})
+        results = {
+            "meta": {
+                "commit": _git_commit(),
+                "database": connection.vendor,
+                "args": vars(args),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "total": summarize(outcomes, wall),
+            "rounds": rounds,
+            "errors": errors[:20],
+            "problems": problems,
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    text = json.dumps(results, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    for line in problems:
+        print(f"INCONSISTENT {line}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,480 @@
+"""
+Replay guest and staff traffic against a running server.
+
+    python manage.py runserver --noreload &          # or gunicorn -w 4 ...
+    python -m benchmarks.loadgen --prepare --customers 40 --staff 4
+    python -m benchmarks.loadgen --duration 120 -o head.json \\
+        --baseline main.json
+    python -m benchmarks.loadgen --access-log access.log --speed 4
+
+Scripted mode logs in --customers guests and --staff staff members
+through the allauth login form, then runs one thread per user for
+--duration seconds, each picking actions from a weighted mix (GUEST_MIX,
+STAFF_MIX) with --think seconds of exponential think time in between:
+availability grids, bookings, edits and cancels of the guest's own
+bookings, staff lists and the floor view, and customer typeahead (one
+ajax_lookup_customer request per keystroke).
+
+Replay mode reads GET requests from a gunicorn/nginx access log
+(common or combined format) and re-issues them on the original
+schedule, compressed by --speed. Staff and ajax paths go out on staff
+sessions, everything else on guest sessions. Other methods are skipped:
+logs do not carry request bodies.
+
+--prepare creates the load users (password --password) directly in the
+database the server uses, so run it with the server's settings. allauth
+allows 30 logins a minute per IP; the login phase backs off on 429.
+
+Output is JSON: throughput, latency percentiles and the server-reported
+DB time (Server-Timing, see RequestMetricsMiddleware; guests only get it
+with REQUEST_METRICS_SERVER_TIMING=True on the server) per URL name and in
+total. With --baseline the run exits non-zero if any URL's p95 grew by
+more than --max-regression.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import requests
+
+from benchmarks.run import _git_commit, _percentile, _setup_django, compare
+
+# (action, weight): relative frequency per user type
+GUEST_MIX = (
+    ("grid", 30),
+    ("my_reservations", 15),
+    ("book", 6),
+    ("edit", 3),
+    ("cancel", 3),
+)
+STAFF_MIX = (
+    ("dashboard", 10),
+    ("reservations", 15),
+    ("floor_poll", 25),
+    ("typeahead", 20),
+    ("customers", 8),
+    ("phone_grid", 5),
+)
+
+LOG_LINE = re.compile(
+    r'\[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" '
+    r'(?P<status>\d{3})'
+)
+STAFF_PATHS = ("/staff/", "/ajax/")
+RESERVATION_LINK = re.compile(r"/reservation/(\d+)/cancel/")
+LOGIN_RETRY_SECONDS = 10
+
+
+@dataclass
+class Sample:
+    name: str
+    status: int
+    seconds: float
+    db_ms: float | None = None
+
+
+@dataclass
+class Recorder:
+    """Collects samples from every thread."""
+    samples: list[Sample] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, sample):
+        with self.lock:
+            self.samples.append(sample)
+
+
+def reverse(name, args=None):
+    from django.urls import reverse as django_reverse
+
+    return django_reverse(name, args=args)
+
+
+def url_name(path) -> str:
+    from django.conf import settings
+    from django.urls import Resolver404, resolve
+
+    if settings.STATIC_URL and path.startswith(settings.STATIC_URL):
+        return "static"
+    try:
+        return resolve(path.split("?", 1)[0]).view_name or path
+    except Resolver404:
+        return "unresolved"
+
+
+def _server_db_ms(response):
+    match = re.search(r"db;dur=([\d.]+)", response.headers.get(
+        "Server-Timing", ""))
+    return float(match.group(1)) if match else None
+
+
+class Agent:
+    """One logged-in browser: a requests.Session plus what it has seen."""
+
+    def __init__(self, base_url, username, password, staff, recorder):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.staff = staff
+        self.recorder = recorder
+        self.session = requests.Session()
+        self.reservation_ids: list[int] = []
+        self.floor_cursor = ""
+
+    def request(self, method, path, name=None, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if method != "GET":
+            headers["X-CSRFToken"] = self.session.cookies.get(
+                "csrftoken", "")
+            headers["Referer"] = self.base_url + path
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, headers=headers,
+                allow_redirects=False, timeout=60, **kwargs)
+        except requests.RequestException:
+            self.recorder.add(Sample(name or url_name(path), 0,
+                                     time.perf_counter() - start))
+            return None
+        self.recorder.add(Sample(
+            name or url_name(path), response.status_code,
+            time.perf_counter() - start, _server_db_ms(response)))
+        return response
+
+    def login(self):
+        path = reverse("account_login")
+        while True:
+            self.session.get(self.base_url + path, timeout=60)
+            response = self.request("POST", path, data={
+                "login": self.username, "password": self.password})
+            if response is not None and response.status_code == 429:
+                time.sleep(LOGIN_RETRY_SECONDS)
+                continue
+            if response is None or response.status_code != 302:
+                raise RuntimeError(f"login failed for {self.username}")
+            return
+
+
+def _random_booking(rng):
+    from reservation_book.constants import SLOT_LABELS
+
+    day = datetime.now().date() + timedelta(days=rng.randrange(1, 28))
+    return {
+        "reservation_date": day.isoformat(),
+        "timeslot_availability": day.isoformat(),
+        "time_slot": rng.choice(list(SLOT_LABELS)),
+        "duration_hours": rng.choice((1, 1, 2)),
+        "number_of_tables_required_by_patron": rng.choice((1, 1, 2)),
+    }
+
+
+# --- actions -------------------------------------------------------------
+
+
+def grid(agent, rng):
+    agent.request("GET", reverse("make_reservation"))
+
+
+def my_reservations(agent, rng):
+    response = agent.request("GET", reverse("my_reservations"))
+    if response is not None and response.ok:
+        agent.reservation_ids = [
+            int(pk) for pk in RESERVATION_LINK.findall(response.text)]
+
+
+def book(agent, rng):
+    agent.request("POST", reverse("make_reservation"), data={
+        **_random_booking(rng),
+        "first_name": "Load",
+        "last_name": agent.username,
+        "email": f"{agent.username}@seed.example",
+    })
+
+
+def edit(agent, rng):
+    if not agent.reservation_ids:
+        return my_reservations(agent, rng)
+    path = reverse("update_reservation",
+                   args=[rng.choice(agent.reservation_ids)])
+    agent.request("GET", path)
+    agent.request("POST", path, data={
+        "duration_hours": 1,
+        "number_of_tables_required_by_patron": rng.choice((1, 2)),
+    })
+
+
+def cancel(agent, rng):
+    if not agent.reservation_ids:
+        return my_reservations(agent, rng)
+    pk = agent.reservation_ids.pop(rng.randrange(len(agent.reservation_ids)))
+    agent.request("POST", reverse("cancel_reservation", args=[pk]))
+
+
+def dashboard(agent, rng):
+    agent.request("GET", reverse("staff_dashboard"))
+
+
+def reservations(agent, rng):
+    agent.request("GET", reverse("staff_reservations"))
+
+
+def floor_poll(agent, rng):
+    response = agent.request(
+        "GET", reverse("staff_floor_changes"),
+        params={"since": agent.floor_cursor} if agent.floor_cursor else {},
+        headers={"X-Requested-With": "XMLHttpRequest"})
+    if response is not None and response.ok:
+        agent.floor_cursor = response.json().get("cursor", "")
+
+
+def typeahead(agent, rng):
+    """A staff member typing a surname: one lookup per keystroke."""
+    from reservation_book.services.seeding import FIRST_NAMES, LAST_NAMES
+
+    term = rng.choice(LAST_NAMES + FIRST_NAMES)
+    for end in range(2, len(term) + 1):
+        agent.request("GET", reverse("ajax_lookup_customer"),
+                      params={"q": term[:end]},
+                      headers={"X-Requested-With": "XMLHttpRequest"})
+        time.sleep(rng.uniform(0.05, 0.2))
+
+
+def customers(agent, rng):
+    agent.request("GET", reverse("user_reservations_overview"),
+                  params=rng.choice(({}, {"sort": "total", "dir": "desc"})))
+
+
+def phone_grid(agent, rng):
+    agent.request("GET", reverse("create_phone_reservation"))
+
+
+ACTIONS = {
+    f.__name__: f for f in (
+        grid, my_reservations, book, edit, cancel, dashboard, reservations,
+        floor_poll, typeahead, customers, phone_grid,
+    )
+}
+
+
+def _run_scripted(agent, mix, deadline, think, rng):
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    while time.monotonic() < deadline:
+        ACTIONS[rng.choices(names, weights)[0]](agent, rng)
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+
+def read_access_log(path):
+    """(seconds since first line, path) for every GET in the log."""
+    entries = []
+    skipped = 0
+    first = None
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            match = LOG_LINE.search(line)
+            if not match or match["method"] != "GET":
+                skipped += 1
+                continue
+            when = datetime.strptime(match["time"], "%d/%b/%Y:%H:%M:%S %z")
+            first = first or when
+            entries.append(((when - first).total_seconds(), match["path"]))
+    return entries, skipped
+
+
+def _replay(entries, agents, speed, concurrency):
+    """Issue the logged requests on their (compressed) schedule."""
+    pools = {
+        staff: queue.Queue() for staff in (True, False)
+    }
+    for agent in agents:
+        pools[agent.staff].put(agent)
+    if pools[True].empty() or pools[False].empty():
+        raise SystemExit("replay needs at least one guest and one staff")
+
+    work = queue.Queue(maxsize=concurrency * 4)
+
+    def worker():
+        while (item := work.get()) is not None:
+            pool = pools[item.startswith(STAFF_PATHS)]
+            agent = pool.get()
+            try:
+                agent.request("GET", item, headers={
+                    "X-Requested-With": "XMLHttpRequest"}
+                    if item.startswith("/ajax/") else {})
+            finally:
+                pool.put(agent)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    start = time.monotonic()
+    for offset, path in entries:
+        delay = start + offset / speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        work.put(path)
+    for _ in threads:
+        work.put(None)
+    for t in threads:
+        t.join()
+
+
+def prepare_users(customers, staff, password):
+    """Create (or reset) the load users in the server's database."""
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    wanted = [(f"load-guest-{i}", False) for i in range(customers)]
+    wanted += [(f"load-staff-{i}", True) for i in range(staff)]
+    for username, is_staff in wanted:
+        user, _ = User.objects.get_or_create(
+            username=username,
+            defaults={"email": f"{username}@seed.example",
+                      "is_staff": is_staff},
+        )
+        user.set_password(password)
+        user.save(update_fields=["password"])
+
+
+def summarize(samples, seconds):
+    by_name = {}
+    for sample in samples:
+        by_name.setdefault(sample.name, []).append(sample)
+
+    def stats(group):
+        latencies = [s.seconds * 1000 for s in group]
+        db = [s.db_ms for s in group if s.db_ms is not None]
+        return {
+            "requests": len(group),
+            "errors": sum(s.status == 0 or s.status >= 500 for s in group),
+            "rps": round(len(group) / seconds, 2) if seconds else 0.0,
+            "p50_ms": round(_percentile(latencies, 50), 1),
+            "p90_ms": round(_percentile(latencies, 90), 1),
+            "p95_ms": round(_percentile(latencies, 95), 1),
+            "p99_ms": round(_percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies), 1),
+            "db_p50_ms": round(_percentile(db, 50), 1) if db else None,
+        }
+
+    return (stats(samples) if samples else {},
+            {name: stats(group) for name, group in sorted(by_name.items())})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--customers", type=int, default=20)
+    parser.add_argument("--staff", type=int, default=3)
+    parser.add_argument("--password", default="load-pass-123")
+    parser.add_argument("--prepare", action="store_true",
+                        help="Create the load users, then exit.")
+    parser.add_argument("--duration", type=float, default=60,
+                        help="Seconds of scripted load (default 60).")
+    parser.add_argument("--think", type=float, default=0.5,
+                        help="Mean think time between actions; 0 = "
+                             "closed loop at full speed.")
+    parser.add_argument("--access-log",
+                        help="Replay GETs from this access log instead.")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed-up factor (default 1).")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Replay worker threads (default 16).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="Write JSON results here.")
+    parser.add_argument("--baseline", help="Earlier results to compare.")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95 growth vs baseline (0.25 = 25%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="Ignore p95 changes smaller than this.")
+    args = parser.parse_args(argv)
+
+    _setup_django()
+    if args.prepare:
+        prepare_users(args.customers, args.staff, args.password)
+        print(f"prepared {args.customers} guests and {args.staff} staff",
+              file=sys.stderr)
+        return 0
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    agents = [
+        Agent(args.base_url, f"load-guest-{i}", args.password, False,
+              recorder)
+        for i in range(args.customers)
+    ] + [
+        Agent(args.base_url, f"load-staff-{i}", args.password, True,
+              recorder)
+        for i in range(args.staff)
+    ]
+    for agent in agents:
+        agent.login()
+    recorder.samples.clear()  # logins are setup, not load
+    print(f"logged in {len(agents)} users", file=sys.stderr)
+
+    start = time.monotonic()
+    if args.access_log:
+        entries, skipped = read_access_log(args.access_log)
+        print(f"replaying {len(entries)} requests ({skipped} lines "
+              f"skipped)", file=sys.stderr)
+        _replay(entries, agents, args.speed, args.concurrency)
+    else:
+        deadline = start + args.duration
+        threads = [
+            threading.Thread(target=_run_scripted, args=(
+                agent, STAFF_MIX if agent.staff else GUEST_MIX, deadline,
+                args.think, random.Random(rng.randrange(2**32))))
+            for agent in agents
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    seconds = time.monotonic() - start
+
+    total, urls = summarize(recorder.samples, seconds)
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "base_url": args.base_url,
+            "mode": "replay" if args.access_log else "scripted",
+            "args": vars(args),
+            "seconds": round(seconds, 1),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "total": total,
+        "urls": urls,
+    }
+    for name, row in urls.items():
+        print(f"{name:32} {row['requests']:6d} req {row['rps']:7.2f}/s "
+              f"p50 {row['p50_ms']:7.1f} p95 {row['p95_ms']:7.1f} ms "
+              f"errors {row['errors']}", file=sys.stderr)
+
+    text = json.dumps(results, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        problems = compare(results, baseline, args.max_regression,
+                           args.min_delta_ms, section="urls")
+        for line in problems:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
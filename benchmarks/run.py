@@ -0,0 +1,216 @@
+"""
+Benchmark the booking and staff hot paths against a seeded dataset.
+
+    python -m benchmarks.run                       # default dataset
+    python -m benchmarks.run --customers 50000 --capacity 200 -o head.json
+    python -m benchmarks.run --keepdb -o head.json --baseline main.json
+
+The suite runs in a throwaway test database (test_<name> on Postgres via
+DATABASE_URL, an in-memory/temp SQLite otherwise), seeds it with
+services/seeding.py, then times every case in benchmarks/cases.py.
+
+Results are JSON: p50/p95/mean/max latency in ms and p50/max SQL query
+count per case, plus enough metadata (commit, database, dataset size) to
+compare runs. With --baseline the run exits non-zero if any case's p95
+grew by more than --max-regression or its query count went up.
+
+--keepdb keeps the seeded database between runs (seeding is the slow
+part); on SQLite it lives in benchmarks/.bench.sqlite3.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+def _setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gambinos.settings")
+    import django
+
+    django.setup()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True,
+            capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_case(case, ctx, iterations, warmup):
+    from reservation_book.middleware import count_queries
+
+    timings = []
+    queries = []
+    for i in range(warmup + iterations):
+        state = case.setup(ctx) if case.setup else None
+        with count_queries() as counter:
+            start = time.perf_counter()
+            case.run(ctx, state)
+            elapsed = time.perf_counter() - start
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(counter.count)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries_p50": _percentile(queries, 50),
+        "queries_max": max(queries),
+    }
+
+
+def compare(results, baseline, max_regression, min_delta_ms=1.0,
+            section="cases"):
+    """
+    Human-readable regressions of `results` against `baseline`, for each
+    entry of `section`. A p95 change under `min_delta_ms` is treated as
+    noise; query counts are compared where both runs have them.
+    """
+    problems = []
+    for name, now in results[section].items():
+        before = baseline.get(section, {}).get(name)
+        if not before:
+            continue
+        grew = now["p95_ms"] - before["p95_ms"]
+        if (grew > min_delta_ms
+                and now["p95_ms"] > before["p95_ms"] * (1 + max_regression)):
+            problems.append(
+                f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now.get("queries_max", 0) > before.get("queries_max", 0):
+            problems.append(
+                f"{name}: queries {before['queries_max']} -> "
+                f"{now['queries_max']}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--past-days", type=int, default=365)
+    parser.add_argument("--future-days", type=int, default=30)
+    parser.add_argument("--capacity", type=int, default=120,
+                        help="Tables per slot (sets reservation volume).")
+    parser.add_argument("--occupancy", type=float, default=0.6)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--case", action="append", default=[],
+                        help="Only run this case (repeatable).")
+    parser.add_argument("--keepdb", action="store_true")
+    parser.add_argument("-o", "--output", help="Write JSON results here.")
+    parser.add_argument("--baseline", help="Earlier results to compare.")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95 growth vs baseline (0.25 = 25%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore p95 changes smaller than this.")
+    args = parser.parse_args(argv)
+
+    _setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+
+    from benchmarks.cases import CASES, make_context
+    from reservation_book.models import Customer
+    from reservation_book.services import seeding
+
+    unknown = set(args.case) - {case.name for case in CASES}
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+
+    # testserver host, locmem email backend; templates only need static
+    # URLs, not the collectstatic manifest
+    setup_test_environment()
+    override_settings(STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage."
+                                   "StaticFilesStorage"},
+    }).enable()
+    db = settings.DATABASES["default"]
+    if args.keepdb and db["ENGINE"] == "django.db.backends.sqlite3":
+        db.setdefault("TEST", {})["NAME"] = str(
+            Path(__file__).resolve().parent / ".bench.sqlite3")
+    old_name = db["NAME"]
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=args.keepdb, serialize=False)
+
+    try:
+        if not Customer.objects.exists():
+            started = time.perf_counter()
+            seeded = seeding.seed(
+                customers=args.customers, past_days=args.past_days,
+                future_days=args.future_days, capacity=args.capacity,
+                occupancy=args.occupancy, rng_seed=args.seed,
+                stdout=_Echo(),
+            )
+            print(f"seeded {seeded.reservations} reservations in "
+                  f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        ctx = make_context(random.Random(args.seed))
+        results = {
+            "meta": {
+                "commit": _git_commit(),
+                "database": connection.vendor,
+                "customers": Customer.objects.count(),
+                "args": vars(args),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "cases": {},
+        }
+        for case in CASES:
+            if args.case and case.name not in args.case:
+                continue
+            results["cases"][case.name] = run_case(
+                case, ctx, args.iterations, args.warmup)
+            print(f"{case.name}: {results['cases'][case.name]}",
+                  file=sys.stderr)
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=args.keepdb)
+
+    text = json.dumps(results, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        problems = compare(results, baseline, args.max_regression,
+                           args.min_delta_ms)
+        for line in problems:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+class _Echo:
+    """Progress lines from the seeder go to stderr."""
+
+    def write(self, text):
+        print(text, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
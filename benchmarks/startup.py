@@ -0,0 +1,169 @@
+"""
+Time a cold start: a fresh interpreter importing what a worker needs.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 20 -o head.json --baseline main.json
+
+Each scenario runs in its own `python -X importtime` subprocess, so every
+run pays for interpreter start-up and module imports the way a gunicorn
+worker boot or a `manage.py` command does:
+
+    django_setup   django.setup() (settings, apps, models)
+    worker_boot    the WSGI application plus the full URLconf, i.e. every
+                   view module a worker loads before its first request
+    reset_demand   loading a management command that only needs slot math
+
+Warm-up runs write the .pyc files first (PYTHONDONTWRITEBYTECODE is
+cleared for the subprocesses), so the timed runs measure a deployed
+worker rather than a first-ever import.
+
+Results are JSON: p50/p95/mean/max wall time in ms per scenario, and the
+project modules with the most import time of their own (median of the
+timed runs). With --baseline the run exits non-zero if any scenario's
+p95 grew by more than --max-regression.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.run import _git_commit, _percentile, compare
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# DJANGO_SETTINGS_MODULE comes from the subprocess environment
+_SETUP = "import django\ndjango.setup()\n"
+
+SCENARIOS = {
+    "django_setup": _SETUP,
+    "worker_boot": (
+        "from gambinos.wsgi import application\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    "reset_demand": _SETUP + (
+        "from django.core.management import load_command_class\n"
+        "load_command_class('reservation_book', 'reset_demand')\n"
+    ),
+}
+
+PROJECT_PACKAGES = ("reservation_book", "gambinos")
+
+
+def _parse_importtime(stderr):
+    """{module: self microseconds} from -X importtime output."""
+    selfs = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:"):].split("|")
+        selfs[name.strip()] = int(self_us)
+    return selfs
+
+
+def run_once(code, env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return elapsed, _parse_importtime(proc.stderr)
+
+
+def run_scenario(code, runs, warmup, env, top):
+    timings = []
+    module_times = {}
+    for i in range(warmup + runs):
+        elapsed, selfs = run_once(code, env)
+        if i < warmup:
+            continue
+        timings.append(elapsed)
+        for name, self_us in selfs.items():
+            if name.split(".")[0] in PROJECT_PACKAGES:
+                module_times.setdefault(name, []).append(self_us)
+    modules = sorted(
+        ((name, statistics.median(values) / 1000)
+         for name, values in module_times.items()),
+        key=lambda item: -item[1],
+    )
+    return {
+        "runs": runs,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "project_modules": len(module_times),
+        "slowest_modules_ms": {
+            name: round(ms, 3) for name, ms in modules[:top]},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--top", type=int, default=10,
+                        help="Project modules to list per scenario.")
+    parser.add_argument("--scenario", action="append", default=[],
+                        help="Only run this scenario (repeatable).")
+    parser.add_argument("-o", "--output", help="Write JSON results here.")
+    parser.add_argument("--baseline", help="Earlier results to compare.")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="Allowed p95 growth vs baseline (0.15 = 15%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0,
+                        help="Ignore p95 changes smaller than this.")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenario) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "gambinos.settings")
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "args": vars(args),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "scenarios": {},
+    }
+    for name, code in SCENARIOS.items():
+        if args.scenario and name not in args.scenario:
+            continue
+        results["scenarios"][name] = run_scenario(
+            code, args.runs, args.warmup, env, args.top)
+        summary = {k: v for k, v in results["scenarios"][name].items()
+                   if k != "slowest_modules_ms"}
+        print(f"{name}: {summary}", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        problems = compare(results, baseline, args.max_regression,
+                           args.min_delta_ms, section="scenarios")
+        for line in problems:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
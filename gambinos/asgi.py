@@ -5,6 +5,13 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Production runs WSGI (see Procfile). To serve from ASGI instead:
+
+    gunicorn gambinos.asgi:application -k uvicorn.workers.UvicornWorker
+
+Check `python -m benchmarks.concurrency` against the production database
+first; switch only if it is at least as fast as the sync workers.
 """
 
 import os
@@ -12,5 +19,18 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gambinos.settings')
+# Under ASGI every request runs its sync code (middleware, sync views) on
+# a thread of its own, and each thread opens its own connection: kept
+# open, they would pile up until the database refuses new ones.
+os.environ['CONN_MAX_AGE'] = '0'
+# Route the async variants of the read views (settings.ASYNC_VIEWS)
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
+
+# Build the staff customer-lookup index once per worker process.
+from reservation_book.services.customer_search import (  # noqa: E402
+    warm_customer_index,
+)
+
+warm_customer_index()
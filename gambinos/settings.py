@@ -4,10 +4,12 @@ Django settings for gambinos project.
 Generated by 'django-admin startproject' using Django 4.2.x
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 import os
 import sys
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 
 # =====================================================
@@ -71,6 +73,17 @@ else:
 # =====================================================
 # 📜 LOGGING (keep it simple and safe)
 # =====================================================
+# reservation_book logs at LOG_LEVEL; LOG_LEVELS raises or lowers single
+# subsystems (reservation_book.logs.get_logger names), e.g.
+# "edit=DEBUG,booking=DEBUG". LOG_SAMPLE_RATES keeps only a share of a
+# subsystem's DEBUG events ("booking=0.01"). LOG_FORMAT=json switches the
+# console to one JSON object per line.
+LOG_LEVEL = env("LOG_LEVEL", default="INFO").upper()
+LOG_LEVELS = env.dict("LOG_LEVELS", default={})
+LOG_SAMPLE_RATES = env.dict("LOG_SAMPLE_RATES", cast={"value": float},
+                            default={})
+LOG_FORMAT = env("LOG_FORMAT", default="text")
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -78,15 +91,23 @@ LOGGING = {
         "verbose": {
             "format": "[{asctime}] {levelname} [{name}:{lineno}] {message}",
             "style": "{",
-        }
+        },
+        "json": {"()": "reservation_book.logs.JsonFormatter"},
     },
     "handlers": {
-        "console": {"class": "logging.StreamHandler", "formatter": "verbose"},
+        "console": {
+            "class": "logging.StreamHandler",
+            "formatter": "json" if LOG_FORMAT == "json" else "verbose",
+        },
     },
     "root": {"handlers": ["console"], "level": "INFO"},
     "loggers": {
         "reservation_book": {"handlers": ["console"],
-                             "level": "DEBUG", "propagate": False},
+                             "level": LOG_LEVEL, "propagate": False},
+        **{
+            f"reservation_book.{name}": {"level": level.upper()}
+            for name, level in LOG_LEVELS.items()
+        },
         "django": {"handlers": ["console"],
                    "level": "INFO", "propagate": False},
     },
@@ -130,8 +151,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so session/auth queries are counted too
+    "reservation_book.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoise, async-capable so ASGI workers stay async
+    "reservation_book.middleware.StaticFilesMiddleware",
 
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -143,8 +167,15 @@ MIDDLEWARE = [
 
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Last, so it profiles the view; removes itself unless enabled
+    "reservation_book.middleware.ProfilingMiddleware",
 ]
 
+# Route the async variants of the lookup and availability views;
+# gambinos/asgi.py turns this on. Under WSGI an async view costs an
+# async_to_sync hop per request, so the sync views are the default.
+ASYNC_VIEWS = env.bool("ASYNC_VIEWS", default=False)
+
 AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
     "allauth.account.auth_backends.AuthenticationBackend",
@@ -200,16 +231,95 @@ else:
         )
     }
 
-    # Connection reuse + safety knobs
+    # Connection reuse + safety knobs (gambinos/asgi.py forces 0)
     DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)
     DATABASES["default"].setdefault("OPTIONS", {})
-    DATABASES["default"]["OPTIONS"].setdefault("connect_timeout", 5)
 
-    # If Postgres, you may want atomic requests
-    if DATABASES["default"]["ENGINE"] != "django.db.backends.sqlite3":
+    if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+        # sqlite3.connect() has no connect_timeout; `timeout` is how long
+        # a writer waits on the database lock
+        DATABASES["default"]["OPTIONS"].setdefault("timeout", 20)
+    else:
+        DATABASES["default"]["OPTIONS"].setdefault("connect_timeout", 5)
+        # If Postgres, you may want atomic requests
         DATABASES["default"]["ATOMIC_REQUESTS"] = True
 
 
+# =====================================================
+# 🧊 CACHE
+# =====================================================
+# reservation_book.cache.TieredCache: a per-process LRU (L1, entries kept
+# at most CACHE_LOCAL_TIMEOUT seconds) in front of the cache every worker
+# shares (L2). CACHE_SHARED picks L2:
+#   db      the cache table (run `manage.py createcachetable`)
+#   file    CACHE_DIR, for workers on one host
+#   redis   REDIS_URL (needs the redis package); the default when set
+#   locmem  this process only (tests)
+# The availability grid is one range query to rebuild; with the db L2 a
+# miss would cost more queries than that, so its alias stays L1-only.
+REDIS_URL = env("REDIS_URL", default="")
+CACHE_SHARED = env(
+    "CACHE_SHARED",
+    default="locmem" if RUNNING_TESTS else ("redis" if REDIS_URL else "db"),
+)
+CACHE_DIR = env("CACHE_DIR", default=str(BASE_DIR / "cache"))
+CACHE_LOCAL_TIMEOUT = env.int("CACHE_LOCAL_TIMEOUT", default=5)
+CACHE_LOCAL_MAX_ENTRIES = env.int("CACHE_LOCAL_MAX_ENTRIES", default=1000)
+
+_SHARED_CACHES = {
+    "db": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "reservation_book_cache",
+        "OPTIONS": {"MAX_ENTRIES": 20_000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": CACHE_DIR,
+        "OPTIONS": {"MAX_ENTRIES": 20_000},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    },
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "gambinos-shared",
+    },
+}
+if CACHE_SHARED not in _SHARED_CACHES:
+    raise ImproperlyConfigured(
+        f"CACHE_SHARED must be one of {', '.join(_SHARED_CACHES)}")
+if CACHE_SHARED == "redis" and not (REDIS_URL and find_spec("redis")):
+    raise ImproperlyConfigured(
+        "CACHE_SHARED=redis needs REDIS_URL and the redis package")
+
+
+def _tiered(location, shared):
+    return {
+        "BACKEND": "reservation_book.cache.TieredCache",
+        "LOCATION": location,
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "SHARED": shared,
+            "LOCAL_TIMEOUT": CACHE_LOCAL_TIMEOUT,
+            "LOCAL_MAX_ENTRIES": CACHE_LOCAL_MAX_ENTRIES,
+        },
+    }
+
+
+def cache_settings(shared):
+    """CACHES with `shared` (a CACHE_SHARED value) as L2."""
+    return {
+        "default": _tiered("tiered", "shared"),
+        "availability": (_tiered("local", None) if shared == "db"
+                         else _tiered("tiered", "shared")),
+        "shared": _SHARED_CACHES[shared],
+    }
+
+
+CACHES = cache_settings(CACHE_SHARED)
+
+
 # =====================================================
 # 🔐 PASSWORD VALIDATION
 # =====================================================
@@ -386,6 +496,19 @@ DEFAULT_FROM_EMAIL = _clean_env_str(
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
 
 
+# =====================================================
+# 🔎 STAFF CUSTOMER LOOKUP
+# =====================================================
+# In-process search index used by /ajax/lookup-customer/.
+# Each worker builds it at start-up; lookups fall back to the DB
+# while it is cold. MAX_AGE (seconds) bounds how stale a worker's
+# copy can get for edits made by *other* workers.
+CUSTOMER_SEARCH_INDEX_ENABLED = env.bool(
+    "CUSTOMER_SEARCH_INDEX_ENABLED", default=True)
+CUSTOMER_SEARCH_INDEX_MAX_AGE = env.int(
+    "CUSTOMER_SEARCH_INDEX_MAX_AGE", default=300)
+
+
 # =====================================================
 # Override your model constant if required.
 # =====================================================
@@ -396,3 +519,84 @@ DURATION_CHOICES = [
     (4, "4 time slots"),
     (5, "5 time slots"),
 ]
+
+
+# =====================================================
+# 📈 REQUEST METRICS
+# =====================================================
+# reservation_book.middleware.RequestMetricsMiddleware logs SQL count,
+# SQL time and total time per request and adds a Server-Timing header:
+# for staff always, for everyone else only with this on.
+REQUEST_METRICS_SERVER_TIMING = env.bool(
+    "REQUEST_METRICS_SERVER_TIMING", default=DEBUG)
+
+# Max SQL queries per URL name (optionally per method). Exceeding one
+# logs a warning; under tests it fails the request instead, so an N+1
+# regression shows up as a test failure.
+QUERY_BUDGETS = {
+    "make_reservation": {"GET": 5},
+    "create_phone_reservation": {"GET": 5},
+    # First visit links the Customer to the user (a few one-off writes)
+    "my_reservations": {"GET": 14},
+    "staff_dashboard": 4,
+    # Steady state; the inline no-show sweep adds queries per past row
+    "staff_reservations": {"GET": 6},
+    "staff_floor": 4,
+    "staff_floor_changes": 5,
+    "user_reservations_overview": 5,
+    "user_reservation_history": 8,
+    "ajax_lookup_customer": 5,
+    "availability": 1,
+}
+QUERY_BUDGETS_STRICT = env.bool("QUERY_BUDGETS_STRICT", default=RUNNING_TESTS)
+
+
+# =====================================================
+# 🔬 PROFILING
+# =====================================================
+# reservation_book.middleware.ProfilingMiddleware: opt-in cProfile of a
+# single request (staff ?profile=1, X-Profile: <token>, or random
+# sampling). Off by default; when off it is dropped from the middleware
+# chain at startup.
+PROFILING_ENABLED = env.bool("PROFILING_ENABLED", default=False)
+PROFILING_DIR = env("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_SAMPLE_RATE = env.float("PROFILING_SAMPLE_RATE", default=0.0)
+PROFILING_TOKEN = env("PROFILING_TOKEN", default="")
+PROFILING_TOP_N = env.int("PROFILING_TOP_N", default=40)
+
+
+# =====================================================
+# 📈 METRICS
+# =====================================================
+# Prometheus text exposition at /metrics/ (reservation_book.metrics).
+# With several workers set METRICS_DIR to a directory they share, cleared
+# at deploy, so every scrape reports all of them. Scrapes are allowed from
+# METRICS_ALLOWED_IPS and from staff sessions.
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+METRICS_DIR = env("METRICS_DIR", default="")
+# How often each worker rewrites its file in METRICS_DIR (if changed)
+METRICS_FLUSH_SECONDS = env.float("METRICS_FLUSH_SECONDS", default=1.0)
+METRICS_ALLOWED_IPS = env.list("METRICS_ALLOWED_IPS",
+                               default=["127.0.0.1", "::1"])
+
+if METRICS_ENABLED:
+    # count and time outgoing mail, then hand it to the configured backend
+    METRICS_EMAIL_BACKEND = EMAIL_BACKEND
+    EMAIL_BACKEND = "reservation_book.metrics.MeteredEmailBackend"
+
+
+# =====================================================
+# 🐢 SLOW QUERY LOG
+# =====================================================
+# reservation_book.slow_queries: statements taking SLOW_QUERY_MS or longer
+# are appended (JSON lines, rotated) to SLOW_QUERY_FILE with their call
+# site and, for SELECTs, an EXPLAIN plan. Staff read them grouped at
+# /staff/slow-queries/. SLOW_QUERY_MS=0 turns the wrapper off.
+SLOW_QUERY_MS = env.float("SLOW_QUERY_MS", default=200.0)
+SLOW_QUERY_FILE = env(
+    "SLOW_QUERY_FILE", default=str(BASE_DIR / "logs" / "slow_queries.jsonl"))
+SLOW_QUERY_MAX_BYTES = env.int("SLOW_QUERY_MAX_BYTES", default=5_000_000)
+SLOW_QUERY_BACKUPS = env.int("SLOW_QUERY_BACKUPS", default=3)
+SLOW_QUERY_EXPLAIN = env.bool("SLOW_QUERY_EXPLAIN", default=True)
+SLOW_QUERY_EXPLAIN_INTERVAL = env.int("SLOW_QUERY_EXPLAIN_INTERVAL",
+                                      default=600)
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gambinos.settings')
 
 application = get_wsgi_application()
+
+# Build the staff customer-lookup index once per worker process.
+from reservation_book.services.customer_search import (  # noqa: E402
+    warm_customer_index,
+)
+
+warm_customer_index()
@@ -275,5 +275,7 @@ class CustomerAdmin(admin.ModelAdmin):
     )
     list_filter = ("barred", "created_at")
     search_fields = ("first_name", "last_name", "email",
-                     "phone", "mobile", "notes")
-    readonly_fields = ("created_at", "updated_at")
+                     "phone", "mobile", "phone_e164", "mobile_e164",
+                     "notes")
+    readonly_fields = ("phone_e164", "mobile_e164",
+                       "created_at", "updated_at")
@@ -8,3 +8,26 @@ class ReservationBookConfig(AppConfig):
     def ready(self):
         # Import signals so the receiver is registered
         import reservation_book.signals  # noqa
+
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        from reservation_book import middleware
+
+        connection_created.connect(
+            middleware.install_query_counter,
+            dispatch_uid="reservation_book.middleware.query_counter")
+
+        if getattr(settings, "METRICS_ENABLED", False):
+            from reservation_book import metrics
+
+            connection_created.connect(
+                metrics.install_lock_timer,
+                dispatch_uid="reservation_book.metrics.lock_timer")
+
+        if getattr(settings, "SLOW_QUERY_MS", 0) > 0:
+            from reservation_book import slow_queries
+
+            connection_created.connect(
+                slow_queries.install,
+                dispatch_uid="reservation_book.slow_queries")
@@ -0,0 +1,289 @@
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import transaction
+
+from reservation_book import metrics
+from reservation_book.logs import get_logger
+
+# Two-tier cache.
+#
+# CACHES["default"] is a TieredCache: a small per-process LRU (L1) in
+# front of the cache all workers share (L2, the alias in its SHARED
+# option: the database cache table, a file-based cache or Redis; see
+# settings). Reads try L1, then L2, filling L1; writes go to both. An L1
+# entry lives at most LOCAL_TIMEOUT seconds, which bounds how long
+# another worker can serve a value after it was overwritten or its
+# namespace invalidated here. With SHARED set to None there is no L2:
+# each worker keeps its own copies, for at most LOCAL_TIMEOUT seconds.
+#
+# A Namespace groups keys under a version token kept in the cache:
+#
+#     grid = AVAILABILITY.get_or_set(key, build)
+#     AVAILABILITY.invalidate()   # new token once the transaction commits
+#
+# Invalidation never deletes keys. The namespace moves to a new token and
+# entries under the old one are never read again and expire. The token
+# is read before a value is computed, so a value computed from data a
+# concurrent commit has since changed is stored under the old token.
+#
+# Lookups are counted in gambinos_cache_requests_total under the part of
+# the key before the first ":" (the namespace), hits per tier in
+# gambinos_cache_tier_hits_total. An L2 error is logged and treated as a
+# miss: the cache must not take pages down with it. add() then claims the
+# key in L1 only, so callers that dedupe work with it still run.
+
+log = get_logger("cache")
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Bounded, thread-safe LRU with per-entry expiry. Values are pickled
+    so callers can't mutate what the next reader gets."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.data = OrderedDict()  # key -> (expires at, pickled value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """(True, value), or (False, None) if missing or expired."""
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return False, None
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self.data[key]
+                return False, None
+            self.data.move_to_end(key)
+        return True, pickle.loads(pickled)
+
+    def set(self, key, value, ttl):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, pickled)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def add(self, key, value, ttl):
+        """set() unless a live entry exists; True if it set."""
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return False
+            self.data[key] = (time.monotonic() + ttl, pickled)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        with self.lock:
+            return self.data.pop(key, None) is not None
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+# One L1 per LOCATION per process; Django makes a backend per thread.
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+def namespace_of(key):
+    return key.split(":", 1)[0] if ":" in key else "default"
+
+
+class TieredCache(BaseCache):
+    """Cache backend: per-process LocalLRU in front of a shared alias."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = options.get("SHARED", "shared")
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        with _local_stores_lock:
+            self.local = _local_stores.setdefault(
+                location, LocalLRU(options.get("LOCAL_MAX_ENTRIES", 1000)))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _shared(self, method, *args, failed=None, **kwargs):
+        if self.shared_alias is None:
+            return failed
+        try:
+            return getattr(self.shared, method)(*args, **kwargs)
+        except Exception as exc:
+            log.warning("cache.shared_failed", op=method,
+                        alias=self.shared_alias, error=repr(exc))
+            return failed
+
+    def _local_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        namespace = namespace_of(key)
+        found, value = self.local.get(local_key)
+        if found:
+            metrics.cache_lookup(namespace, True, tier="l1")
+            return value
+        value = self._shared("get", key, _MISSING, version=version,
+                             failed=_MISSING)
+        if value is _MISSING:
+            metrics.cache_lookup(namespace, False)
+            return default
+        self.local.set(local_key, value, self.local_timeout)
+        metrics.cache_lookup(namespace, True, tier="l2")
+        return value
+
+    async def aget(self, key, default=None, version=None):
+        # An L1 hit needs no thread hop; L2 may be a database query
+        found, value = self.local.get(
+            self.make_and_validate_key(key, version=version))
+        if found:
+            metrics.cache_lookup(namespace_of(key), True, tier="l1")
+            return value
+        return await sync_to_async(self.get)(key, default, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._shared("set", key, value, timeout=timeout, version=version)
+        ttl = self._local_ttl(timeout)
+        if ttl > 0:
+            self.local.set(local_key, value, ttl)
+        else:
+            self.local.delete(local_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        ttl = self._local_ttl(timeout)
+        added = self._shared("add", key, value, timeout=timeout,
+                             version=version, failed=_MISSING)
+        if added is _MISSING:
+            # No L2 (or it failed): claim the key in this process only,
+            # rather than report it as taken by someone else
+            return ttl > 0 and self.local.add(local_key, value, ttl)
+        if added and ttl > 0:
+            self.local.set(local_key, value, ttl)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self._shared("touch", key, timeout=timeout, version=version,
+                            failed=False)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self._shared("delete", key, version=version, failed=False)
+
+    def incr(self, key, delta=1, version=None):
+        if self.shared_alias is None:
+            return super().incr(key, delta, version=version)
+        # ValueError for a missing key comes from L2, as with any backend
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self._shared("clear")
+
+
+def _token():
+    return uuid.uuid4().hex[:12]
+
+
+class Namespace:
+    """A group of keys invalidated together; see the module comment."""
+
+    def __init__(self, name, timeout=300, alias="default"):
+        self.name = name
+        self.timeout = timeout
+        self.alias = alias
+        # Outside the namespace, so token reads don't count as its hits
+        self.token_key = f"namespaces:{name}"
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def token(self):
+        token = self.cache.get(self.token_key)
+        if token is None:
+            # The first worker to get here sets it; an evicted token
+            # comes back as a new one, which just invalidates.
+            self.cache.add(self.token_key, _token(), timeout=None)
+            token = self.cache.get(self.token_key) or _token()
+        return token
+
+    def key(self, key):
+        return f"{self.name}:{self.token()}:{key}"
+
+    async def akey(self, key):
+        token = await self.cache.aget(self.token_key)
+        if token is None:
+            token = await sync_to_async(self.token)()
+        return f"{self.name}:{token}:{key}"
+
+    def get(self, key, default=None):
+        return self.cache.get(self.key(key), default)
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(self.key(key), value,
+                       self.timeout if timeout is None else timeout)
+
+    def get_or_set(self, key, compute, timeout=None):
+        full_key = self.key(key)
+        value = self.cache.get(full_key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.cache.set(full_key, value,
+                           self.timeout if timeout is None else timeout)
+        return value
+
+    async def aget_or_set(self, key, compute, timeout=None):
+        """get_or_set() for async code; `compute` is a coroutine
+        function."""
+        full_key = await self.akey(key)
+        value = await self.cache.aget(full_key, _MISSING)
+        if value is _MISSING:
+            value = await compute()
+            await self.cache.aset(full_key, value,
+                                  self.timeout if timeout is None else timeout)
+        return value
+
+    def invalidate(self):
+        """Drop every entry, once the current transaction (if any)
+        commits."""
+        transaction.on_commit(self._bump)
+
+    def _bump(self):
+        try:
+            self.cache.set(self.token_key, _token(), timeout=None)
+        except Exception as exc:
+            log.warning("cache.invalidate_failed", namespace=self.name,
+                        error=repr(exc))
+
+
+# Availability grid of the booking pages; invalidated on every
+# TimeSlotAvailability write (signals). Its alias has no L2 when that
+# would be the database cache: a miss there costs more queries than the
+# grid's one range query (settings).
+AVAILABILITY = Namespace("availability", timeout=300, alias="availability")
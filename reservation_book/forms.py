@@ -5,6 +5,7 @@ from django.db import transaction
 from allauth.account.forms import SignupForm
 
 from .models import TimeSlotAvailability, TableReservation, Customer
+from .services.customers import link_customer_to_user
 
 DURATION_SLOT_CHOICES = [
     (1, "1 time slot"),
@@ -97,7 +98,7 @@ class CustomerSignupForm(SignupForm):
     - username required (per your requirement)
     - email required (for confirmations)
     - first/last required (for Customer DB + nicer emails)
-    - ensure Customer exists keyed by email (Customer has no user FK)
+    - ensure Customer exists keyed by email and linked to the new user
     """
     first_name = forms.CharField(
         max_length=150, required=True, label="First name")
@@ -120,13 +121,14 @@ class CustomerSignupForm(SignupForm):
             raise ValueError(
                 "Email is required for signup (needed for confirmations).")
 
-        Customer.objects.update_or_create(
+        customer, _ = Customer.objects.update_or_create(
             email=email,
             defaults={
                 "first_name": user.first_name,
                 "last_name": user.last_name,
             },
         )
+        link_customer_to_user(customer, user)
 
         return user
 
@@ -0,0 +1,107 @@
+import json
+import logging
+import random
+
+from django.conf import settings
+
+# Structured, level-gated logging for hot paths.
+#
+# get_logger("edit") wraps the stdlib logger "reservation_book.edit"; its
+# calls take an event name plus key=value fields:
+#
+#     log.debug("edit.released", day=ts.calendar_date,
+#               demands=lambda: {s: ts.demand_for(s) for s in slots})
+#
+# Nothing is built unless the level is enabled for that subsystem
+# (LOG_LEVELS, else LOG_LEVEL) and, for DEBUG events, the call survives
+# LOG_SAMPLE_RATES. Callable field values are only called then, so they
+# can hold queries or dict-building that must cost nothing in production.
+# Messages render as logfmt ("edit.released day=2025-01-31 demands=...");
+# with LOG_FORMAT=json the JsonFormatter emits one object per line.
+
+
+class _Message:
+    """logfmt rendering, done by the handler only if the record is kept."""
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        parts = [self.event]
+        parts += [f"{key}={_logfmt(value)}"
+                  for key, value in self.fields.items()]
+        return " ".join(parts)
+
+
+def _logfmt(value):
+    if isinstance(value, str):
+        if not value or any(c in value for c in ' "=\n'):
+            return json.dumps(value)
+        return value
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+class StructLogger:
+    def __init__(self, subsystem):
+        self.subsystem = subsystem
+        self.logger = logging.getLogger(f"reservation_book.{subsystem}")
+
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def _sampled(self):
+        rates = getattr(settings, "LOG_SAMPLE_RATES", {})
+        rate = rates.get(self.subsystem, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+    def _log(self, level, event, fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.INFO and not self._sampled():
+            return
+        fields = {key: value() if callable(value) else value
+                  for key, value in fields.items()}
+        # stacklevel=3: report the line that called debug()/info()/...
+        self.logger.log(level, "%s", _Message(event, fields),
+                        extra={"event": event, "fields": fields},
+                        stacklevel=3)
+
+    def log(self, level, event, **fields):
+        self._log(level, event, fields)
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+
+def get_logger(subsystem) -> StructLogger:
+    return StructLogger(subsystem)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; structured fields become top-level."""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "where": f"{record.module}:{record.lineno}",
+        }
+        if hasattr(record, "event"):
+            data["event"] = record.event
+            for key, value in record.fields.items():
+                data.setdefault(key, value)
+        else:
+            data["message"] = record.getMessage()
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Lower, Trim
+
+from reservation_book.models import Customer
+
+# Links existing Customer rows to their website account (Customer.user)
+# by case-insensitive email. New signups are linked as they happen; this
+# command catches up accounts created before the link existed.
+# Customers are walked in primary-key batches, one short transaction each,
+# so it is safe to run on a live database and to re-run.
+
+
+class Command(BaseCommand):
+    help = "Link Customer rows to User accounts by email, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Customers per batch (default 500).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report links without saving.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        User = get_user_model()
+        last_pk = 0
+        scanned = 0
+        linked = 0
+        taken_user_ids = set(
+            Customer.objects.filter(user__isnull=False)
+            .values_list("user_id", flat=True)
+        )
+
+        while True:
+            batch = list(
+                Customer.objects
+                .filter(pk__gt=last_pk, user__isnull=True)
+                .exclude(email__isnull=True)
+                .exclude(email="")
+                .annotate(email_key=Lower(Trim("email")))
+                .order_by("pk")
+                .only("pk", "email")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            keys = {c.email_key for c in batch}
+            user_by_email = {}
+            users = (
+                User.objects
+                .annotate(email_key=Lower(Trim("email")))
+                .filter(email_key__in=keys)
+                .order_by("pk")
+                .values_list("email_key", "pk")
+            )
+            for key, user_pk in users:
+                # Lowest pk wins if several accounts share an address
+                user_by_email.setdefault(key, user_pk)
+
+            to_link = []
+            for c in batch:
+                user_pk = user_by_email.get(c.email_key)
+                if user_pk is None or user_pk in taken_user_ids:
+                    continue
+                taken_user_ids.add(user_pk)
+                c.user_id = user_pk
+                to_link.append(c)
+
+            if to_link and not dry_run:
+                with transaction.atomic():
+                    Customer.objects.bulk_update(to_link, ["user"])
+            linked += len(to_link)
+
+            self.stdout.write(
+                f"  up to customer #{last_pk}: {len(to_link)} linked")
+
+        verb = "would link" if dry_run else "linked"
+        self.stdout.write(self.style.SUCCESS(
+            f"Customer/user backfill complete: scanned={scanned}, "
+            f"{verb}={linked}"
+        ))
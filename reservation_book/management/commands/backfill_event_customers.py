@@ -0,0 +1,105 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Lower, Trim
+
+from reservation_book.models import (
+    CancellationEvent,
+    Customer,
+    NoShowEvent,
+    TableReservation,
+)
+
+# Fills CancellationEvent.customer / NoShowEvent.customer for rows written
+# before the column existed. New events get the customer id when they are
+# created.
+#
+# Mapping order:
+#   1) the reservation row, if it still exists (no-shows keep theirs)
+#   2) the customer_email snapshot, case-insensitively (lowest id wins
+#      when legacy duplicates share an address)
+#
+# Events are walked in primary-key chunks, one short transaction each.
+
+
+class Command(BaseCommand):
+    help = "Map historical cancellation/no-show events to customers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Events per chunk (default 1000).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report mappings without saving.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        for model in (CancellationEvent, NoShowEvent):
+            scanned, mapped = self._backfill(model, batch_size, dry_run)
+            verb = "would map" if dry_run else "mapped"
+            self.stdout.write(self.style.SUCCESS(
+                f"{model.__name__}: scanned={scanned}, {verb}={mapped}, "
+                f"unmatched={scanned - mapped}"
+            ))
+
+    def _backfill(self, model, batch_size, dry_run):
+        last_pk = 0
+        scanned = 0
+        mapped = 0
+
+        while True:
+            batch = list(
+                model.objects
+                .filter(pk__gt=last_pk, customer__isnull=True)
+                .order_by("pk")
+                .only("pk", "reservation_id", "customer_email")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            by_reservation = dict(
+                TableReservation.objects
+                .filter(
+                    pk__in=[e.reservation_id for e in batch
+                            if e.reservation_id],
+                    customer__isnull=False,
+                )
+                .values_list("pk", "customer_id")
+            )
+
+            emails = {
+                (e.customer_email or "").strip().lower()
+                for e in batch
+            } - {""}
+            by_email = {}
+            rows = (
+                Customer.objects
+                .annotate(email_key=Lower(Trim("email")))
+                .filter(email_key__in=emails)
+                .order_by("pk")
+                .values_list("email_key", "pk")
+            )
+            for key, customer_pk in rows:
+                by_email.setdefault(key, customer_pk)
+
+            changed = []
+            for e in batch:
+                customer_pk = by_reservation.get(e.reservation_id)
+                if customer_pk is None:
+                    key = (e.customer_email or "").strip().lower()
+                    customer_pk = by_email.get(key)
+                if customer_pk is None:
+                    continue
+                e.customer_id = customer_pk
+                changed.append(e)
+
+            if changed and not dry_run:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, ["customer"])
+            mapped += len(changed)
+
+        return scanned, mapped
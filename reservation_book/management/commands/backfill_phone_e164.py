@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reservation_book.models import Customer
+from reservation_book.services.phones import to_e164
+
+# One-off (and safe to re-run) backfill for Customer.phone_e164 /
+# Customer.mobile_e164. New and edited customers are normalized in
+# Customer.save(); this command catches up rows written before that.
+# Rows are walked in primary-key order, one short transaction per batch,
+# so it can run against a live database.
+
+
+class Command(BaseCommand):
+    help = "Normalize Customer phone/mobile into the E.164 lookup columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Customers per batch (default 500).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report changes without saving.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        last_pk = 0
+        scanned = 0
+        updated = 0
+        unparseable = 0
+
+        while True:
+            batch = list(
+                Customer.objects
+                .filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "phone", "mobile", "phone_e164", "mobile_e164")
+                [:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            changed = []
+            for c in batch:
+                phone_e164 = to_e164(c.phone)
+                mobile_e164 = to_e164(c.mobile)
+                if (c.phone and not phone_e164) or (
+                        c.mobile and not mobile_e164):
+                    unparseable += 1
+                if (c.phone_e164, c.mobile_e164) != (phone_e164,
+                                                     mobile_e164):
+                    c.phone_e164 = phone_e164
+                    c.mobile_e164 = mobile_e164
+                    changed.append(c)
+
+            if changed and not dry_run:
+                with transaction.atomic():
+                    Customer.objects.bulk_update(
+                        changed, ["phone_e164", "mobile_e164"])
+            updated += len(changed)
+
+            self.stdout.write(
+                f"  up to customer #{last_pk}: {len(changed)} updated")
+
+        verb = "would update" if dry_run else "updated"
+        self.stdout.write(self.style.SUCCESS(
+            f"Phone backfill complete: scanned={scanned}, {verb}={updated}, "
+            f"unparseable={unparseable}"
+        ))
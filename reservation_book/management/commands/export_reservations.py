@@ -0,0 +1,85 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation_book.services import exports
+
+# Streams reservations or cancellation/no-show events to CSV or XLSX for
+# accounting, without loading the whole table (see services/exports.py).
+#
+#   python manage.py export_reservations --from 2025-01-01 --to 2025-12-31
+#   python manage.py export_reservations --kind no_shows -o no_shows.csv
+#   python manage.py export_reservations --format xlsx -o year.xlsx
+#
+# CSV goes to stdout unless --output is given; XLSX needs --output.
+
+
+def _iso_date(raw):
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise CommandError(f"Not an ISO date: {raw!r}")
+
+
+class Command(BaseCommand):
+    help = "Stream reservations or events to CSV/XLSX."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=sorted(exports.EXPORTS),
+                            default="reservations")
+        parser.add_argument("--format", choices=exports.FORMATS,
+                            default="csv")
+        parser.add_argument("--from", dest="date_from", type=_iso_date,
+                            help="First reservation date (inclusive).")
+        parser.add_argument("--to", dest="date_to", type=_iso_date,
+                            help="Last reservation date (inclusive).")
+        parser.add_argument("--status", default="",
+                            help="Reservation status (reservations only).")
+        parser.add_argument("--source", choices=("phone", "online"),
+                            default="",
+                            help="Phone-in or online (reservations only).")
+        parser.add_argument("--chunk-size", type=int,
+                            default=exports.DEFAULT_CHUNK_SIZE,
+                            help="Rows fetched per database round trip.")
+        parser.add_argument("-o", "--output",
+                            help="File to write (default: stdout for CSV).")
+
+    def handle(self, *args, **options):
+        kind = options["kind"]
+        fmt = options["format"]
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        if fmt == "xlsx" and not options["output"]:
+            raise CommandError("XLSX export needs --output")
+
+        try:
+            queryset = exports.export_queryset(
+                kind,
+                date_from=options["date_from"],
+                date_to=options["date_to"],
+                status=options["status"],
+                source=options["source"],
+            )
+            if fmt == "xlsx":
+                with open(options["output"], "wb") as fh:
+                    exports.write_xlsx(kind, queryset, fh, chunk_size)
+            else:
+                self._write_csv(kind, queryset, chunk_size,
+                                options["output"])
+        except exports.ExportError as exc:
+            raise CommandError(str(exc))
+
+        if options["output"]:
+            self.stderr.write(self.style.SUCCESS(
+                f"Wrote {kind} export to {options['output']}"))
+
+    def _write_csv(self, kind, queryset, chunk_size, path):
+        lines = exports.iter_csv(kind, queryset, chunk_size)
+        if not path:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            for line in lines:
+                fh.write(line)
@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation_book.services.customer_merge import merge_duplicates
+
+# Collapses duplicate Customer rows into one survivor per guest.
+#
+# Two rows are duplicates when they share an email after trimming and
+# lower-casing, or, for rows without an email, the same E.164 phone and
+# the same (case-insensitive) name. The survivor is the row linked to a
+# website account, else the one with an already-normalized email, else the
+# oldest. Reservations, series and cancellation/no-show events move to the
+# survivor; counters are summed and a ban on any duplicate is kept.
+#
+# Clusters are found in key order, --batch-size keys per grouped query, and
+# each cluster is merged in its own short transaction that locks only its
+# own Customer rows, so the command can run on a live database. Use
+# --dry-run first; --limit/--after let a large backlog be done in chunks.
+
+
+class Command(BaseCommand):
+    help = "Find and merge duplicate Customer rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report clusters without merging.")
+        parser.add_argument("--batch-size", type=int, default=100,
+                            help="Duplicate keys per query (default 100).")
+        parser.add_argument("--limit", type=int, default=None,
+                            help="Stop after this many clusters.")
+        parser.add_argument("--after", default=None,
+                            help="Resume after this duplicate key.")
+        parser.add_argument("--pause", type=float, default=0.0,
+                            help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        limit = options["limit"]
+        dry_run = options["dry_run"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if limit is not None and limit < 1:
+            raise CommandError("--limit must be at least 1")
+
+        after = options["after"]
+        totals = {"clusters": 0, "customers": 0, "reservations": 0,
+                  "series": 0}
+
+        while limit is None or totals["clusters"] < limit:
+            chunk = batch_size
+            if limit is not None:
+                chunk = min(chunk, limit - totals["clusters"])
+            report = merge_duplicates(dry_run=dry_run, batch_size=chunk,
+                                      limit=chunk, after=after)
+            if report.last_key is None or report.last_key == after:
+                break
+            after = report.last_key
+
+            for cluster in report.clusters:
+                self.stdout.write(
+                    f"  {cluster.key}: keep #{cluster.survivor_id}, "
+                    f"merge {cluster.duplicate_ids} "
+                    f"(reservations={cluster.reservations}, "
+                    f"series={cluster.series}, "
+                    f"cancellations={cluster.cancellations_count}, "
+                    f"no_shows={cluster.no_show_count})"
+                )
+                totals["customers"] += len(cluster.duplicate_ids)
+                totals["reservations"] += cluster.reservations
+                totals["series"] += cluster.series
+            totals["clusters"] += len(report.clusters)
+
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        verb = "would merge" if dry_run else "merged"
+        self.stdout.write(self.style.SUCCESS(
+            f"Duplicate customers: clusters={totals['clusters']}, "
+            f"{verb} customers={totals['customers']}, "
+            f"reservations={totals['reservations']}, "
+            f"series={totals['series']}, last_key={after!r}"
+        ))
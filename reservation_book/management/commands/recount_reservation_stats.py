@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from reservation_book.models import ReservationStats
+from reservation_book.services.lifecycle import recount_reservation_stats
+
+# Recounts the staff dashboard counters (ReservationStats) from the source
+# tables and rewrites any that drifted. The counters are bumped on every
+# lifecycle transition, so this is a safety net: run it periodically
+# (e.g. nightly via cron, after sweep_no_shows) or after manual data
+# fixes in the admin.
+
+
+class Command(BaseCommand):
+    help = "Recount dashboard counters and correct any drift."
+
+    def handle(self, *args, **options):
+        before, after = recount_reservation_stats()
+
+        drifted = [f for f in ReservationStats.COUNTER_FIELDS
+                   if before[f] != after[f]]
+        for field in drifted:
+            self.stdout.write(f"  {field}: {before[field]} -> {after[field]}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dashboard counters recounted: drifted={len(drifted)}"
+        ))
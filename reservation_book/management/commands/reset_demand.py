@@ -3,8 +3,9 @@ from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from reservation_book.constants import SLOT_LABELS
 from reservation_book.models import TableReservation, TimeSlotAvailability
-from reservation_book.views import SLOT_LABELS, _affected_slots
+from reservation_book.slots import covered_slots
 
 # This command is for advanced use only. It allows resetting the
 # demand counters in TimeSlotAvailability for specific dates, with
@@ -138,7 +139,7 @@ class Command(BaseCommand):
             tables_needed = int(
                 reservation.number_of_tables_required_by_patron or 0)
             duration = int(reservation.duration_hours or 1)
-            slots = _affected_slots(
+            slots = covered_slots(
                 reservation.time_slot,
                 duration,
                 until_close=False,
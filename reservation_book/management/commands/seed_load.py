@@ -0,0 +1,97 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reservation_book.models import TimeSlotAvailability
+from reservation_book.services import seeding
+
+# Loads synthetic customers, availability, reservations, series,
+# cancellations and no-shows for benchmarking and capacity planning
+# (see services/seeding.py for the distributions). Rows are bulk-inserted
+# in batches, one transaction per chunk of days; a million rows takes a
+# few minutes on Postgres.
+#
+# The day range (--days back from today plus --future-days ahead) must
+# not have availability rows yet, otherwise demand counters could not
+# match the reservations. Meant for empty or throwaway databases: it
+# refuses to run with DEBUG off unless --force is given.
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate realistic reservation data for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=10000,
+                            help="Customers to create (default 10000).")
+        parser.add_argument("--days", type=int, default=365,
+                            help="Days of history before today "
+                                 "(default 365).")
+        parser.add_argument("--future-days", type=int, default=30,
+                            help="Bookable days from today (default 30).")
+        parser.add_argument("--occupancy", type=float, default=0.6,
+                            help="Average share of tables booked per slot; "
+                                 "weekends run higher (default 0.6).")
+        parser.add_argument("--capacity", type=int, default=40,
+                            help="Tables per slot (default 40).")
+        parser.add_argument("--no-show-rate", type=float, default=0.05)
+        parser.add_argument("--cancel-rate", type=float, default=0.08)
+        parser.add_argument("--series-rate", type=float, default=0.15,
+                            help="Chance a series booking starts on a "
+                                 "given day (default 0.15).")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Rows per INSERT (default 5000).")
+        parser.add_argument("--seed", type=int, default=1,
+                            help="Random seed (default 1).")
+        parser.add_argument("--force", action="store_true",
+                            help="Allow running with DEBUG off.")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError(
+                "Refusing to seed with DEBUG off; pass --force if this "
+                "really is a throwaway database.")
+        if options["customers"] < 1:
+            raise CommandError("--customers must be at least 1")
+        if options["days"] < 0 or options["future_days"] < 0:
+            raise CommandError("--days and --future-days cannot be negative")
+        if not 0 < options["occupancy"] <= 1:
+            raise CommandError("--occupancy must be in (0, 1]")
+        if options["capacity"] < 1 or options["batch_size"] < 1:
+            raise CommandError(
+                "--capacity and --batch-size must be at least 1")
+
+        today = timezone.localdate()
+        first = today - timedelta(days=options["days"])
+        last = today + timedelta(days=options["future_days"] - 1)
+        if TimeSlotAvailability.objects.filter(
+                calendar_date__range=(first, last)).exists():
+            raise CommandError(
+                f"Availability rows already exist between {first} and "
+                f"{last}; seed an empty database or pick another range.")
+
+        started = time.perf_counter()
+        result = seeding.seed(
+            customers=options["customers"],
+            past_days=options["days"],
+            future_days=options["future_days"],
+            capacity=options["capacity"],
+            occupancy=options["occupancy"],
+            no_show_rate=options["no_show_rate"],
+            cancel_rate=options["cancel_rate"],
+            series_rate=options["series_rate"],
+            batch_size=options["batch_size"],
+            rng_seed=options["seed"],
+            stdout=self.stdout,
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {result.rows} rows in {elapsed:.1f}s: "
+            f"customers={result.customers}, days={result.days}, "
+            f"reservations={result.reservations}, series={result.series}, "
+            f"cancellations={result.cancellations}, "
+            f"no_shows={result.no_shows}, barred={result.barred}"
+        ))
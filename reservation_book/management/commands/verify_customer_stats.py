@@ -0,0 +1,110 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reservation_book.models import Customer, CustomerStats
+from reservation_book.services.lifecycle import compute_customer_stats
+
+# Nightly safety net for CustomerStats (run after sweep_no_shows, e.g. via
+# cron). The counters are maintained incrementally by
+# services/lifecycle.py; anything that bypasses those hooks (admin edits,
+# raw SQL, a crashed request) shows up here as drift.
+#
+# Customers are walked in primary-key batches: one grouped recount and one
+# stats read per batch. Without --fix the command only reports.
+
+
+class Command(BaseCommand):
+    help = "Recount CustomerStats and report (or --fix) any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true",
+                            help="Rewrite drifted or missing rows.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Customers per batch (default 1000).")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        fix = options["fix"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        last_pk = 0
+        scanned = 0
+        drifted = 0
+
+        while True:
+            ids = list(
+                Customer.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_pk = ids[-1]
+            scanned += len(ids)
+
+            with transaction.atomic():
+                drifted += self._check_batch(ids, fix)
+
+        if drifted and not fix:
+            self.stdout.write(self.style.WARNING(
+                f"CustomerStats drift: {drifted} of {scanned} customers "
+                f"(re-run with --fix)"
+            ))
+            return
+
+        verb = "fixed" if fix else "drifted"
+        self.stdout.write(self.style.SUCCESS(
+            f"CustomerStats verified: scanned={scanned}, {verb}={drifted}"
+        ))
+
+    def _check_batch(self, ids, fix):
+        """
+        With --fix the batch's stats rows are locked before recounting, so
+        a booking hook running concurrently applies its delta after the
+        rewrite instead of being overwritten by it.
+        """
+        fields = CustomerStats.COUNTER_FIELDS
+        zero = {field: 0 for field in fields}
+        stats = CustomerStats.objects.all()
+        if fix:
+            stats = stats.select_for_update()
+        drifted = 0
+
+        # Read (and lock) the stored rows first, then recount
+        stored = {
+            row["customer_id"]: row
+            for row in stats.filter(
+                customer_id__in=ids).values("customer_id", *fields)
+        }
+        expected = compute_customer_stats(ids)
+
+        to_create = []
+        to_update = []
+        for pk in ids:
+            want = expected.get(pk, zero)
+            have = stored.get(pk)
+            if have is None:
+                # Missing zero rows are fine; the overview coalesces
+                if want == zero:
+                    continue
+                to_create.append(CustomerStats(customer_id=pk, **want))
+            elif any(have[f] != want[f] for f in fields):
+                self.stdout.write(
+                    f"  customer #{pk}: "
+                    + ", ".join(
+                        f"{f} {have[f]}->{want[f]}"
+                        for f in fields if have[f] != want[f]
+                    )
+                )
+                to_update.append(CustomerStats(customer_id=pk, **want))
+            else:
+                continue
+            drifted += 1
+
+        if fix and to_create:
+            CustomerStats.objects.bulk_create(
+                to_create, ignore_conflicts=True)
+        if fix and to_update:
+            CustomerStats.objects.bulk_update(to_update, fields)
+        return drifted
@@ -0,0 +1,489 @@
+import atexit
+import bisect
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+# In-process Prometheus metrics, aggregated across workers.
+#
+# Counters and histograms live in memory in each process. When
+# METRICS_DIR is set, each process also keeps its own file there
+# (<pid>-<start>.json, atomic rename), rewritten by a background thread
+# at most every METRICS_FLUSH_SECONDS when something changed, and at
+# exit. The /metrics view sums all files in the directory (after writing
+# its own), so whichever worker answers the scrape reports for all of
+# them, at most one flush interval behind. Files of exited workers are
+# kept, so counters never go backwards; clear the directory when the
+# server starts. Without METRICS_DIR each process only reports itself
+# (fine for runserver).
+#
+# No client library or external service: exposition is the Prometheus
+# text format 0.0.4, rendered by render().
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+LOCK_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                5.0, 10.0)
+
+
+class _Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.values = {}
+        self.lock = threading.Lock()
+        # one writer at a time, so an older snapshot never replaces a
+        # newer one
+        self.flush_lock = threading.Lock()
+        self._reset_process()
+
+    def _reset_process(self):
+        # a forked worker (gunicorn --preload) starts from zero, and
+        # without the parent's flush thread
+        self.pid = os.getpid()
+        self.started = time.time_ns()
+        self.values = {}
+        self.dirty = False
+        self.flusher_pid = None
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def update(self, name, key, apply):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            return
+        with self.lock:
+            if os.getpid() != self.pid:
+                self._reset_process()
+            series = self.values.setdefault(name, {})
+            if key not in series and self.metrics[name].keep:
+                # a new series is rare; drop the expired ones then
+                self.metrics[name].prune(series)
+            series[key] = apply(series.get(key))
+            self.dirty = True
+            start_flusher = self.flusher_pid != self.pid
+            if start_flusher:
+                self.flusher_pid = self.pid
+        if start_flusher and self._directory() is not None:
+            threading.Thread(target=self._flush_loop, name="metrics-flush",
+                             daemon=True).start()
+
+    def _directory(self):
+        directory = getattr(settings, "METRICS_DIR", "")
+        return Path(directory) if directory else None
+
+    def _flush_loop(self):
+        pid = self.pid
+        while self.flusher_pid == pid:
+            time.sleep(getattr(settings, "METRICS_FLUSH_SECONDS", 1.0))
+            try:
+                self.flush()
+            except OSError:
+                pass  # retried on the next tick; the data stays in memory
+
+    def flush(self):
+        """Write this process's file if anything changed since the last
+        write (no-op without METRICS_DIR)."""
+        directory = self._directory()
+        if directory is None:
+            return
+        with self.flush_lock:
+            with self.lock:
+                if not self.dirty or os.getpid() != self.pid:
+                    return
+                snapshot = json.dumps(self.values)
+                path = directory / f"{self.pid}-{self.started}.json"
+                self.dirty = False
+            try:
+                directory.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                with os.fdopen(fd, "w") as handle:
+                    handle.write(snapshot)
+                os.replace(tmp, path)
+            except OSError:
+                self.dirty = True
+                raise
+
+    def collect(self):
+        """{name: {label_key: value}} summed over every process."""
+        directory = self._directory()
+        if directory is None:
+            with self.lock:
+                values = json.loads(json.dumps(self.values))
+            for name, series in values.items():
+                if self.metrics[name].keep:
+                    self.metrics[name].prune(series)
+            return values
+        self.flush()
+        merged = {}
+        for path in directory.glob("*.json"):
+            try:
+                values = json.loads(path.read_text())
+            except (OSError, ValueError):  # being replaced right now
+                continue
+            for name, series in values.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                if metric.keep:
+                    metric.prune(series)  # files of exited workers
+                into = merged.setdefault(name, {})
+                for key, value in series.items():
+                    into[key] = metric.merge(into.get(key), value)
+        return merged
+
+    def clear(self):
+        """Forget this process's samples (tests)."""
+        with self.lock:
+            self.values = {}
+
+
+REGISTRY = _Registry()
+atexit.register(REGISTRY.flush)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=(), exported=True,
+                 keep=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # unexported metrics are aggregated like the others but left out of
+        # /metrics (e.g. one series per date is too many for Prometheus)
+        self.exported = exported
+        # keep(labels) -> False expires a series (labels as strings)
+        self.keep = keep
+        REGISTRY.register(self)
+
+    def prune(self, series):
+        """Drop the series `keep` rejects, in place."""
+        for key in list(series):
+            if not self.keep(dict(zip(self.labelnames, json.loads(key)))):
+                del series[key]
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes labels {self.labelnames}, got "
+                f"{tuple(labels)}")
+        return json.dumps([str(labels[n]) for n in self.labelnames])
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, json.loads(key))) + list(extra)
+        if not pairs:
+            return ""
+        inner = ",".join(
+            f'{name}="{_escape(value)}"' for name, value in pairs)
+        return "{" + inner + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        REGISTRY.update(self.name, self._key(labels),
+                        lambda value: (value or 0) + amount)
+
+    @staticmethod
+    def merge(a, b):
+        return (a or 0) + b
+
+    def samples(self, series):
+        for key, value in sorted(series.items()):
+            yield f"{self.name}{self._labels(key)} {value}"
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # one timer per call, so concurrent requests don't share `start`
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start,
+                               **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """Stored as [count per bucket..., +Inf count, sum]."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS, exported=True, keep=None):
+        super().__init__(name, documentation, labelnames, exported, keep)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        index = bisect.bisect_left(self.buckets, value)
+
+        def apply(current):
+            current = current or [0] * (len(self.buckets) + 2)
+            current[index] += 1
+            current[-1] += value
+            return current
+
+        REGISTRY.update(self.name, self._key(labels), apply)
+
+    def time(self, **labels):
+        """Context manager / decorator observing the elapsed seconds."""
+        return _Timer(self, labels)
+
+    @staticmethod
+    def merge(a, b):
+        if a is None:
+            return list(b)
+        return [x + y for x, y in zip(a, b)]
+
+    def samples(self, series):
+        for key, value in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), value[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                yield (f"{self.name}_bucket"
+                       f"{self._labels(key, [('le', le)])} {cumulative}")
+            yield f"{self.name}_sum{self._labels(key)} {value[-1]}"
+            yield f"{self.name}_count{self._labels(key)} {cumulative}"
+
+
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n"))
+
+
+def render() -> str:
+    """Every registered metric in Prometheus text format."""
+    values = REGISTRY.collect()
+    lines = []
+    for name, metric in sorted(REGISTRY.metrics.items()):
+        if not metric.exported:
+            continue
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(metric.samples(values.get(name, {})))
+    return "\n".join(lines) + "\n"
+
+
+# --- metrics ---------------------------------------------------------------
+
+BOOKINGS = Counter(
+    "gambinos_bookings_total",
+    "Booking attempts by channel (online, phone) and result (created, "
+    "capacity, barred, validation, error).",
+    ("channel", "result"),
+)
+BOOKING_SECONDS = Histogram(
+    "gambinos_booking_seconds",
+    "Time from booking POST to commit (or rejection), excluding email.",
+    ("channel",),
+)
+CANCEL_SECONDS = Histogram(
+    "gambinos_cancel_seconds",
+    "Cancellation request latency.",
+)
+ROW_LOCK_WAIT_SECONDS = Histogram(
+    "gambinos_row_lock_wait_seconds",
+    "Time spent in SELECT ... FOR UPDATE, by table and call site (see "
+    "row_lock; no-op on SQLite).",
+    ("table", "site"),
+    buckets=LOCK_BUCKETS,
+)
+# Past service dates stop mattering for lock contention; without expiry
+# every date ever booked would stay in each worker's file.
+LOCK_DATES_KEPT = timedelta(days=7)
+
+
+def _recent_date(labels):
+    return labels["date"] >= str(timezone.localdate() - LOCK_DATES_KEPT)
+
+
+ROW_LOCK_WAIT_BY_DATE = Histogram(
+    "gambinos_row_lock_wait_by_date_seconds",
+    "Row-lock wait per service date and call site (see lock_hotspots); "
+    "dates more than LOCK_DATES_KEPT in the past are dropped.",
+    ("date", "site"),
+    buckets=LOCK_BUCKETS,
+    exported=False,
+    keep=_recent_date,
+)
+SWEEP_SECONDS = Histogram(
+    "gambinos_no_show_sweep_seconds",
+    "No-show sweep duration.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0),
+)
+SWEEP_ROWS = Counter(
+    "gambinos_no_show_sweep_rows_total",
+    "Reservations handled by the no-show sweep (scanned, marked_no_show, "
+    "barred_customers).",
+    ("outcome",),
+)
+EMAILS = Counter(
+    "gambinos_emails_total",
+    "Email messages handed to the mail backend, by result (sent, failed).",
+    ("result",),
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "gambinos_email_send_seconds",
+    "Time to hand a batch of messages to the real mail backend.",
+)
+CACHE_REQUESTS = Counter(
+    "gambinos_cache_requests_total",
+    "Cache lookups by cache and result (hit, miss); hit ratio = "
+    "hit / (hit + miss).",
+    ("cache", "result"),
+)
+
+
+CACHE_TIER_HITS = Counter(
+    "gambinos_cache_tier_hits_total",
+    "Cache hits by cache and the tier that answered (l1 in-process, l2 "
+    "shared).",
+    ("cache", "tier"),
+)
+
+
+def cache_lookup(cache, hit, tier=None):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    if hit and tier:
+        CACHE_TIER_HITS.inc(cache=cache, tier=tier)
+
+
+# --- hooks -----------------------------------------------------------------
+
+_FROM_TABLE = re.compile(r'\bFROM\s+"?(\w+)"?', re.IGNORECASE)
+
+
+_lock_tag = ContextVar("row_lock_tag", default=("other", None))
+
+
+@contextmanager
+def row_lock(site, day=None):
+    """
+    Tag the SELECT ... FOR UPDATE statements run inside the block with a
+    call site name and, when the rows belong to one service date, that
+    date:
+
+        with metrics.row_lock("make_reservation", day):
+            ts = TimeSlotAvailability.objects.select_for_update().get(...)
+    """
+    token = _lock_tag.set((site, day))
+    try:
+        yield
+    finally:
+        _lock_tag.reset(token)
+
+
+def _time_row_locks(execute, sql, params, many, context):
+    if "FOR UPDATE" not in sql:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        site, day = _lock_tag.get()
+        match = _FROM_TABLE.search(sql)
+        ROW_LOCK_WAIT_SECONDS.observe(
+            elapsed, table=match.group(1) if match else "unknown", site=site)
+        if day is not None:
+            ROW_LOCK_WAIT_BY_DATE.observe(elapsed, date=day, site=site)
+
+
+def install_lock_timer(sender, connection, **kwargs):
+    """connection_created receiver: time row locks on every connection."""
+    if _time_row_locks not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _time_row_locks)
+
+
+class MeteredEmailBackend(BaseEmailBackend):
+    """
+    EMAIL_BACKEND wrapper counting and timing sends; the real backend is
+    METRICS_EMAIL_BACKEND. Mail is sent inline (there is no outbox
+    queue), so send latency is what requests wait for.
+    """
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        self.backend = get_connection(
+            settings.METRICS_EMAIL_BACKEND, fail_silently=fail_silently,
+            **kwargs)
+
+    def open(self):
+        return self.backend.open()
+
+    def close(self):
+        return self.backend.close()
+
+    def send_messages(self, email_messages):
+        start = time.perf_counter()
+        try:
+            sent = self.backend.send_messages(email_messages)
+        except Exception:
+            EMAILS.inc(len(email_messages), result="failed")
+            raise
+        finally:
+            EMAIL_SEND_SECONDS.observe(time.perf_counter() - start)
+        sent = sent or 0
+        EMAILS.inc(sent, result="sent")
+        if len(email_messages) > sent:
+            EMAILS.inc(len(email_messages) - sent, result="failed")
+        return sent
+
+
+def lock_hotspots(limit=30):
+    """
+    Service dates ranked by total row-lock wait, over all workers:
+    [{"date", "waits", "wait_seconds", "p95_upper_seconds",
+      "sites": {site: waits}}].
+    p95_upper_seconds is the histogram bucket bound holding the 95th
+    percentile (None when it is above the largest bucket).
+    """
+    metric = ROW_LOCK_WAIT_BY_DATE
+    dates = {}
+    for key, value in REGISTRY.collect().get(metric.name, {}).items():
+        day, site = json.loads(key)
+        row = dates.setdefault(day, {
+            "date": day, "counts": [0] * (len(metric.buckets) + 1),
+            "wait_seconds": 0.0, "sites": {},
+        })
+        row["counts"] = [a + b for a, b in zip(row["counts"], value[:-1])]
+        row["wait_seconds"] += value[-1]
+        row["sites"][site] = row["sites"].get(site, 0) + sum(value[:-1])
+    rows = []
+    for row in dates.values():
+        counts = row.pop("counts")
+        row["waits"] = sum(counts)
+        row["p95_upper_seconds"] = None
+        seen = 0
+        for bound, count in zip(metric.buckets, counts):
+            seen += count
+            if seen >= 0.95 * row["waits"]:
+                row["p95_upper_seconds"] = bound
+                break
+        rows.append(row)
+    rows.sort(key=lambda r: -r["wait_seconds"])
+    return rows[:limit]
@@ -0,0 +1,386 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import empty
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from reservation_book import metrics
+
+logger = logging.getLogger("reservation_book.requests")
+profile_logger = logging.getLogger("reservation_book.profiling")
+
+# URL name of the view handling the current request ("" outside requests),
+# for code that only sees a query, e.g. the slow-query log.
+current_view = ContextVar("current_view", default="")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more SQL queries than its QUERY_BUDGETS entry allows."""
+
+
+class QueryCounter:
+    """Number and total time of the queries seen by count_queries()."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Counters of the count_queries() blocks the current context is in. A
+# context variable rather than a wrapper per connection: the async ORM
+# runs queries on a worker thread's connection, and sync_to_async carries
+# the caller's context there.
+_active_counters = ContextVar("query_counters", default=())
+
+
+def _count_query(execute, sql, params, many, context):
+    counters = _active_counters.get()
+    if not counters:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for counter in counters:
+            counter.count += 1
+            counter.seconds += elapsed
+
+
+def install_query_counter(sender=None, connection=None, **kwargs):
+    """connection_created receiver (apps.ready)."""
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+@contextmanager
+def count_queries():
+    """
+    Count and time the queries run inside the block, on every database
+    (and in sync_to_async calls made from it):
+        with count_queries() as counter:
+            ...
+        counter.count, counter.seconds
+    """
+    for conn in connections.all():
+        install_query_counter(connection=conn)
+    counter = QueryCounter()
+    token = _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+def _budget_for(view_name, method):
+    """
+    QUERY_BUDGETS maps a URL name to either a query limit for every
+    method or a {method: limit} dict, e.g.
+        {"make_reservation": {"GET": 5}, "staff_dashboard": 4}
+    """
+    budget = getattr(settings, "QUERY_BUDGETS", {}).get(view_name)
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+def _shows_server_timing(request):
+    if getattr(settings, "REQUEST_METRICS_SERVER_TIMING", False):
+        return True
+    # Only a user the request already loaded: loading one here would
+    # cost a session/user query on every anonymous page
+    user = getattr(request, "user", None)
+    user = getattr(user, "_wrapped", user)
+    return user is not None and user is not empty and bool(
+        getattr(user, "is_staff", False))
+
+
+class RequestMetricsMiddleware:
+    """
+    Per-request SQL count, SQL time and total time.
+
+    - Adds a Server-Timing header (db + total) for staff, or for everyone
+      with REQUEST_METRICS_SERVER_TIMING on (default: DEBUG). It tells
+      clients how much database work a page does.
+    - Logs one key=value line per request to "reservation_book.requests".
+    - Checks QUERY_BUDGETS: over budget is a warning in production and a
+      QueryBudgetExceeded error when QUERY_BUDGETS_STRICT is on (tests).
+
+    Put it near the top of MIDDLEWARE so queries made by the session and
+    auth middleware are counted too. Runs natively under WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django would run a sync process_view on a thread, with a
+            # copy of the context current_view lives in
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        start = time.perf_counter()
+        token = current_view.set("")
+        try:
+            with count_queries() as counter:
+                response = self.get_response(request)
+        finally:
+            current_view.reset(token)
+        return self._finish(request, response, counter, start)
+
+    async def _acall(self, request):
+        start = time.perf_counter()
+        token = current_view.set("")
+        try:
+            with count_queries() as counter:
+                response = await self.get_response(request)
+        finally:
+            current_view.reset(token)
+        return self._finish(request, response, counter, start)
+
+    def _finish(self, request, response, counter, start):
+        total = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else ""
+
+        if _shows_server_timing(request):
+            timing = (
+                f'db;dur={counter.seconds * 1000:.1f};'
+                f'desc="{counter.count} queries", '
+                f'total;dur={total * 1000:.1f}'
+            )
+            existing = response.get("Server-Timing")
+            response["Server-Timing"] = (
+                f"{existing}, {timing}" if existing else timing)
+
+        logger.info(
+            "request method=%s path=%s view=%s status=%s queries=%d "
+            "db_ms=%.1f total_ms=%.1f",
+            request.method, request.path, view_name or "-",
+            response.status_code, counter.count,
+            counter.seconds * 1000, total * 1000,
+        )
+
+        budget = _budget_for(view_name, request.method) if view_name else None
+        if budget is not None and counter.count > budget:
+            message = (
+                f"{request.method} {view_name} ran {counter.count} queries "
+                f"(budget {budget})"
+            )
+            if getattr(settings, "QUERY_BUDGETS_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning("query budget exceeded: %s", message)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        current_view.set(match.view_name if match else "")
+
+    async def _aprocess_view(self, request, *args):
+        RequestMetricsMiddleware.process_view(self, request, *args)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, also running natively under ASGI. WhiteNoise 6 is
+    sync-only, and one sync middleware makes Django run the rest of the
+    stack, async views included, on a worker thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        return super().__call__(request)
+
+    async def _acall(self, request):
+        if self.autorefresh or request.path_info in self.files:
+            # finding and opening the file is blocking I/O
+            response = await sync_to_async(
+                self._serve_path, thread_sensitive=False)(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    def _serve_path(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return None
+        return self.serve(static_file, request)
+
+
+# Modules holding execute wrappers; their frames are never the call site
+# of a query. Wrappers defined elsewhere add their own file.
+WRAPPER_FILES = {__file__, metrics.__file__}
+
+
+def call_site(root=None):
+    """
+    "path/to/file.py:123 function" of the innermost project frame (not
+    Django, not an execute wrapper) on the current stack.
+    """
+    root = str(root or settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        name = frame.filename
+        if (name.startswith(root) and "site-packages" not in name
+                and name not in WRAPPER_FILES):
+            where = Path(name).relative_to(root)
+            return f"{where}:{frame.lineno} {frame.name}"
+    return "<outside project>"
+
+
+class SQLCallSites:
+    """
+    connection.execute_wrapper() hook: SQL count and time per call site,
+    the innermost project frame (see call_site) that issued the query.
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            site = self.sites.setdefault(
+                call_site(self.root), {"count": 0, "seconds": 0.0, "sql": sql})
+            site["count"] += 1
+            site["seconds"] += elapsed
+
+    def report(self):
+        lines = []
+        for where, site in sorted(self.sites.items(),
+                                  key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{site['count']:5d} q {site['seconds'] * 1000:9.1f}"
+                         f" ms  {where}")
+            lines.append(f"{'':20}{' '.join(site['sql'].split())[:160]}")
+        return "\n".join(lines)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in cProfile of single requests, safe to leave deployed.
+
+    A request is profiled when PROFILING_ENABLED is on and one of:
+    - a staff user adds ?profile=1,
+    - the X-Profile header matches PROFILING_TOKEN (for curl/scripts),
+    - it is picked by PROFILING_SAMPLE_RATE (0.0-1.0).
+
+    Each profile writes <PROFILING_DIR>/<stamp>-<view>.prof (open with
+    snakeviz / pstats) and a .txt with the top PROFILING_TOP_N functions
+    by cumulative time and the SQL count/time per call site. The file
+    stem is returned in an X-Profile-Id header.
+
+    With PROFILING_ENABLED off the middleware removes itself at startup
+    (MiddlewareNotUsed), so it costs nothing per request. It belongs at
+    the end of MIDDLEWARE so it profiles the view, after auth has run.
+    When enabled it is sync-only: under ASGI every request then runs on
+    a thread, as it would under the WSGI worker.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = Path(getattr(settings, "PROFILING_DIR",
+                                      settings.BASE_DIR / "profiles"))
+        self.sample_rate = float(
+            getattr(settings, "PROFILING_SAMPLE_RATE", 0.0))
+        self.token = getattr(settings, "PROFILING_TOKEN", "")
+        self.top_n = int(getattr(settings, "PROFILING_TOP_N", 40))
+
+    def _wanted(self, request):
+        if request.GET.get("profile") == "1":
+            user = getattr(request, "user", None)
+            if user is not None and user.is_staff:
+                return True
+        if self.token and request.headers.get("X-Profile") == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self._wanted(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        sites = SQLCallSites(settings.BASE_DIR)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(sites))
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler active in this thread
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        try:
+            stem = self._write(request, profiler, sites, elapsed)
+        except OSError:
+            profile_logger.exception("could not write profile")
+        else:
+            response["X-Profile-Id"] = stem
+        return response
+
+    def _write(self, request, profiler, sites, elapsed):
+        match = getattr(request, "resolver_match", None)
+        view_name = (match.view_name if match else "") or "unresolved"
+        stem = (f"{timezone.now():%Y%m%dT%H%M%S%f}-"
+                f"{view_name.replace(':', '.')}-{request.method}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self.directory / f"{stem}.prof")
+
+        out = io.StringIO()
+        out.write(f"{request.method} {request.get_full_path()} "
+                  f"view={view_name} total_ms={elapsed * 1000:.1f}\n\n")
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        out.write("\nSQL by call site\n\n")
+        out.write(sites.report() or "(no queries)")
+        out.write("\n")
+        (self.directory / f"{stem}.txt").write_text(out.getvalue())
+
+        profile_logger.info("profile written: %s (%s %s, %.1f ms)", stem,
+                            request.method, request.path, elapsed * 1000)
+        return stem
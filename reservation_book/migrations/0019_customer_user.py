@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reservation_book', '0018_customer_phone_e164'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='customer', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_book', '0019_customer_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cancellationevent',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cancellation_events', to='reservation_book.customer'),
+        ),
+        migrations.AddField(
+            model_name='noshowevent',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='no_show_events', to='reservation_book.customer'),
+        ),
+        migrations.AddIndex(
+            model_name='cancellationevent',
+            index=models.Index(fields=['customer', 'created_at'], name='rb_cancel_cust_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noshowevent',
+            index=models.Index(fields=['customer', 'created_at'], name='rb_noshow_cust_created_idx'),
+        ),
+    ]
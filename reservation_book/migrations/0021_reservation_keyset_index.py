@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_book', '0020_event_customer'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tablereservation',
+            index=models.Index(fields=['-reservation_date', 'time_slot', 'id'], name='rb_res_date_slot_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_book', '0021_reservation_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reservation_book.customer')),
+                ('reservations', models.IntegerField(default=0)),
+                ('active_reservations', models.IntegerField(default=0)),
+                ('tables_booked', models.IntegerField(default=0)),
+                ('active_tables_booked', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+BATCH_SIZE = 1000
+
+
+def seed_customer_stats(apps, schema_editor):
+    """
+    One grouped aggregate per batch of customers; a stats row is written
+    for every customer (zeros when they have no reservations).
+    """
+    Customer = apps.get_model("reservation_book", "Customer")
+    CustomerStats = apps.get_model("reservation_book", "CustomerStats")
+    TableReservation = apps.get_model("reservation_book", "TableReservation")
+
+    active = Q(status="active")
+    last_pk = 0
+    while True:
+        ids = list(
+            Customer.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        last_pk = ids[-1]
+
+        counts = {
+            row["customer_id"]: row
+            for row in (
+                TableReservation.objects
+                .filter(customer_id__in=ids)
+                .values("customer_id")
+                .annotate(
+                    reservations=Count("id"),
+                    active_reservations=Count("id", filter=active),
+                    tables_booked=Sum("number_of_tables_required_by_patron"),
+                    active_tables_booked=Sum(
+                        "number_of_tables_required_by_patron",
+                        filter=active,
+                    ),
+                )
+                .order_by()
+            )
+        }
+        CustomerStats.objects.bulk_create(
+            [
+                CustomerStats(
+                    customer_id=pk,
+                    reservations=counts.get(pk, {}).get("reservations") or 0,
+                    active_reservations=counts.get(pk, {}).get(
+                        "active_reservations") or 0,
+                    tables_booked=counts.get(pk, {}).get(
+                        "tables_booked") or 0,
+                    active_tables_booked=counts.get(pk, {}).get(
+                        "active_tables_booked") or 0,
+                )
+                for pk in ids
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_book', '0022_customer_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_customer_stats, migrations.RunPython.noop),
+    ]
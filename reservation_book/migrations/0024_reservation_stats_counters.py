@@ -0,0 +1,64 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:27
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def seed_counters(apps, schema_editor):
+    ReservationStats = apps.get_model("reservation_book", "ReservationStats")
+    TableReservation = apps.get_model("reservation_book", "TableReservation")
+    CancellationEvent = apps.get_model(
+        "reservation_book", "CancellationEvent")
+    NoShowEvent = apps.get_model("reservation_book", "NoShowEvent")
+    Customer = apps.get_model("reservation_book", "Customer")
+
+    counts = TableReservation.objects.aggregate(
+        total_reservations=Count("id"),
+        active_reservations=Count("id", filter=Q(status="active")),
+        phone_reservations=Count("id", filter=Q(is_phone_reservation=True)),
+    )
+    ReservationStats.objects.update_or_create(
+        pk=1,
+        defaults=dict(
+            counts,
+            cancelled_count=CancellationEvent.objects.count(),
+            no_show_count=NoShowEvent.objects.count(),
+            customers_count=Customer.objects.count(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_book', '0023_seed_customer_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservationstats',
+            name='active_reservations',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reservationstats',
+            name='customers_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reservationstats',
+            name='no_show_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reservationstats',
+            name='phone_reservations',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reservationstats',
+            name='total_reservations',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_book', '0024_reservation_stats_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tablereservation',
+            index=models.Index(fields=['reservation_date', 'status'], name='rb_res_date_status_idx'),
+        ),
+    ]
@@ -7,6 +7,7 @@ from django.db import models
 from django.contrib.auth.models import User
 
 from .constants import SLOT_LABELS
+from .services.phones import to_e164
 # from django.contrib.postgres.fields import JSONField
 
 DURATION_CHOICES = [
@@ -33,8 +34,25 @@ class Customer(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     email = models.EmailField(unique=True, null=True, blank=True)
+
+    # Website account for this customer (set at signup / by backfill).
+    # Request paths resolve the customer through this link.
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="customer",
+    )
     phone = models.CharField(max_length=20, blank=True)
     mobile = models.CharField(max_length=20, blank=True)
+
+    # E.164 copies of phone/mobile (derived in save(), indexed for lookup)
+    phone_e164 = models.CharField(
+        max_length=20, blank=True, default="", db_index=True, editable=False)
+    mobile_e164 = models.CharField(
+        max_length=20, blank=True, default="", db_index=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -65,6 +83,22 @@ class Customer(models.Model):
             base += " [BARRED]"
         return base
 
+    def save(self, *args, **kwargs):
+        # Keep the normalized phone columns in step with the free-text ones
+        self.phone_e164 = to_e164(self.phone)
+        self.mobile_e164 = to_e164(self.mobile)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if "phone" in update_fields:
+                update_fields.add("phone_e164")
+            if "mobile" in update_fields:
+                update_fields.add("mobile_e164")
+            kwargs["update_fields"] = update_fields
+
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['last_name', 'first_name']
         verbose_name = "Customer"
@@ -343,6 +377,20 @@ class TableReservation(models.Model):
         """Mark reservation as no-show (guest never arrived)."""
         self.status = self.STATUS_NO_SHOW
 
+    class Meta:
+        indexes = [
+            # Staff list: date window + keyset on (-date, slot, id)
+            models.Index(
+                fields=["-reservation_date", "time_slot", "id"],
+                name="rb_res_date_slot_id_idx",
+            ),
+            # Floor view: today's rows by status, and its delta polling
+            models.Index(
+                fields=["reservation_date", "status"],
+                name="rb_res_date_status_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         """
         Human-readable representation for admin and delete confirmation.
@@ -385,6 +433,17 @@ class CancellationEvent(models.Model):
     customer_email = models.EmailField(blank=True, default="", db_index=True)
     cancelled_by_staff = models.BooleanField(default=False)
 
+    # History/ban queries go through (customer, created_at); the email
+    # above is kept as a snapshot of who cancelled.
+    customer = models.ForeignKey(
+        "Customer",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name="cancellation_events",
+    )
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -392,6 +451,12 @@ class CancellationEvent(models.Model):
                 name="uniq_cancellationevent_reservation_id",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["customer", "created_at"],
+                name="rb_cancel_cust_created_idx",
+            ),
+        ]
         ordering = ["-created_at"]
 
     def __str__(self):
@@ -415,6 +480,15 @@ class NoShowEvent(models.Model):
     customer_email = models.EmailField(blank=True, default="", db_index=True)
     marked_by_staff = models.BooleanField(default=False)
 
+    customer = models.ForeignKey(
+        "Customer",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name="no_show_events",
+    )
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -422,6 +496,12 @@ class NoShowEvent(models.Model):
                 name="uniq_noshowevent_reservation_id",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["customer", "created_at"],
+                name="rb_noshow_cust_created_idx",
+            ),
+        ]
         ordering = ["-created_at"]
 
     def __str__(self):
@@ -526,6 +606,48 @@ class ReservationSeries(models.Model):
         return f"{label} (#{self.pk})"
 
 
+class CustomerStats(models.Model):
+    """
+    Per-customer reservation counters for the staff overview, so the page
+    reads one row per customer instead of aggregating over every
+    reservation.
+
+    Kept in step by services/lifecycle.py at booking, cancel, no-show,
+    complete and edit time; `manage.py verify_customer_stats --fix` is the
+    nightly safety net. "Active" means status=ACTIVE: past active rows
+    leave that state when the no-show sweep runs.
+
+    Cancellations and no-shows stay on Customer (cancelled rows are
+    deleted, so they cannot be recounted from TableReservation).
+    """
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    # Signed on purpose: a drifted counter must never make a booking fail
+    reservations = models.IntegerField(default=0)
+    active_reservations = models.IntegerField(default=0)
+    tables_booked = models.IntegerField(default=0)
+    active_tables_booked = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = (
+        "reservations",
+        "active_reservations",
+        "tables_booked",
+        "active_tables_booked",
+    )
+
+    def __str__(self) -> str:
+        return (
+            f"CustomerStats(customer={self.customer_id}, "
+            f"reservations={self.reservations}, "
+            f"active={self.active_reservations})"
+        )
+
+
 class ReservationStats(models.Model):
     """
     Single-row stats table for lightweight counters.
@@ -533,22 +655,44 @@ class ReservationStats(models.Model):
     Mentor requirement:
     - cancelled reservations must be DELETED from TableReservation
     - but staff dashboard still needs a cancellation count
+
+    All counters are bumped with F() expressions by services/lifecycle.py
+    (and the Customer signals), so the staff dashboard is a single-row
+    read. `manage.py recount_reservation_stats` corrects any drift.
     """
     id = models.PositiveSmallIntegerField(
         primary_key=True, default=1, editable=False)
 
     cancelled_count = models.PositiveIntegerField(default=0)
+    # Signed on purpose: a drifted counter must never make a booking fail
+    total_reservations = models.IntegerField(default=0)
+    active_reservations = models.IntegerField(default=0)
+    phone_reservations = models.IntegerField(default=0)
+    no_show_count = models.IntegerField(default=0)
+    customers_count = models.IntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
+    COUNTER_FIELDS = (
+        "cancelled_count",
+        "total_reservations",
+        "active_reservations",
+        "phone_reservations",
+        "no_show_count",
+        "customers_count",
+    )
+
     @classmethod
     def get_solo(cls):
         obj, _ = cls.objects.get_or_create(pk=1)
         return obj
 
     def bump_cancelled(self, n: int = 1):
-        # avoids race conditions when used inside transaction.atomic()
-        self.cancelled_count = (self.cancelled_count or 0) + int(n)
-        self.save(update_fields=["cancelled_count", "updated_at"])
+        # Single UPDATE, so concurrent cancellations cannot lose a count
+        type(self).objects.filter(pk=self.pk).update(
+            cancelled_count=models.F("cancelled_count") + int(n),
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=["cancelled_count", "updated_at"])
 
     def __str__(self) -> str:
         return f"ReservationStats(cancelled_count={self.cancelled_count})"
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from reservation_book import metrics
+from reservation_book.models import Customer, NoShowEvent, TableReservation
+from reservation_book.services.lifecycle import reservations_status_changed
+
+# Close out a night in one request: complete or no-show many reservations.
+#
+# Each action locks the eligible rows, moves them with a single UPDATE,
+# writes NoShowEvents with one bulk_create, applies the stats deltas once
+# per customer and evaluates bans once per customer. Ineligible ids are
+# reported back with a reason instead of failing the whole batch.
+
+MAX_BULK_IDS = 500
+
+DEFAULT_BAN_THRESHOLD = 3
+DEFAULT_BAN_WINDOW_DAYS = 90
+
+_ROW_FIELDS = (
+    "id", "customer_id", "status", "reservation_date", "time_slot",
+    "duration_hours", "number_of_tables_required_by_patron",
+    "customer__email",
+)
+
+
+@dataclass
+class BulkActionResult:
+    action: str
+    updated: list[int] = field(default_factory=list)
+    skipped: dict[int, str] = field(default_factory=dict)
+    barred_customers: list[int] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "action": self.action,
+            "updated": self.updated,
+            "updated_count": len(self.updated),
+            # JSON object keys are strings anyway
+            "skipped": {str(k): v for k, v in self.skipped.items()},
+            "skipped_count": len(self.skipped),
+            "barred_customers": self.barred_customers,
+        }
+
+
+def _lock_rows(ids) -> dict[int, dict]:
+    rows = (
+        TableReservation.objects
+        .select_for_update(of=("self",))
+        .filter(pk__in=ids)
+        .order_by("pk")
+        .values(*_ROW_FIELDS)
+    )
+    with metrics.row_lock("staff_bulk_action"):
+        return {row["id"]: row for row in rows}
+
+
+def _skip_reason(row, eligible) -> str:
+    if row is None:
+        return "not found"
+    if row["status"] != TableReservation.STATUS_ACTIVE:
+        return f"already {row['status']}"
+    if not eligible:
+        return "not allowed yet"
+    return ""
+
+
+def _partition(result, ids, rows, is_eligible) -> list[dict]:
+    moving = []
+    for pk in ids:
+        row = rows.get(pk)
+        reason = _skip_reason(row, row is not None and is_eligible(row))
+        if reason:
+            result.skipped[pk] = reason
+        else:
+            moving.append(row)
+    return moving
+
+
+@transaction.atomic
+def bulk_complete(ids, *, now=None) -> BulkActionResult:
+    """Complete active reservations dated today."""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    result = BulkActionResult(action="complete")
+
+    rows = _lock_rows(ids)
+    moving = _partition(
+        result, ids, rows, lambda row: row["reservation_date"] == today)
+    if not moving:
+        return result
+
+    TableReservation.objects.filter(
+        pk__in=[row["id"] for row in moving]
+    ).update(
+        status=TableReservation.STATUS_COMPLETED,
+        reservation_status=True,
+        completed_at=now,
+        updated_at=now,
+    )
+    reservations_status_changed(
+        [(r["customer_id"], r["number_of_tables_required_by_patron"])
+         for r in moving],
+        TableReservation.STATUS_ACTIVE,
+        TableReservation.STATUS_COMPLETED,
+    )
+    result.updated = [row["id"] for row in moving]
+    return result
+
+
+@transaction.atomic
+def bulk_no_show(ids, *, now=None,
+                 ban_threshold: int = DEFAULT_BAN_THRESHOLD,
+                 window_days: int = DEFAULT_BAN_WINDOW_DAYS,
+                 ) -> BulkActionResult:
+    """
+    No-show active reservations from past service dates. Uses the same
+    eligibility and ban rules as the single mark_no_show view.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    result = BulkActionResult(action="no_show")
+
+    rows = _lock_rows(ids)
+    moving = _partition(
+        result, ids, rows, lambda row: row["reservation_date"] < today)
+    if not moving:
+        return result
+
+    moving_ids = [row["id"] for row in moving]
+    TableReservation.objects.filter(pk__in=moving_ids).update(
+        status=TableReservation.STATUS_NO_SHOW,
+        reservation_status=True,
+        updated_at=now,
+    )
+
+    # Events may already exist for a reservation that was moved back to
+    # active by hand; those keep their original row and are not counted
+    # twice (same as the get_or_create in mark_no_show).
+    existing = set(
+        NoShowEvent.objects.filter(reservation_id__in=moving_ids)
+        .values_list("reservation_id", flat=True)
+    )
+    NoShowEvent.objects.bulk_create(
+        [
+            NoShowEvent(
+                reservation_id=row["id"],
+                reservation_date=row["reservation_date"],
+                time_slot=row["time_slot"] or "",
+                tables=int(row["number_of_tables_required_by_patron"] or 0),
+                duration_slots=int(row["duration_hours"] or 1),
+                customer_email=(
+                    row["customer__email"] or "").strip().lower(),
+                customer_id=row["customer_id"],
+                marked_by_staff=True,
+            )
+            for row in moving if row["id"] not in existing
+        ],
+        ignore_conflicts=True,
+    )
+    reservations_status_changed(
+        [(r["customer_id"], r["number_of_tables_required_by_patron"])
+         for r in moving],
+        TableReservation.STATUS_ACTIVE,
+        TableReservation.STATUS_NO_SHOW,
+    )
+
+    new_events = Counter(
+        row["customer_id"] for row in moving
+        if row["customer_id"] and row["id"] not in existing
+    )
+    for customer_id, count in new_events.items():
+        Customer.objects.filter(pk=customer_id).update(
+            no_show_count=F("no_show_count") + count)
+
+    result.updated = moving_ids
+    result.barred_customers = _apply_bans(
+        new_events, now, ban_threshold, window_days)
+    return result
+
+
+def _apply_bans(customer_ids, now, threshold, window_days) -> list[int]:
+    """
+    One grouped count over the (customer, created_at) index for every
+    affected customer, then one UPDATE for those over the threshold.
+    Returns the newly barred customer ids.
+    """
+    if not customer_ids:
+        return []
+    cutoff = now - timedelta(days=window_days)
+    over = [
+        row["customer_id"]
+        for row in (
+            NoShowEvent.objects
+            .filter(customer_id__in=list(customer_ids),
+                    created_at__gte=cutoff)
+            .values("customer_id")
+            .annotate(n=Count("id"))
+            .filter(n__gte=threshold)
+            .order_by()
+        )
+    ]
+    if not over:
+        return []
+    barred = sorted(
+        Customer.objects.select_for_update()
+        .filter(pk__in=over, barred=False)
+        .values_list("pk", flat=True)
+    )
+    Customer.objects.filter(pk__in=barred).update(barred=True)
+    return barred
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.db.models.functions import Concat, Lower, Trim
+from django.utils import timezone
+
+from reservation_book.models import (
+    CancellationEvent,
+    Customer,
+    NoShowEvent,
+    ReservationSeries,
+    TableReservation,
+)
+from reservation_book.services.lifecycle import refresh_customer_stats
+
+
+@dataclass
+class DuplicateCluster:
+    key: str
+    survivor_id: int
+    duplicate_ids: list[int]
+    reservations: int = 0
+    series: int = 0
+    cancellations_count: int = 0
+    no_show_count: int = 0
+
+
+@dataclass
+class MergeReport:
+    dry_run: bool
+    clusters: list[DuplicateCluster] = field(default_factory=list)
+    merged_customers: int = 0
+    moved_reservations: int = 0
+    moved_series: int = 0
+    last_key: str | None = None
+
+
+def _duplicate_key():
+    """
+    Identity key for a Customer row:
+    - "e:<email>" (trimmed, lower-cased) when the row has an email
+    - "p:<e164>:<first>:<last>" for email-less rows with a phone, so two
+      differently formatted numbers for the same named guest collapse
+    - NULL otherwise (never clustered)
+    """
+    has_email = Q(email__isnull=False) & ~Q(email="")
+    has_phone = ~Q(phone_e164="")
+    return Case(
+        When(has_email, then=Concat(Value("e:"), Lower(Trim("email")))),
+        When(
+            has_phone,
+            then=Concat(
+                Value("p:"), "phone_e164",
+                Value(":"), Lower(Trim("first_name")),
+                Value(":"), Lower(Trim("last_name")),
+            ),
+        ),
+        default=None,
+        output_field=CharField(),
+    )
+
+
+def find_duplicate_keys(*, after: str | None = None,
+                        limit: int = 100) -> list[str]:
+    """
+    One grouped query: identity keys shared by more than one customer,
+    in key order, starting after `after` (keyset pagination).
+    """
+    qs = (
+        Customer.objects
+        .annotate(dup_key=_duplicate_key())
+        .exclude(dup_key__isnull=True)
+        .values("dup_key")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .order_by("dup_key")
+    )
+    if after is not None:
+        qs = qs.filter(dup_key__gt=after)
+    return [row["dup_key"] for row in qs[:limit]]
+
+
+def _pick_survivor(members: list[Customer]) -> Customer:
+    """
+    Keep the row linked to a website account, then the one whose email is
+    already normalized, then the oldest.
+    """
+    def rank(c):
+        email = c.email or ""
+        return (
+            0 if c.user_id else 1,
+            0 if email == email.strip().lower() else 1,
+            c.pk,
+        )
+    return min(members, key=rank)
+
+
+def plan_clusters(keys: list[str]) -> list[DuplicateCluster]:
+    if not keys:
+        return []
+
+    members = (
+        Customer.objects
+        .annotate(dup_key=_duplicate_key())
+        .filter(dup_key__in=keys)
+        .annotate(
+            n_reservations=Count("reservations", distinct=True),
+            n_series=Count("reservation_series", distinct=True),
+        )
+        .order_by("dup_key", "pk")
+    )
+
+    grouped: dict[str, list[Customer]] = {}
+    for c in members:
+        grouped.setdefault(c.dup_key, []).append(c)
+
+    clusters = []
+    for key in keys:
+        rows = grouped.get(key) or []
+        if len(rows) < 2:
+            continue
+        survivor = _pick_survivor(rows)
+        dups = [c for c in rows if c.pk != survivor.pk]
+        clusters.append(DuplicateCluster(
+            key=key,
+            survivor_id=survivor.pk,
+            duplicate_ids=[c.pk for c in dups],
+            reservations=sum(c.n_reservations for c in dups),
+            series=sum(c.n_series for c in dups),
+            cancellations_count=sum(c.cancellations_count for c in dups),
+            no_show_count=sum(c.no_show_count for c in dups),
+        ))
+    return clusters
+
+
+@transaction.atomic
+def merge_cluster(cluster: DuplicateCluster) -> tuple[int, int]:
+    """
+    Fold cluster.duplicate_ids into cluster.survivor_id.
+
+    Locks only the cluster's Customer rows, so concurrent bookings for
+    other guests are unaffected. A booking racing against this merge for
+    one of the duplicates blocks on the row lock and then fails on the
+    foreign key instead of being silently cascaded away.
+
+    Returns (moved_reservations, moved_series).
+    """
+    ids = [cluster.survivor_id, *cluster.duplicate_ids]
+    locked = {
+        c.pk: c
+        for c in Customer.objects.select_for_update().filter(
+            pk__in=ids).order_by("pk")
+    }
+    survivor = locked.get(cluster.survivor_id)
+    dups = [locked[pk] for pk in cluster.duplicate_ids if pk in locked]
+    if survivor is None or not dups:
+        # Someone merged/deleted these since planning; nothing to do
+        return 0, 0
+    dup_ids = [c.pk for c in dups]
+
+    moved_reservations = TableReservation.objects.filter(
+        customer_id__in=dup_ids,
+    ).update(customer_id=survivor.pk, updated_at=timezone.now())
+    moved_series = ReservationSeries.objects.filter(
+        customer_id__in=dup_ids,
+    ).update(customer_id=survivor.pk)
+    CancellationEvent.objects.filter(customer_id__in=dup_ids).update(
+        customer_id=survivor.pk)
+    NoShowEvent.objects.filter(customer_id__in=dup_ids).update(
+        customer_id=survivor.pk)
+
+    survivor.cancellations_count += sum(c.cancellations_count for c in dups)
+    survivor.no_show_count += sum(c.no_show_count for c in dups)
+    survivor.barred = survivor.barred or any(c.barred for c in dups)
+
+    for name in ("first_name", "last_name", "phone", "mobile"):
+        if not (getattr(survivor, name) or "").strip():
+            for c in dups:
+                value = (getattr(c, name) or "").strip()
+                if value:
+                    setattr(survivor, name, value)
+                    break
+
+    notes = [survivor.notes.strip()] if survivor.notes.strip() else []
+    for c in dups:
+        note = (c.notes or "").strip()
+        if note and note not in notes:
+            notes.append(note)
+    survivor.notes = "\n".join(notes)
+
+    inherited_user_id = None
+    if not survivor.user_id:
+        inherited_user_id = next((c.user_id for c in dups if c.user_id),
+                                 None)
+
+    # Duplicates go first: they hold the unique email / user values
+    Customer.objects.filter(pk__in=dup_ids).delete()
+
+    if inherited_user_id:
+        survivor.user_id = inherited_user_id
+    if survivor.email:
+        survivor.email = survivor.email.strip().lower()
+    survivor.save()
+    if moved_reservations:
+        refresh_customer_stats(survivor.pk)
+
+    return moved_reservations, moved_series
+
+
+def merge_duplicates(*, dry_run: bool = True, batch_size: int = 100,
+                     limit: int | None = None,
+                     after: str | None = None) -> MergeReport:
+    """
+    Walk duplicate clusters in key order, `batch_size` keys per grouped
+    query, merging each cluster in its own short transaction.
+    `limit` caps the number of clusters handled in this run; the report's
+    `last_key` can be passed back as `after` to continue.
+    """
+    report = MergeReport(dry_run=dry_run)
+    cursor = after
+
+    while limit is None or len(report.clusters) < limit:
+        take = batch_size
+        if limit is not None:
+            take = min(take, limit - len(report.clusters))
+        keys = find_duplicate_keys(after=cursor, limit=take)
+        if not keys:
+            break
+        cursor = keys[-1]
+
+        for cluster in plan_clusters(keys):
+            report.clusters.append(cluster)
+            if dry_run:
+                continue
+            moved, series = merge_cluster(cluster)
+            report.merged_customers += len(cluster.duplicate_ids)
+            report.moved_reservations += moved
+            report.moved_series += series
+
+    report.last_key = cursor
+    return report
+
+
+def merge_customers_for_email(email: str) -> Customer | None:
+    """
+    Collapse every Customer row sharing `email` (case/whitespace
+    variants) and return the survivor. Used at signup, so a new account
+    picks up all of its guest history.
+    """
+    key = f"e:{(email or '').strip().lower()}"
+    if key == "e:":
+        return None
+
+    clusters = plan_clusters([key])
+    for cluster in clusters:
+        merge_cluster(cluster)
+        return Customer.objects.filter(pk=cluster.survivor_id).first()
+    return None
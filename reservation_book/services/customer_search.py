@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from reservation_book import metrics
+from reservation_book.models import Customer
+from reservation_book.services.phones import phone_digit_variants
+
+logger = logging.getLogger(__name__)
+
+# Trigram postings cover queries of 3+ characters. Shorter queries
+# (the lookup view accepts 2 characters) are answered by a linear scan
+# over the in-memory entries, which is still far cheaper than a DB trip.
+GRAM_SIZE = 3
+
+# Fields kept per customer, in the order they are stored in an entry.
+INDEXED_FIELDS = (
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "mobile",
+    "phone_e164",
+    "mobile_e164",
+)
+
+
+@dataclass(frozen=True)
+class CustomerEntry:
+    pk: int
+    first_name: str
+    last_name: str
+    email: str
+    phone: str
+    mobile: str
+    phone_e164: str = ""
+    mobile_e164: str = ""
+
+    @property
+    def sort_key(self):
+        # Mirrors Customer.Meta.ordering (last_name, first_name)
+        return (self.last_name.lower(), self.first_name.lower(), self.pk)
+
+    def haystacks(self) -> list[str]:
+        texts = [
+            (value or "").lower()
+            for value in (
+                self.first_name,
+                self.last_name,
+                self.email,
+                self.phone,
+                self.mobile,
+            )
+            if value
+        ]
+        # E.164 digits without "+", so partial digit runs match
+        texts.extend(
+            value.lstrip("+")
+            for value in (self.phone_e164, self.mobile_e164)
+            if value
+        )
+        return texts
+
+    def as_result(self) -> dict:
+        """Same shape ajax_lookup_customer returns for customer rows."""
+        return {
+            "type": "customer",
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "email": self.email,
+            "phone": self.phone,
+            "mobile": self.mobile,
+        }
+
+
+def _grams(text: str) -> set[str]:
+    if len(text) < GRAM_SIZE:
+        return set()
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def _entry_from_values(values) -> CustomerEntry:
+    pk, *fields = values
+    return CustomerEntry(pk, *[(value or "") for value in fields])
+
+
+class CustomerSearchIndex:
+    """
+    In-process trigram index over Customer names, emails and phones.
+
+    - `rebuild()` loads every customer once (chunked) and swaps the new
+      postings in under a lock, so searches never see a half-built index.
+    - `upsert()` / `remove()` keep it current from Customer signals.
+    - `search()` returns None while the index is cold so callers can fall
+      back to the database.
+
+    Each worker process holds its own copy. Signals only fire in the worker
+    that wrote the row, so entries older than `max_age` seconds trigger a
+    background rebuild to pick up changes made by other workers.
+    """
+
+    def __init__(self, max_age: int | None = None):
+        self._lock = threading.RLock()
+        self._entries: dict[int, CustomerEntry] = {}
+        self._postings: dict[str, set[int]] = {}
+        self._ready = False
+        self._building = False
+        self._pending: list[tuple[str, object]] = []
+        self._built_at = 0.0
+        self._max_age = max_age
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    @property
+    def is_ready(self) -> bool:
+        return self._ready
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _stale(self) -> bool:
+        max_age = self._max_age
+        if max_age is None:
+            max_age = getattr(settings, "CUSTOMER_SEARCH_INDEX_MAX_AGE", 300)
+        if not max_age:
+            return False
+        return (time.monotonic() - self._built_at) > max_age
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+            self._postings = {}
+            self._pending = []
+            self._ready = False
+
+    # ------------------------------------------------------------------
+    # Build / incremental maintenance
+    # ------------------------------------------------------------------
+    def rebuild(self, chunk_size: int = 2000) -> int:
+        """
+        Load all customers and atomically replace the index.
+        Returns the number of customers indexed.
+        """
+        with self._lock:
+            if self._building:
+                return len(self._entries)
+            self._building = True
+            self._pending = []
+
+        try:
+            entries: dict[int, CustomerEntry] = {}
+            postings: dict[str, set[int]] = {}
+
+            rows = (
+                Customer.objects
+                .order_by()
+                .values_list("pk", *INDEXED_FIELDS)
+                .iterator(chunk_size=chunk_size)
+            )
+            for values in rows:
+                entry = _entry_from_values(values)
+                entries[entry.pk] = entry
+                self._add_postings(postings, entry)
+
+            with self._lock:
+                self._entries = entries
+                self._postings = postings
+
+                # Replay writes that happened while we were loading
+                for op, payload in self._pending:
+                    if op == "upsert":
+                        self._upsert_locked(payload)
+                    else:
+                        self._remove_locked(payload)
+                self._pending = []
+
+                self._ready = True
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._building = False
+
+        logger.info("Customer search index built: %s customers", len(entries))
+        return len(entries)
+
+    def rebuild_in_background(self) -> None:
+        if self._building:
+            return
+        thread = threading.Thread(
+            target=self._safe_rebuild,
+            name="customer-search-index",
+            daemon=True,
+        )
+        thread.start()
+
+    def _safe_rebuild(self) -> None:
+        from django.db import connections
+
+        try:
+            self.rebuild()
+        except Exception:
+            # A cold index only means lookups go to the DB.
+            logger.exception("Customer search index build failed")
+        finally:
+            # Connections are per-thread; don't leak this one
+            connections.close_all()
+
+    def upsert(self, customer: Customer) -> None:
+        entry = _entry_from_values(
+            [customer.pk]
+            + [getattr(customer, name) for name in INDEXED_FIELDS]
+        )
+        with self._lock:
+            if self._building:
+                self._pending.append(("upsert", entry))
+            if self._ready:
+                self._upsert_locked(entry)
+
+    def remove(self, pk: int) -> None:
+        with self._lock:
+            if self._building:
+                self._pending.append(("remove", pk))
+            if self._ready:
+                self._remove_locked(pk)
+
+    @staticmethod
+    def _add_postings(postings, entry: CustomerEntry) -> None:
+        for text in entry.haystacks():
+            for gram in _grams(text):
+                postings.setdefault(gram, set()).add(entry.pk)
+
+    def _upsert_locked(self, entry: CustomerEntry) -> None:
+        self._remove_locked(entry.pk)
+        self._entries[entry.pk] = entry
+        self._add_postings(self._postings, entry)
+
+    def _remove_locked(self, pk: int) -> None:
+        old = self._entries.pop(pk, None)
+        if old is None:
+            return
+        for text in old.haystacks():
+            for gram in _grams(text):
+                bucket = self._postings.get(gram)
+                if bucket is None:
+                    continue
+                bucket.discard(pk)
+                if not bucket:
+                    del self._postings[gram]
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+    def search(self, query: str, limit: int = 15) -> list[dict] | None:
+        """
+        Case-insensitive substring match on any indexed field, ordered
+        like the DB query (last_name, first_name). Phone-like queries
+        also match partial digit runs of the E.164 numbers.
+
+        Returns None when the index is cold.
+        """
+        metrics.cache_lookup("customer_search", self._ready)
+        if not self._ready:
+            return None
+
+        if self._stale():
+            # Keep serving the current snapshot while we refresh
+            self.rebuild_in_background()
+
+        needle = (query or "").strip().lower()
+        if not needle:
+            return []
+
+        needles = [needle]
+        for variant in phone_digit_variants(needle):
+            if variant not in needles:
+                needles.append(variant)
+
+        with self._lock:
+            candidates = {}
+            for n in needles:
+                for entry in self._candidates_locked(n):
+                    candidates[entry.pk] = entry
+
+            # Postings only prove every trigram occurs in *some* field;
+            # confirm a whole needle is a substring of one field.
+            matches = (
+                entry for entry in candidates.values()
+                if any(
+                    n in text
+                    for text in entry.haystacks()
+                    for n in needles
+                )
+            )
+            top = heapq.nsmallest(limit, matches, key=lambda e: e.sort_key)
+
+        return [entry.as_result() for entry in top]
+
+    def _candidates_locked(self, needle: str):
+        if len(needle) < GRAM_SIZE:
+            return self._entries.values()
+
+        buckets = []
+        for gram in _grams(needle):
+            bucket = self._postings.get(gram)
+            if not bucket:
+                return []
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        ids = set(buckets[0])
+        for bucket in buckets[1:]:
+            ids &= bucket
+            if not ids:
+                return []
+        return [self._entries[pk] for pk in ids]
+
+
+customer_index = CustomerSearchIndex()
+
+
+def warm_customer_index() -> None:
+    """
+    Called from the WSGI/ASGI entry points so every worker builds its
+    index at start-up instead of on the first staff keystroke.
+    """
+    if not getattr(settings, "CUSTOMER_SEARCH_INDEX_ENABLED", True):
+        return
+    customer_index.rebuild_in_background()
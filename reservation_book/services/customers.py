@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from reservation_book import metrics
+from reservation_book.models import Customer
+
+# Session cache for the logged-in user's Customer id. Stored together with
+# the user id so a session can never resolve to another user's customer.
+SESSION_CUSTOMER_KEY = "reservation_book_customer"
+
+
+def _normalize_email(raw: str) -> str:
+    return (raw or "").strip().lower()
+
+
+def link_customer_to_user(customer: Customer | None, user) -> bool:
+    """
+    Attach `user` to `customer` unless either side is already linked.
+    Returns True if the link was written.
+    """
+    if customer is None or user is None or not getattr(user, "pk", None):
+        return False
+    if customer.user_id:
+        return False
+    if Customer.objects.filter(user=user).exists():
+        return False
+
+    customer.user = user
+    customer.save(update_fields=["user"])
+    return True
+
+
+def customer_for_user(user) -> Customer | None:
+    """
+    Resolve the Customer for an authenticated user.
+
+    Uses the Customer.user link (one indexed lookup). Users created before
+    the link existed are matched once by their normalized email, which
+    the unique email index can serve, and linked on the spot.
+    """
+    if not user or not getattr(user, "is_authenticated", False):
+        return None
+
+    customer = Customer.objects.filter(user=user).first()
+    if customer is not None:
+        return customer
+
+    email = _normalize_email(getattr(user, "email", ""))
+    if not email:
+        return None
+
+    customer = Customer.objects.filter(email=email, user__isnull=True).first()
+    if customer is not None:
+        link_customer_to_user(customer, user)
+    return customer
+
+
+def remember_customer(request, customer: Customer | None) -> None:
+    session = getattr(request, "session", None)
+    user = getattr(request, "user", None)
+    if session is None or customer is None or not getattr(user, "pk", None):
+        return
+    session[SESSION_CUSTOMER_KEY] = {"user": user.pk, "customer": customer.pk}
+
+
+def forget_customer(request) -> None:
+    session = getattr(request, "session", None)
+    if session is not None:
+        session.pop(SESSION_CUSTOMER_KEY, None)
+
+
+def customer_id_for_request(request) -> int | None:
+    """
+    Customer id for request.user, cached on the session after the first
+    lookup so most customer page views need no query at all.
+    """
+    user = getattr(request, "user", None)
+    if not user or not getattr(user, "is_authenticated", False):
+        return None
+
+    cached = getattr(request, "session", {}).get(SESSION_CUSTOMER_KEY)
+    hit = bool(cached) and cached.get("user") == user.pk
+    metrics.cache_lookup("customer_session", hit)
+    if hit:
+        return cached.get("customer")
+
+    customer = customer_for_user(user)
+    remember_customer(request, customer)
+    return customer.pk if customer else None
+
+
+def customer_for_request(request) -> Customer | None:
+    """
+    Customer row for request.user (primary-key fetch via the session
+    cache). A cached id whose row has gone away, e.g. after a duplicate
+    merge, is dropped and resolved again.
+    """
+    customer_id = customer_id_for_request(request)
+    if customer_id is None:
+        return None
+
+    customer = Customer.objects.filter(pk=customer_id).first()
+    if customer is None or customer.user_id not in (None, request.user.pk):
+        forget_customer(request)
+        customer = customer_for_user(request.user)
+        remember_customer(request, customer)
+    return customer
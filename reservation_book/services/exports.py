@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import csv
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from django.utils import timezone
+
+from reservation_book.models import (
+    CancellationEvent,
+    NoShowEvent,
+    TableReservation,
+)
+
+# Row-streaming exports for accounting.
+#
+# Every export is a single values_list() query read with .iterator(), so
+# rows go from the database cursor to the response a chunk at a time and
+# the full dataset is never held in memory (unlike tablib, which builds a
+# Dataset first). CSV is written through a pseudo-buffer; XLSX uses
+# openpyxl's write-only mode, which spools rows to a temporary file.
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    model: type
+    date_field: str
+    columns: tuple[tuple[str, str], ...]  # (header, values_list lookup)
+    status_field: str | None = None
+
+
+EXPORTS = {
+    "reservations": ExportSpec(
+        model=TableReservation,
+        date_field="reservation_date",
+        status_field="status",
+        columns=(
+            ("id", "id"),
+            ("date", "reservation_date"),
+            ("time_slot", "time_slot"),
+            ("duration_slots", "duration_hours"),
+            ("tables", "number_of_tables_required_by_patron"),
+            ("status", "status"),
+            ("phone_reservation", "is_phone_reservation"),
+            ("first_name", "customer__first_name"),
+            ("last_name", "customer__last_name"),
+            ("email", "customer__email"),
+            ("phone", "customer__phone"),
+            ("created_at", "created_at"),
+            ("completed_at", "completed_at"),
+            ("cancelled_at", "cancelled_at"),
+        ),
+    ),
+    "cancellations": ExportSpec(
+        model=CancellationEvent,
+        date_field="reservation_date",
+        columns=(
+            ("id", "id"),
+            ("reservation_id", "reservation_id"),
+            ("date", "reservation_date"),
+            ("time_slot", "time_slot"),
+            ("duration_slots", "duration_slots"),
+            ("tables", "tables"),
+            ("email", "customer_email"),
+            ("customer_id", "customer_id"),
+            ("cancelled_by_staff", "cancelled_by_staff"),
+            ("created_at", "created_at"),
+        ),
+    ),
+    "no_shows": ExportSpec(
+        model=NoShowEvent,
+        date_field="reservation_date",
+        columns=(
+            ("id", "id"),
+            ("reservation_id", "reservation_id"),
+            ("date", "reservation_date"),
+            ("time_slot", "time_slot"),
+            ("duration_slots", "duration_slots"),
+            ("tables", "tables"),
+            ("email", "customer_email"),
+            ("customer_id", "customer_id"),
+            ("marked_by_staff", "marked_by_staff"),
+            ("created_at", "created_at"),
+        ),
+    ),
+}
+
+FORMATS = ("csv", "xlsx")
+
+_PHONE_LIKE = re.compile(r"^[+\d][\d\s()/.-]*$")
+
+
+class ExportError(ValueError):
+    """A bad export request. Messages never echo the rejected value: the
+    view returns them to the browser."""
+
+
+def export_queryset(kind: str, *, date_from: date | None = None,
+                    date_to: date | None = None, status: str = "",
+                    source: str = ""):
+    """
+    values_list() queryset for one export, ordered by primary key.
+    `status` and `source` (phone/online) only apply to reservations.
+    """
+    spec = EXPORTS.get(kind)
+    if spec is None:
+        raise ExportError(
+            f"Unknown export; expected one of {', '.join(EXPORTS)}")
+
+    qs = spec.model.objects.all()
+    if date_from:
+        qs = qs.filter(**{f"{spec.date_field}__gte": date_from})
+    if date_to:
+        qs = qs.filter(**{f"{spec.date_field}__lte": date_to})
+    if status:
+        if spec.status_field is None:
+            raise ExportError(f"{kind} cannot be filtered by status")
+        valid = {value for value, _ in TableReservation.STATUS_CHOICES}
+        if status not in valid:
+            raise ExportError(
+                f"Unknown status; expected one of {', '.join(sorted(valid))}")
+        qs = qs.filter(**{spec.status_field: status})
+    if source:
+        if spec.model is not TableReservation:
+            raise ExportError(f"{kind} cannot be filtered by source")
+        if source not in ("phone", "online"):
+            raise ExportError("Unknown source; expected phone or online")
+        qs = qs.filter(is_phone_reservation=(source == "phone"))
+
+    # pk order is stable across chunks and index-backed
+    return qs.order_by("pk").values_list(*[c[1] for c in spec.columns])
+
+
+def headers(kind: str) -> list[str]:
+    return [c[0] for c in EXPORTS[kind].columns]
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.replace(microsecond=0).isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        # Spreadsheet formula injection: names/emails are guest input
+        if value[:1] in ("=", "@", "\t", "\r") or (
+            value[:1] in ("+", "-") and not _PHONE_LIKE.match(value)
+        ):
+            return "'" + value
+    return value
+
+
+def iter_rows(queryset, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield [_cell(v) for v in row]
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(kind: str, queryset, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers(kind))
+    for row in iter_rows(queryset, chunk_size):
+        yield writer.writerow(row)
+
+
+def write_xlsx(kind: str, queryset, fileobj,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """
+    Write an XLSX workbook to `fileobj`. A zip's directory comes last, so
+    XLSX cannot be streamed row by row; write-only mode keeps memory flat
+    and the caller streams the finished file.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:  # optional dependency
+        raise ExportError("XLSX export needs openpyxl installed") from exc
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=kind[:31])
+    ws.append(headers(kind))
+    for row in iter_rows(queryset, chunk_size):
+        ws.append(row)
+    wb.save(fileobj)
+
+
+def export_filename(kind: str, fmt: str, date_from=None,
+                    date_to=None) -> str:
+    parts = ["gambinos", kind]
+    if date_from:
+        parts.append(date_from.isoformat())
+    if date_to:
+        parts.append(date_to.isoformat())
+    return "-".join(parts) + f".{fmt}"
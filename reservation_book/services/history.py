@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db.models import (
+    CharField,
+    Count,
+    DateField,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Value,
+)
+from django.db.models.functions import Coalesce, TruncDate
+
+from reservation_book.models import (
+    CancellationEvent,
+    NoShowEvent,
+    TableReservation,
+)
+
+# One time-ordered timeline per customer for the staff history page.
+#
+# Reservations, cancellation events and no-show events are selected into
+# the same column shape and combined with UNION ALL. Each branch is
+# filtered on the customer (and the keyset cursor) before the union, so a
+# page is one bounded query whatever the customer's history length.
+#
+# Sort key, newest first: (day, slot, kind, entry_id). `kind` tells the
+# three sources apart so entry ids from different tables never tie.
+#
+# A no-show reservation that has its NoShowEvent is shown once, as the
+# event (which knows who marked it).
+
+KIND_RESERVATION = "reservation"
+KIND_CANCELLATION = "cancellation"
+KIND_NO_SHOW = "no_show"
+
+# Last-resort sort day for legacy rows with neither a date nor created_at
+_UNDATED = date(1970, 1, 1)
+
+TIMELINE_PAGE_SIZE = 50
+
+
+@dataclass
+class TimelinePage:
+    entries: list[dict] = field(default_factory=list)
+    has_next: bool = False
+    has_prev: bool = False
+
+
+def _day():
+    return Coalesce(
+        F("reservation_date"), TruncDate("created_at"), Value(_UNDATED),
+        output_field=DateField(),
+    )
+
+
+def _branches(customer_id):
+    """The three sources, annotated into identical column lists."""
+    text = CharField()
+    has_event = Exists(
+        NoShowEvent.objects.filter(reservation_id=OuterRef("pk")))
+    reservations = (
+        TableReservation.objects
+        .filter(customer_id=customer_id)
+        .filter(~Q(status=TableReservation.STATUS_NO_SHOW) | ~has_event)
+        .annotate(
+            kind=Value(KIND_RESERVATION, output_field=text),
+            entry_id=F("id"),
+            ref_id=F("id"),
+            day=_day(),
+            slot=Coalesce(F("time_slot"), Value(""), output_field=text),
+            span=F("duration_hours"),
+            n_tables=F("number_of_tables_required_by_patron"),
+            state=F("status"),
+            staff_action=F("is_phone_reservation"),
+            logged_at=F("created_at"),
+        )
+    )
+    cancellations = (
+        CancellationEvent.objects
+        .filter(customer_id=customer_id)
+        .annotate(
+            kind=Value(KIND_CANCELLATION, output_field=text),
+            entry_id=F("id"),
+            ref_id=F("reservation_id"),
+            day=_day(),
+            slot=F("time_slot"),
+            span=F("duration_slots"),
+            n_tables=F("tables"),
+            state=Value("cancelled", output_field=text),
+            staff_action=F("cancelled_by_staff"),
+            logged_at=F("created_at"),
+        )
+    )
+    no_shows = (
+        NoShowEvent.objects
+        .filter(customer_id=customer_id)
+        .annotate(
+            kind=Value(KIND_NO_SHOW, output_field=text),
+            entry_id=F("id"),
+            ref_id=F("reservation_id"),
+            day=_day(),
+            slot=F("time_slot"),
+            span=F("duration_slots"),
+            n_tables=F("tables"),
+            state=Value(TableReservation.STATUS_NO_SHOW, output_field=text),
+            staff_action=F("marked_by_staff"),
+            logged_at=F("created_at"),
+        )
+    )
+    return reservations, cancellations, no_shows
+
+
+_COLUMNS = (
+    "kind", "entry_id", "ref_id", "day", "slot", "span", "n_tables",
+    "state", "staff_action", "logged_at",
+)
+
+
+def _older_than(key) -> Q:
+    day, slot, kind, pk = key
+    return (
+        Q(day__lt=day)
+        | Q(day=day, slot__lt=slot)
+        | Q(day=day, slot=slot, kind__lt=kind)
+        | Q(day=day, slot=slot, kind=kind, entry_id__lt=pk)
+    )
+
+
+def _newer_than(key) -> Q:
+    day, slot, kind, pk = key
+    return (
+        Q(day__gt=day)
+        | Q(day=day, slot__gt=slot)
+        | Q(day=day, slot=slot, kind__gt=kind)
+        | Q(day=day, slot=slot, kind=kind, entry_id__gt=pk)
+    )
+
+
+def entry_key(entry: dict) -> tuple:
+    return entry["day"], entry["slot"], entry["kind"], entry["entry_id"]
+
+
+def parse_key(values) -> tuple | None:
+    """Decoded cursor strings -> sort key, or None if malformed."""
+    if not values:
+        return None
+    day_raw, slot, kind, pk_raw = values
+    if kind not in (KIND_RESERVATION, KIND_CANCELLATION, KIND_NO_SHOW):
+        return None
+    try:
+        return date.fromisoformat(day_raw), slot, kind, int(pk_raw)
+    except ValueError:
+        return None
+
+
+def customer_timeline(customer_id, *, after=None, before=None,
+                      page_size: int | None = None) -> TimelinePage:
+    """
+    One page of the customer's timeline, newest first. `after` continues
+    past the last entry of a page, `before` goes back from the first.
+    """
+    page_size = page_size or TIMELINE_PAGE_SIZE
+    if before is not None:
+        where, order = _newer_than(before), ("day", "slot", "kind",
+                                             "entry_id")
+    else:
+        where = _older_than(after) if after is not None else Q()
+        order = ("-day", "-slot", "-kind", "-entry_id")
+
+    first, *rest = [
+        qs.filter(where).values(*_COLUMNS).order_by()
+        for qs in _branches(customer_id)
+    ]
+    rows = list(
+        first.union(*rest, all=True).order_by(*order)[:page_size + 1])
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if before is not None:
+        return TimelinePage(entries=rows[::-1], has_next=True, has_prev=more)
+    return TimelinePage(entries=rows, has_next=more,
+                        has_prev=after is not None)
+
+
+def timeline_counts(customer_id) -> dict[str, int]:
+    """Per-type totals, one aggregate per source table."""
+    counts = TableReservation.objects.filter(
+        customer_id=customer_id).aggregate(
+        reservations=Count("id"),
+        active=Count("id", filter=Q(status=TableReservation.STATUS_ACTIVE)),
+        completed=Count(
+            "id", filter=Q(status=TableReservation.STATUS_COMPLETED)),
+    )
+    counts["cancelled"] = CancellationEvent.objects.filter(
+        customer_id=customer_id).count()
+    counts["no_show"] = NoShowEvent.objects.filter(
+        customer_id=customer_id).count()
+    return counts
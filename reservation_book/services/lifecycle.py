@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from reservation_book.models import (
+    CancellationEvent,
+    Customer,
+    CustomerStats,
+    NoShowEvent,
+    ReservationStats,
+    TableReservation,
+)
+
+# Reservation lifecycle hooks that keep CustomerStats and the dashboard's
+# ReservationStats row in step.
+#
+# Call them AFTER the reservation write, inside the same transaction.
+# Each hook is one UPDATE ... SET col = col + delta per stats row; a
+# missing row is computed from the current tables, which already include
+# the write.
+
+
+def _tables(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _bump(customer_id, **deltas) -> None:
+    if not customer_id:
+        return
+    updates = {
+        field: F(field) + delta for field, delta in deltas.items() if delta
+    }
+    if not updates:
+        return
+    updated = CustomerStats.objects.filter(customer_id=customer_id).update(
+        updated_at=timezone.now(), **updates)
+    if not updated:
+        refresh_customer_stats(customer_id)
+
+
+def _bump_totals(**deltas) -> None:
+    updates = {
+        field: F(field) + delta for field, delta in deltas.items() if delta
+    }
+    if not updates:
+        return
+    updated = ReservationStats.objects.filter(pk=1).update(
+        updated_at=timezone.now(), **updates)
+    if not updated:
+        recount_reservation_stats()
+
+
+def _status_deltas(status, tables, sign) -> dict:
+    active = status == TableReservation.STATUS_ACTIVE
+    return {
+        "reservations": sign,
+        "tables_booked": sign * tables,
+        "active_reservations": sign if active else 0,
+        "active_tables_booked": sign * tables if active else 0,
+    }
+
+
+def reservation_booked(reservation: TableReservation) -> None:
+    _bump(
+        reservation.customer_id,
+        **_status_deltas(
+            reservation.status,
+            _tables(reservation.number_of_tables_required_by_patron),
+            +1,
+        ),
+    )
+    _bump_totals(
+        total_reservations=1,
+        active_reservations=int(
+            reservation.status == TableReservation.STATUS_ACTIVE),
+        phone_reservations=int(bool(reservation.is_phone_reservation)),
+    )
+
+
+def reservation_cancelled(reservation: TableReservation) -> None:
+    """
+    The reservation row was hard-deleted and its CancellationEvent
+    written. `reservation` is the deleted instance (fields still set).
+    """
+    _bump(
+        reservation.customer_id,
+        **_status_deltas(
+            reservation.status,
+            _tables(reservation.number_of_tables_required_by_patron),
+            -1,
+        ),
+    )
+    _bump_totals(
+        cancelled_count=1,
+        total_reservations=-1,
+        active_reservations=-int(
+            reservation.status == TableReservation.STATUS_ACTIVE),
+        phone_reservations=-int(bool(reservation.is_phone_reservation)),
+    )
+
+
+def reservation_status_changed(customer_id, tables, old_status,
+                               new_status) -> None:
+    """Completed / no-show transitions (and any other status move)."""
+    if old_status == new_status:
+        return
+    tables = _tables(tables)
+    active = TableReservation.STATUS_ACTIVE
+    shift = (new_status == active) - (old_status == active)
+    _bump(
+        customer_id,
+        active_reservations=shift,
+        active_tables_booked=shift * tables,
+    )
+    no_show = TableReservation.STATUS_NO_SHOW
+    _bump_totals(
+        active_reservations=shift,
+        no_show_count=(new_status == no_show) - (old_status == no_show),
+    )
+
+
+def reservations_status_changed(rows, old_status, new_status) -> None:
+    """
+    Bulk form of reservation_status_changed for rows moved by one UPDATE.
+    `rows` is an iterable of (customer_id, tables); one stats UPDATE per
+    customer plus one for the dashboard row.
+    """
+    if old_status == new_status:
+        return
+    per_customer: dict[int, list[int]] = {}
+    moved = 0
+    for customer_id, tables in rows:
+        moved += 1
+        if customer_id:
+            count_tables = per_customer.setdefault(customer_id, [0, 0])
+            count_tables[0] += 1
+            count_tables[1] += _tables(tables)
+    if not moved:
+        return
+
+    active = TableReservation.STATUS_ACTIVE
+    shift = (new_status == active) - (old_status == active)
+    for customer_id, (count, tables) in per_customer.items():
+        _bump(
+            customer_id,
+            active_reservations=shift * count,
+            active_tables_booked=shift * tables,
+        )
+    no_show = TableReservation.STATUS_NO_SHOW
+    _bump_totals(
+        active_reservations=shift * moved,
+        no_show_count=((new_status == no_show) - (old_status == no_show))
+        * moved,
+    )
+
+
+def customers_changed(delta: int) -> None:
+    """Customer rows created (+n) or deleted (-n)."""
+    _bump_totals(customers_count=delta)
+
+
+def reservation_tables_changed(customer_id, status, old_tables,
+                               new_tables) -> None:
+    diff = _tables(new_tables) - _tables(old_tables)
+    active = status == TableReservation.STATUS_ACTIVE
+    _bump(
+        customer_id,
+        tables_booked=diff,
+        active_tables_booked=diff if active else 0,
+    )
+
+
+def compute_customer_stats(customer_ids) -> dict[int, dict]:
+    """
+    Recount CustomerStats values from TableReservation for the given
+    customers, in one grouped query. Customers with no reservations are
+    missing from the result (all counters zero).
+    """
+    active = Q(status=TableReservation.STATUS_ACTIVE)
+    rows = (
+        TableReservation.objects
+        .filter(customer_id__in=list(customer_ids))
+        .values("customer_id")
+        .annotate(
+            reservations=Count("id"),
+            active_reservations=Count("id", filter=active),
+            tables_booked=Sum("number_of_tables_required_by_patron"),
+            active_tables_booked=Sum(
+                "number_of_tables_required_by_patron", filter=active),
+        )
+        .order_by()
+    )
+    return {
+        row.pop("customer_id"): {k: v or 0 for k, v in row.items()}
+        for row in rows
+    }
+
+
+def refresh_customer_stats(customer_id) -> None:
+    if not customer_id:
+        return
+    values = compute_customer_stats([customer_id]).get(customer_id) or {
+        field: 0 for field in CustomerStats.COUNTER_FIELDS
+    }
+    CustomerStats.objects.update_or_create(
+        customer_id=customer_id, defaults=values)
+
+
+def count_reservation_stats() -> dict[str, int]:
+    """Dashboard counters straight from the source tables."""
+    reservations = TableReservation.objects.aggregate(
+        total_reservations=Count("id"),
+        active_reservations=Count(
+            "id", filter=Q(status=TableReservation.STATUS_ACTIVE)),
+        phone_reservations=Count("id", filter=Q(is_phone_reservation=True)),
+    )
+    return {
+        **reservations,
+        "cancelled_count": CancellationEvent.objects.count(),
+        "no_show_count": NoShowEvent.objects.count(),
+        "customers_count": Customer.objects.count(),
+    }
+
+
+@transaction.atomic
+def recount_reservation_stats() -> tuple[dict, dict]:
+    """
+    Rewrite the dashboard row from a full recount. The row is locked
+    first, so a hook running concurrently applies its delta on top of the
+    recount instead of being overwritten.
+    Returns (before, after) counter dicts.
+    """
+    ReservationStats.objects.get_or_create(pk=1)
+    row = ReservationStats.objects.select_for_update().get(pk=1)
+    before = {f: getattr(row, f) for f in ReservationStats.COUNTER_FIELDS}
+    after = count_reservation_stats()
+    if after != before:
+        ReservationStats.objects.filter(pk=1).update(
+            updated_at=timezone.now(), **after)
+    return before, after
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import base64
+import json
+
+# Opaque keyset cursors for staff list pages.
+#
+# A cursor is the sort key of the last (or first) row on a page, JSON
+# encoded and base64'd so it survives a query string. Pages are fetched
+# with a WHERE on that key plus LIMIT, so the cost of a page does not grow
+# with how far the user has paged.
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([str(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str | None, size: int) -> list[str] | None:
+    """
+    Inverse of encode_cursor. Returns None for a missing, tampered or
+    wrongly sized cursor, which callers treat as "first page".
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    if not all(isinstance(v, str) for v in values):
+        return None
+    return values
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import re
+
+import phonenumbers
+from django.conf import settings
+
+# Anything a caller-ID or a typed phone number may contain
+PHONE_QUERY_RE = re.compile(r"^\+?[\d\s()./-]+$")
+
+# Shortest digit run we treat as a phone search (shorter is too noisy)
+MIN_PHONE_QUERY_DIGITS = 3
+
+
+def _default_region() -> str:
+    return getattr(settings, "PHONENUMBER_DEFAULT_REGION", None) or "DE"
+
+
+def to_e164(raw: str, region: str | None = None) -> str:
+    """
+    Normalize a free-text phone number to E.164 ("+4917112345678").
+
+    Returns "" when the value is blank or cannot be a phone number,
+    so callers can store the result directly in a CharField.
+    """
+    raw = (raw or "").strip()
+    if not raw:
+        return ""
+
+    try:
+        parsed = phonenumbers.parse(raw, region or _default_region())
+    except phonenumbers.NumberParseException:
+        return ""
+
+    if not phonenumbers.is_possible_number(parsed):
+        return ""
+
+    return phonenumbers.format_number(
+        parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def looks_like_phone_query(query: str) -> bool:
+    query = (query or "").strip()
+    if not query or not PHONE_QUERY_RE.match(query):
+        return False
+    return len(re.sub(r"\D", "", query)) >= MIN_PHONE_QUERY_DIGITS
+
+
+def phone_digit_variants(query: str, region: str | None = None) -> list[str]:
+    """
+    Digit strings to look for inside stored E.164 numbers (without "+").
+
+    - "+49 171 23" / "0049 171 23" -> "4917123"
+    - "0171 23" (national trunk prefix) -> "4917123" and "17123"
+    - "2345" (any partial run) -> "2345"
+    """
+    if not looks_like_phone_query(query):
+        return []
+
+    query = query.strip()
+    digits = re.sub(r"\D", "", query)
+
+    variants = []
+    if query.startswith("+"):
+        variants.append(digits)
+    elif digits.startswith("00"):
+        variants.append(digits[2:])
+    elif digits.startswith("0"):
+        country_code = phonenumbers.country_code_for_region(
+            region or _default_region())
+        if country_code:
+            variants.append(f"{country_code}{digits[1:]}")
+        variants.append(digits[1:])
+    else:
+        variants.append(digits)
+
+    out = []
+    for v in variants:
+        if len(v) >= MIN_PHONE_QUERY_DIGITS and v not in out:
+            out.append(v)
+    return out
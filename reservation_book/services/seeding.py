@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from reservation_book.cache import AVAILABILITY
+from reservation_book.constants import SLOT_LABELS
+from reservation_book.models import (
+    CancellationEvent,
+    Customer,
+    CustomerStats,
+    NoShowEvent,
+    ReservationSeries,
+    TableReservation,
+    TimeSlotAvailability,
+)
+from reservation_book.services.lifecycle import (
+    compute_customer_stats,
+    recount_reservation_stats,
+)
+from reservation_book.services.sweeps import DEFAULT_NO_SHOW_BAN_THRESHOLD
+
+# Synthetic data for benchmarks and capacity planning.
+#
+# Everything is written with bulk_create in batches (no per-row save(),
+# no signals), then the derived rows are rebuilt in bulk: CustomerStats
+# from the reservations, ReservationStats from a recount, and the
+# Customer no-show/cancellation counters and barred flag from the events.
+# Demand counters on TimeSlotAvailability are summed from the generated
+# reservations, so they always match what is in the table.
+#
+# Shape of the data:
+# - `occupancy` is the average fill; WEEKDAY_LOAD makes Friday and
+#   Saturday run hot and early weekdays quiet (never above capacity).
+# - Bookings are spread over customers with a long tail: a few regulars
+#   book often, most customers book once or twice.
+# - A small share of customers are repeat no-showers, so some cross the
+#   ban threshold the way they would in production.
+# - Some bookings are ReservationSeries over 2-5 consecutive days.
+#
+# Days are written in chunks, one transaction each, so a multi-million
+# row load never holds one huge transaction. Output is deterministic for
+# a given seed.
+
+SLOTS = list(SLOT_LABELS)
+
+# Occupancy multiplier, Monday .. Sunday
+WEEKDAY_LOAD = (0.6, 0.7, 0.8, 0.95, 1.3, 1.45, 1.0)
+
+DAYS_PER_CHUNK = 50
+FLAKY_SHARE = 0.03
+FLAKY_NO_SHOW_RATE = 0.4
+SERIES_LENGTHS = (2, 2, 3, 3, 4, 5)
+
+FIRST_NAMES = (
+    "Anna", "Ben", "Clara", "David", "Elena", "Felix", "Greta", "Hugo",
+    "Ida", "Jonas", "Katharina", "Lukas", "Mia", "Noah", "Olivia", "Paul",
+    "Queenie", "Rafael", "Sofia", "Tim", "Ursula", "Viktor", "Wilma",
+    "Xaver", "Yara", "Zoe",
+)
+LAST_NAMES = (
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer",
+    "Wagner", "Becker", "Schulz", "Hoffmann", "Koch", "Richter", "Klein",
+    "Wolf", "Neumann", "Schwarz", "Zimmermann", "Braun", "Krüger",
+    "Hartmann", "Rossi", "Bianchi", "Gambino", "Romano", "Costa",
+)
+
+
+@dataclass
+class SeedResult:
+    customers: int = 0
+    days: int = 0
+    reservations: int = 0
+    series: int = 0
+    cancellations: int = 0
+    no_shows: int = 0
+    barred: int = 0
+    customer_ids: list[int] = field(default_factory=list)
+
+    @property
+    def rows(self) -> int:
+        """Generated rows (stats rows not included)."""
+        return (self.customers + self.days + self.reservations
+                + self.series + self.cancellations + self.no_shows)
+
+
+@dataclass
+class _Population:
+    """Who books: ids with long-tail weights, and the repeat no-showers."""
+    ids: list[int]
+    cum_weights: list[float]
+    flaky: set[int]
+
+    def pick(self, rng, k=1) -> list[int]:
+        return rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _make_customers(rng, count, batch_size) -> list[int]:
+    ids = []
+    pending = []
+    # keeps emails unique when seeding a database that has customers
+    offset = Customer.objects.count()
+    for n in range(offset, offset + count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        # German mobile numbers; E.164 is set directly because
+        # bulk_create skips Customer.save()
+        e164 = f"+4915{rng.randrange(10**9, 10**10)}"
+        pending.append(Customer(
+            first_name=first,
+            last_name=last,
+            email=f"{first}.{last}.{n}@seed.example".lower(),
+            phone=e164,
+            phone_e164=e164,
+        ))
+        if len(pending) >= batch_size:
+            ids += [c.pk for c in Customer.objects.bulk_create(pending)]
+            pending = []
+    if pending:
+        ids += [c.pk for c in Customer.objects.bulk_create(pending)]
+    return ids
+
+
+def _population(rng, customer_ids) -> _Population:
+    ids = list(customer_ids)
+    rng.shuffle(ids)
+    # Zipf-like: the n-th most frequent guest books ~1/n**0.8 as often
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(ids))]
+    flaky = set(rng.sample(ids, int(len(ids) * FLAKY_SHARE)))
+    return _Population(ids=ids, cum_weights=list(accumulate(weights)),
+                       flaky=flaky)
+
+
+def day_target(day, capacity, occupancy) -> int:
+    """Tables per slot to fill on `day`: weekday-weighted, <= capacity."""
+    return min(capacity, int(capacity * occupancy * WEEKDAY_LOAD[
+        day.weekday()]))
+
+
+def _fits(demand, start, duration, tables, target):
+    return all(demand[i] + tables <= target
+               for i in range(start, start + duration))
+
+
+def _book(demand, start, duration, tables):
+    for i in range(start, start + duration):
+        demand[i] += tables
+
+
+def _plan_day(rng, capacity, target, demand=None):
+    """
+    (start_slot_index, duration, tables) bookings for one day, filling
+    each slot to about `target` tables on top of `demand` (bookings
+    already planned for the day, e.g. series).
+    """
+    demand = demand if demand is not None else [0] * len(SLOTS)
+    bookings = []
+    attempts = 0
+    while attempts < capacity * 4:
+        attempts += 1
+        start = rng.randrange(len(SLOTS))
+        duration = 2 if start < len(SLOTS) - 1 and rng.random() < 0.2 else 1
+        tables = rng.choice((1, 1, 1, 2, 2, 3, 4))
+        if not _fits(demand, start, duration, tables, target):
+            continue
+        _book(demand, start, duration, tables)
+        bookings.append((start, duration, tables))
+    return bookings, demand
+
+
+def _plan_series(rng, days, targets, demand, series_rate):
+    """
+    Multi-day bookings inside one chunk of days: same slot, duration and
+    tables on 2-5 consecutive days. Planned before the single bookings
+    so they get first pick, as they are booked weeks ahead in practice.
+    """
+    series = []
+    for index in range(len(days) - 1):
+        if rng.random() >= series_rate:
+            continue
+        length = min(rng.choice(SERIES_LENGTHS), len(days) - index)
+        start = rng.randrange(len(SLOTS) - 1)
+        duration = rng.choice((1, 2, 2))
+        tables = rng.choice((1, 2, 2, 3))
+        span = days[index:index + length]
+        if not all(_fits(demand[d], start, duration, tables, targets[d])
+                   for d in span):
+            continue
+        for d in span:
+            _book(demand[d], start, duration, tables)
+        series.append((span, start, duration, tables))
+    return series
+
+
+def seed(*, customers: int, past_days: int, future_days: int = 30,
+         capacity: int = 20, occupancy: float = 0.6,
+         no_show_rate: float = 0.05, cancel_rate: float = 0.08,
+         series_rate: float = 0.15, batch_size: int = 5000,
+         rng_seed: int = 1, stdout=None) -> SeedResult:
+    """
+    Generate customers, a day range of availability rows, reservations
+    and series (past ones completed or no-show, future ones active),
+    cancellation and no-show events, then rebuild the counters and stats.
+
+    `series_rate` is the chance that a series starts on a given day.
+    The date range must not have availability rows yet.
+    """
+    rng = random.Random(rng_seed)
+    today = timezone.localdate()
+    result = SeedResult()
+
+    def say(text):
+        if stdout is not None:
+            stdout.write(text)
+
+    with transaction.atomic():
+        result.customer_ids = _make_customers(rng, customers, batch_size)
+    result.customers = len(result.customer_ids)
+    say(f"customers: {result.customers}")
+    population = _population(rng, result.customer_ids)
+
+    first_day = today - timedelta(days=past_days)
+    days = [first_day + timedelta(days=i)
+            for i in range(past_days + future_days)]
+    result.days = len(days)
+
+    for chunk in _batches(days, DAYS_PER_CHUNK):
+        with transaction.atomic():
+            _seed_days(rng, chunk, today, result, population, capacity,
+                       occupancy, no_show_rate, cancel_rate, series_rate,
+                       batch_size)
+        say(f"  through {chunk[-1]}: {result.reservations} reservations")
+
+    with transaction.atomic():
+        result.barred = _update_customer_counters(
+            result.customer_ids, batch_size)
+        rebuild_stats(result.customer_ids, batch_size)
+    # bulk_create sends no signals
+    AVAILABILITY.invalidate()
+    say(f"no-shows: {result.no_shows}, barred customers: {result.barred}")
+    return result
+
+
+def _seed_days(rng, days, today, result, population, capacity, occupancy,
+               no_show_rate, cancel_rate, series_rate, batch_size):
+    now = timezone.now()
+    targets = {day: day_target(day, capacity, occupancy) for day in days}
+    demand = {day: [0] * len(SLOTS) for day in days}
+
+    planned_series = _plan_series(rng, days, targets, demand, series_rate)
+    series_rows = ReservationSeries.objects.bulk_create(
+        [ReservationSeries(customer_id=population.pick(rng)[0],
+                           title=f"Seeded series ({len(span)} days)")
+         for span, *_ in planned_series],
+        batch_size=batch_size,
+    )
+
+    def status_for(day, customer_id):
+        if day >= today:
+            return TableReservation.STATUS_ACTIVE
+        rate = (FLAKY_NO_SHOW_RATE if customer_id in population.flaky
+                else no_show_rate)
+        return (TableReservation.STATUS_NO_SHOW if rng.random() < rate
+                else TableReservation.STATUS_COMPLETED)
+
+    def reservation(day, start, duration, tables, customer_id, **extra):
+        return TableReservation(
+            customer_id=customer_id,
+            timeslot_availability_id=day,
+            reservation_date=day,
+            time_slot=SLOTS[start],
+            duration_hours=duration,
+            number_of_tables_required_by_patron=tables,
+            status=status_for(day, customer_id),
+            reservation_status=True,
+            **extra,
+        )
+
+    reservations = []
+    for row, (span, start, duration, tables) in zip(series_rows,
+                                                    planned_series):
+        reservations += [
+            reservation(day, start, duration, tables, row.customer_id,
+                        series_id=row.pk)
+            for day in span
+        ]
+
+    availability = []
+    cancellations = []
+    for day in days:
+        bookings, day_demand = _plan_day(
+            rng, capacity, targets[day], demand[day])
+        row = TimeSlotAvailability(calendar_date=day)
+        for i, key in enumerate(SLOTS):
+            setattr(row, f"number_of_tables_available_{key}", capacity)
+            setattr(row, f"total_cust_demand_for_tables_{key}",
+                    day_demand[i])
+        availability.append(row)
+
+        guests = population.pick(rng, len(bookings))
+        for (start, duration, tables), customer_id in zip(bookings, guests):
+            reservations.append(reservation(
+                day, start, duration, tables, customer_id,
+                is_phone_reservation=rng.random() < 0.3))
+            # Cancelled bookings left no reservation row, only the event
+            if rng.random() < cancel_rate:
+                cancellations.append(CancellationEvent(
+                    created_at=now,
+                    reservation_date=day,
+                    time_slot=SLOTS[start],
+                    tables=tables,
+                    duration_slots=duration,
+                    customer_id=population.pick(rng)[0],
+                    cancelled_by_staff=rng.random() < 0.2,
+                ))
+
+    TimeSlotAvailability.objects.bulk_create(
+        availability, batch_size=batch_size)
+    created = TableReservation.objects.bulk_create(
+        reservations, batch_size=batch_size)
+    CancellationEvent.objects.bulk_create(
+        cancellations, batch_size=batch_size)
+
+    no_shows = [
+        NoShowEvent(
+            reservation_id=r.pk,
+            reservation_date=r.reservation_date,
+            time_slot=r.time_slot,
+            tables=r.number_of_tables_required_by_patron,
+            duration_slots=r.duration_hours,
+            customer_id=r.customer_id,
+            marked_by_staff=False,
+        )
+        for r in created if r.status == TableReservation.STATUS_NO_SHOW
+    ]
+    NoShowEvent.objects.bulk_create(no_shows, batch_size=batch_size)
+
+    result.reservations += len(created)
+    result.series += len(series_rows)
+    result.cancellations += len(cancellations)
+    result.no_shows += len(no_shows)
+
+
+def _update_customer_counters(customer_ids, batch_size) -> int:
+    """
+    Customer.no_show_count / cancellations_count recounted from the
+    events, and the barred flag the no-show sweep would have set. Done in
+    SQL (one correlated UPDATE per batch). Returns the number barred.
+    """
+    def per_customer(model):
+        return Coalesce(Subquery(
+            model.objects.filter(customer_id=OuterRef("pk"))
+            .order_by().values("customer_id")
+            .annotate(n=Count("id")).values("n")
+        ), 0)
+
+    barred = 0
+    for chunk in _batches(list(customer_ids), batch_size):
+        Customer.objects.filter(pk__in=chunk).update(
+            no_show_count=per_customer(NoShowEvent),
+            cancellations_count=per_customer(CancellationEvent),
+        )
+        barred += Customer.objects.filter(
+            pk__in=chunk,
+            no_show_count__gte=DEFAULT_NO_SHOW_BAN_THRESHOLD,
+        ).update(barred=True)
+    return barred
+
+
+def rebuild_stats(customer_ids, batch_size: int = 5000) -> None:
+    """CustomerStats for the given customers, then the dashboard row."""
+    for chunk in _batches(list(customer_ids), batch_size):
+        values = compute_customer_stats(chunk)
+        CustomerStats.objects.filter(customer_id__in=chunk).delete()
+        CustomerStats.objects.bulk_create([
+            CustomerStats(customer_id=pk, **counts)
+            for pk, counts in values.items()
+        ])
+    recount_reservation_stats()
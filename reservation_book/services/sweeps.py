@@ -6,7 +6,9 @@ from django.db import transaction
 from django.db.models import F
 from django.utils import timezone
 
+from reservation_book import metrics
 from reservation_book.models import Customer, NoShowEvent, TableReservation
+from reservation_book.services.lifecycle import reservation_status_changed
 
 
 @dataclass
@@ -19,6 +21,7 @@ class NoShowSweepResult:
 DEFAULT_NO_SHOW_BAN_THRESHOLD = 3
 
 
+@metrics.SWEEP_SECONDS.time()
 def run_no_show_sweep(
     *,
     today=None,
@@ -50,7 +53,9 @@ def run_no_show_sweep(
             .order_by("reservation_date", "time_slot", "id")
         )
 
-        reservations = list(qs)
+        # one lock over every unresolved past date, so no date tag
+        with metrics.row_lock("no_show_sweep"):
+            reservations = list(qs)
         scanned = len(reservations)
 
         # Detect optional field on NoShowEvent
@@ -77,6 +82,7 @@ def run_no_show_sweep(
                     getattr(r, "number_of_tables_required_by_patron", 0) or 0),
                 duration_slots=int(getattr(r, "duration_hours", 1) or 1),
                 customer_email=cust_email,
+                customer_id=r.customer_id,
             )
             if has_marked_by_staff:
                 event_kwargs["marked_by_staff"] = False  # sweep-generated
@@ -85,7 +91,13 @@ def run_no_show_sweep(
 
             # Mark reservation as no-show
             r.status = TableReservation.STATUS_NO_SHOW
-            r.save(update_fields=["status"])
+            r.save(update_fields=["status", "updated_at"])
+            reservation_status_changed(
+                r.customer_id,
+                r.number_of_tables_required_by_patron,
+                TableReservation.STATUS_ACTIVE,
+                TableReservation.STATUS_NO_SHOW,
+            )
             marked_count += 1
 
             # Update customer counters + barred flag
@@ -93,11 +105,16 @@ def run_no_show_sweep(
                 Customer.objects.filter(pk=r.customer_id).update(
                     no_show_count=F("no_show_count") + 1
                 )
-                c = Customer.objects.select_for_update().get(pk=r.customer_id)
+                with metrics.row_lock("no_show_sweep"):
+                    c = Customer.objects.select_for_update().get(
+                        pk=r.customer_id)
                 if (not c.barred) and c.no_show_count >= ban_threshold:
                     c.barred = True
                     c.save(update_fields=["barred"])
                     barred_count += 1
 
+    metrics.SWEEP_ROWS.inc(scanned, outcome="scanned")
+    metrics.SWEEP_ROWS.inc(marked_count, outcome="marked_no_show")
+    metrics.SWEEP_ROWS.inc(barred_count, outcome="barred_customers")
     return NoShowSweepResult(scanned=scanned, marked_no_show=marked_count,
                              barred_customers=barred_count)
@@ -1,11 +1,23 @@
 import logging
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in
 from django.utils import timezone
 from django.core.cache import cache
 from allauth.account.signals import user_signed_up
-from .models import TableReservation, Customer
+from .models import TableReservation, TimeSlotAvailability, Customer
+from reservation_book.cache import AVAILABILITY
 from reservation_book.services.sweeps import run_no_show_sweep
+from reservation_book.services.customer_search import customer_index
+from reservation_book.services.customer_merge import (
+    merge_customers_for_email,
+)
+from reservation_book.services.lifecycle import customers_changed
+from reservation_book.services.customers import (
+    link_customer_to_user,
+    remember_customer,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -13,25 +25,30 @@ logger = logging.getLogger(__name__)
 @receiver(user_signed_up)
 def attach_existing_reservations(request, user, **kwargs):
     """
-    Robust variant:
     - Normalize email
-    - Ensure canonical Customer exists
-    - Attach any reservations belonging to any Customer row with this email
-      (covers legacy duplicates), but only where created_by is NULL.
+    - Merge guest Customer rows that differ only in email case/whitespace
+    - Ensure canonical Customer exists and is linked to the new user
+    - Attach that customer's reservations where created_by is NULL
     """
     email = ((getattr(user, "email", "") or "").strip().lower())
     if not email:
         logger.warning("user_signed_up: no email for user_id=%s", user.id)
         return
 
-    customer, created = Customer.objects.get_or_create(
-        email=email,
-        defaults={
-            "first_name": (getattr(user, "first_name", "") or "").strip(),
-            "last_name": (getattr(user, "last_name", "") or "").strip(),
-            "notes": "Auto-created during signup (signal)",
-        },
-    )
+    merge_customers_for_email(email)
+
+    customer = Customer.objects.filter(user=user).first()
+    created = False
+    if customer is None:
+        customer, created = Customer.objects.get_or_create(
+            email=email,
+            defaults={
+                "first_name": (getattr(user, "first_name", "") or "").strip(),
+                "last_name": (getattr(user, "last_name", "") or "").strip(),
+                "notes": "Auto-created during signup (signal)",
+            },
+        )
+        link_customer_to_user(customer, user)
 
     user_fn = (getattr(user, "first_name", "") or "").strip()
     user_ln = (getattr(user, "last_name", "") or "").strip()
@@ -45,15 +62,13 @@ def attach_existing_reservations(request, user, **kwargs):
     if changed:
         customer.save(update_fields=["first_name", "last_name"])
 
-    # Attach reservations for ANY customer
-    # row with matching email (case-insensitive)
     updated = TableReservation.objects.filter(
-        customer__email__iexact=email,
+        customer=customer,
         created_by__isnull=True,
-    ).update(
-        created_by=user,
-        customer=customer,  # normalize to canonical customer row
-    )
+    ).update(created_by=user)
+
+    if request is not None:
+        remember_customer(request, customer)
 
     logger.info(
         "user_signed_up: canonical_customer_id=%s (created=%s) \
@@ -62,7 +77,10 @@ def attach_existing_reservations(request, user, **kwargs):
     )
 
 
-CACHE_KEY = "no_show_sweep_last_run_date"  # stores YYYY-MM-DD as string
+# One key per day; cache.add() lets only one worker claim it. With the
+# shared tier down it claims it per worker for CACHE_LOCAL_TIMEOUT, so
+# the sweep (idempotent) may run again rather than not at all.
+CACHE_KEY = "sweeps:no_show:{day}"
 
 
 @receiver(user_logged_in)
@@ -73,21 +91,49 @@ def run_no_show_sweep_on_staff_login(sender, request, user, **kwargs):
         return
 
     today = timezone.localdate()
-    today_str = today.isoformat()
+    key = CACHE_KEY.format(day=today.isoformat())
 
     # Run at most once per day (across all workers)
-    last = cache.get(CACHE_KEY)
-    if last == today_str:
+    if not cache.add(key, True, timeout=60 * 60 * 24 * 2):  # 2 days safety
         return
 
     try:
         result = run_no_show_sweep(today=today, ban_threshold=3)
-        cache.set(CACHE_KEY, today_str, timeout=60
-                  * 60 * 24 * 2)  # 2 days safety
         logger.info(
             "No-show sweep ran on staff login: scanned=%s marked=%s barred=%s",
             result.scanned, result.marked_no_show, result.barred_customers
         )
     except Exception:
-        # Never block login because of sweep issues
+        # Never block login because of sweep issues; the next staff
+        # login tries again
+        cache.delete(key)
         logger.exception("No-show sweep failed during staff login")
+
+
+@receiver(post_save, sender=Customer)
+def index_customer_on_save(sender, instance, **kwargs):
+    # Only touch the lookup index once the row is really committed
+    transaction.on_commit(lambda: customer_index.upsert(instance))
+
+
+@receiver(post_delete, sender=Customer)
+def unindex_customer_on_delete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: customer_index.remove(pk))
+
+
+@receiver(post_save, sender=TimeSlotAvailability)
+@receiver(post_delete, sender=TimeSlotAvailability)
+def invalidate_availability(sender, instance, **kwargs):
+    AVAILABILITY.invalidate()
+
+
+@receiver(post_save, sender=Customer)
+def count_customer_on_create(sender, instance, created, **kwargs):
+    if created:
+        customers_changed(+1)
+
+
+@receiver(post_delete, sender=Customer)
+def count_customer_on_delete(sender, instance, **kwargs):
+    customers_changed(-1)
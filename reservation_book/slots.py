@@ -0,0 +1,192 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from reservation_book.cache import AVAILABILITY
+from reservation_book.constants import SLOT_LABELS
+from reservation_book.models import TimeSlotAvailability
+
+# Slot math shared by the booking views, the staff views and management
+# commands. Kept free of forms, mail and auth imports so a command that
+# only needs to know which slots a booking covers doesn't load the view
+# layer.
+
+
+def default_tables_per_slot() -> int:
+    """
+    Central place for your capacity-per-slot default.
+
+    Priority:
+    1) settings.DEFAULT_TABLES_PER_SLOT (if you define it)
+    2) settings.TABLES_PER_SLOT
+    3) fallback = 20
+    """
+    for attr in ("DEFAULT_TABLES_PER_SLOT", "TABLES_PER_SLOT"):
+        val = getattr(settings, attr, None)
+        if isinstance(val, int) and val > 0:
+            return val
+        # allow strings like "20" in env-configured settings
+        if isinstance(val, str) and val.isdigit() and int(val) > 0:
+            return int(val)
+    return 20
+
+
+def to_int(value, default=0):
+    """
+    Coerce None/blank to int default.
+    """
+    try:
+        return int(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def slot_order():
+    """
+    Returns slot keys in display order, based purely on SLOT_LABELS.
+    """
+    return list(SLOT_LABELS.keys())
+
+
+def covered_slots(start_slot: str, duration: int, until_close: bool = False):
+    """Slot keys a booking starting at `start_slot` occupies."""
+    slots = slot_order()
+    if start_slot not in slots:
+        return []
+    start_index = slots.index(start_slot)
+    if until_close:
+        return slots[start_index:]
+    end_index = min(start_index + max(int(duration or 1), 1), len(slots))
+    return slots[start_index:end_index]
+
+
+def timeslot_defaults(default_capacity=20):
+    """
+    Defaults for a NEW TimeSlotAvailability row.
+
+    Produces actual model field names, not bare slot keys.
+    """
+    data = {}
+    for key in SLOT_LABELS.keys():
+        data[f"number_of_tables_available_{key}"] = default_capacity
+        data[f"total_cust_demand_for_tables_{key}"] = 0
+    return data
+
+
+def update_ts_demand(ts, slots, tables_needed: int, delta_sign: int):
+    """
+    delta_sign: +1 to add demand, -1 to subtract demand
+    """
+    if tables_needed <= 0 or not slots:
+        return
+
+    update_fields = []
+    for s in slots:
+        field = f"total_cust_demand_for_tables_{s}"
+        current = to_int(getattr(ts, field, 0), 0)
+        new_val = max(current + (delta_sign * tables_needed), 0)
+        setattr(ts, field, new_val)
+        update_fields.append(field)
+
+    ts.save(update_fields=update_fields)
+
+
+def capacity_ok(ts, slots, tables_needed: int):
+    """
+    Ensure for each slot:
+        demand + tables_needed <= available
+    """
+    for s in slots:
+        avail_field = f"number_of_tables_available_{s}"
+        demand_field = f"total_cust_demand_for_tables_{s}"
+        available = to_int(getattr(ts, avail_field, 0), 0)
+        demand = to_int(getattr(ts, demand_field, 0), 0)
+        if demand + tables_needed > available:
+            return False, s, available, demand
+    return True, None, None, None
+
+
+def build_next_30_days(days=30):
+    """
+    Availability grid for the booking pages: one entry per day from today
+    with capacity and remaining tables per slot. Cached until the next
+    TimeSlotAvailability write (see signals).
+    """
+    today = timezone.localdate()
+    return AVAILABILITY.get_or_set(
+        f"{today.isoformat()}:{days}",
+        lambda: _grid(today, days, _window(today, days)))
+
+
+async def abuild_next_30_days(days=30):
+    """build_next_30_days() for async views; same cache entries."""
+    today = timezone.localdate()
+
+    async def build():
+        rows = [ts async for ts in _window(today, days)]
+        return _grid(today, days, rows)
+
+    return await AVAILABILITY.aget_or_set(
+        f"{today.isoformat()}:{days}", build)
+
+
+def _window(today, days):
+    # One range query for the whole window instead of one per day
+    return TimeSlotAvailability.objects.filter(
+        calendar_date__gte=today,
+        calendar_date__lt=today + timedelta(days=days),
+    )
+
+
+def _grid(today, days, rows):
+    defaults = timeslot_defaults()
+    by_date = {ts.calendar_date: ts for ts in rows}
+    out = []
+
+    for i in range(days):
+        d = today + timedelta(days=i)
+        ts = by_date.get(d)
+
+        slots = []
+        for key, label in SLOT_LABELS.items():
+
+            default_capacity = int(
+                defaults.get(f"number_of_tables_available_{key}", 20)
+            )
+
+            if ts is None:
+                capacity = default_capacity
+                demand = 0
+            else:
+                capacity = int(
+                    getattr(
+                        ts,
+                        f"number_of_tables_available_{key}",
+                        default_capacity,
+                    ) or default_capacity
+                )
+                demand = int(
+                    getattr(ts, f"total_cust_demand_for_tables_{key}", 0) or 0
+                )
+
+            remaining = max(capacity - demand, 0)
+
+            slots.append(
+                {
+                    "key": key,
+                    "label": label,
+                    "available": capacity,
+                    "remaining": remaining,
+                }
+            )
+
+        out.append(
+            {
+                "calendar_date": d,
+                "slots": slots,
+                "pk": ts.pk if ts else None,
+            }
+        )
+
+    return out
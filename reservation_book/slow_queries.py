@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from reservation_book.logs import get_logger
+from reservation_book.middleware import WRAPPER_FILES, call_site, current_view
+
+# Slow-query log.
+#
+# An execute wrapper installed on every connection (apps.ready) times each
+# statement. One that takes SLOW_QUERY_MS or longer is written as a JSON
+# line to SLOW_QUERY_FILE (rotated at SLOW_QUERY_MAX_BYTES) with its
+# normalized SQL, the URL name of the view and the project call site that
+# ran it. Parameter values are never recorded (they hold emails and
+# phone numbers).
+#
+# With SLOW_QUERY_EXPLAIN on, SELECTs also get the planner's EXPLAIN
+# (EXPLAIN QUERY PLAN on SQLite) from the same connection and parameters,
+# at most once per SLOW_QUERY_EXPLAIN_INTERVAL per statement shape, inside
+# a savepoint so a failing EXPLAIN cannot break the caller's transaction.
+# EXPLAIN does not run the query (no ANALYZE).
+#
+# staff_slow_queries groups the records by statement shape.
+
+WRAPPER_FILES.add(__file__)
+
+logger = logging.getLogger("reservation_book.slow_queries")
+log = get_logger("db")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """SQL with literals and placeholders as ?, IN-lists collapsed."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+class SlowQueryLog:
+    """connection.execute_wrapper() hook recording slow statements."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.explained = {}  # fingerprint -> monotonic time of last EXPLAIN
+        self.handler = None
+        self.writer = logging.getLogger("reservation_book.slow_queries.file")
+        self.writer.propagate = False
+        self.writer.setLevel(logging.INFO)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        threshold = getattr(settings, "SLOW_QUERY_MS", 0)
+        if 0 < threshold <= elapsed_ms:
+            try:
+                self.record(sql, params, many, context, elapsed_ms)
+            except Exception:  # never fail the query over its log entry
+                logger.exception("could not record slow query")
+        return result
+
+    def record(self, sql, params, many, context, elapsed_ms):
+        connection = context["connection"]
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        entry = {
+            "time": timezone.now().isoformat(),
+            "ms": round(elapsed_ms, 1),
+            "fingerprint": key,
+            "view": current_view.get(),
+            "site": call_site(),
+            "database": connection.alias,
+            "sql": normalized[:4000],
+            "plan": None,
+        }
+        if not many and self._should_explain(key, sql):
+            entry["plan"] = explain(connection, sql, params)
+        log.warning("slow_query", ms=entry["ms"], view=entry["view"] or "-",
+                    site=entry["site"], fingerprint=key)
+        self._writer().info(json.dumps(entry, default=str))
+
+    def _should_explain(self, key, sql):
+        if not getattr(settings, "SLOW_QUERY_EXPLAIN", True):
+            return False
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            return False
+        interval = getattr(settings, "SLOW_QUERY_EXPLAIN_INTERVAL", 600)
+        now = time.monotonic()
+        with self.lock:
+            last = self.explained.get(key)
+            if last is not None and now - last < interval:
+                return False
+            self.explained[key] = now
+        return True
+
+    def _writer(self):
+        path = Path(settings.SLOW_QUERY_FILE)
+        with self.lock:
+            if self.handler is None or self.handler.baseFilename != str(
+                    path.resolve()):
+                if self.handler is not None:
+                    self.writer.removeHandler(self.handler)
+                    self.handler.close()
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.handler = RotatingFileHandler(
+                    path, maxBytes=settings.SLOW_QUERY_MAX_BYTES,
+                    backupCount=settings.SLOW_QUERY_BACKUPS,
+                    encoding="utf-8")
+                self.writer.addHandler(self.handler)
+        return self.writer
+
+
+def explain(connection, sql, params):
+    """Plan lines for `sql`, or ["EXPLAIN failed: ..."]."""
+    prefix = connection.ops.explain_query_prefix()
+    # Connections are per thread: unhooking the wrappers keeps the EXPLAIN
+    # out of the request's query count and out of this log.
+    wrappers, connection.execute_wrappers = connection.execute_wrappers, []
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f"{prefix} {sql}", params)
+                rows = cursor.fetchall()
+    except Exception as exc:
+        return [f"EXPLAIN failed: {exc}"]
+    finally:
+        connection.execute_wrappers = wrappers
+    # Postgres: one text column per line; SQLite: (id, parent, _, detail)
+    return [str(row[-1]) for row in rows]
+
+
+SLOW_QUERIES = SlowQueryLog()
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver."""
+    if SLOW_QUERIES not in connection.execute_wrappers:
+        connection.execute_wrappers.append(SLOW_QUERIES)
+
+
+def read_records(path=None):
+    """Every record in the log file and its rotated backups, oldest first."""
+    path = Path(path or settings.SLOW_QUERY_FILE)
+    files = [path.with_name(f"{path.name}.{n}")
+             for n in range(settings.SLOW_QUERY_BACKUPS, 0, -1)] + [path]
+    records = []
+    for file in files:
+        try:
+            lines = file.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:  # torn line from a concurrent rotation
+                continue
+    return records
+
+
+def summarize(records):
+    """One row per statement shape, slowest total time first."""
+    shapes = {}
+    for record in records:
+        shape = shapes.setdefault(record["fingerprint"], {
+            "fingerprint": record["fingerprint"],
+            "sql": record["sql"],
+            "count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "views": set(),
+            "sites": set(),
+            "plan": None,
+            "last_seen": "",
+        })
+        shape["count"] += 1
+        shape["total_ms"] += record["ms"]
+        shape["max_ms"] = max(shape["max_ms"], record["ms"])
+        if record.get("view"):
+            shape["views"].add(record["view"])
+        shape["sites"].add(record["site"])
+        if record.get("plan"):
+            shape["plan"] = record["plan"]
+        shape["last_seen"] = max(shape["last_seen"], record["time"])
+    rows = sorted(shapes.values(), key=lambda s: -s["total_ms"])
+    for row in rows:
+        row["mean_ms"] = round(row["total_ms"] / row["count"], 1)
+        row["total_ms"] = round(row["total_ms"], 1)
+        row["views"] = sorted(row["views"])
+        row["sites"] = sorted(row["sites"])
+    return rows
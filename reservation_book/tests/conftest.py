@@ -0,0 +1,72 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils import timezone
+
+from reservation_book.models import (
+    Customer,
+    TableReservation,
+    TimeSlotAvailability,
+)
+from reservation_book.services.lifecycle import reservation_booked
+
+
+@pytest.fixture(autouse=True)
+def _plain_static_storage(settings):
+    # The manifest storage needs collectstatic; templates only need URLs.
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "staticfiles": {
+            "BACKEND":
+            "django.contrib.staticfiles.storage.StaticFilesStorage",
+        },
+    }
+
+
+@pytest.fixture(autouse=True)
+def _empty_caches():
+    # The database is rolled back after each test; the caches are not.
+    yield
+    for cache in caches.all(initialized_only=True):
+        cache.clear()
+
+
+@pytest.fixture
+def staff_client(client):
+    get_user_model().objects.create_user(
+        username="staff", email="staff@example.com", password="pass12345",
+        is_staff=True)
+    client.login(username="staff", password="pass12345")
+    return client
+
+
+@pytest.fixture
+def user_client(client):
+    get_user_model().objects.create_user(
+        username="guest", email="guest@example.com", password="pass12345")
+    client.login(username="guest", password="pass12345")
+    return client
+
+
+@pytest.fixture
+def book():
+    """
+    book(customer=None, day=None, slot="18_19", ...) creates a reservation
+    and runs the lifecycle hook, as the booking views do. Without a
+    customer it books a new one named after the slot; day defaults to
+    today.
+    """
+    def book(customer=None, day=None, slot="18_19",
+             status=TableReservation.STATUS_ACTIVE, phone=False, tables=1):
+        day = day or timezone.localdate()
+        if customer is None:
+            customer = Customer.objects.create(first_name="G",
+                                               last_name=slot)
+        ts, _ = TimeSlotAvailability.objects.get_or_create(calendar_date=day)
+        reservation = TableReservation.objects.create(
+            customer=customer, timeslot_availability=ts, reservation_date=day,
+            time_slot=slot, status=status, is_phone_reservation=phone,
+            number_of_tables_required_by_patron=tables)
+        reservation_booked(reservation)
+        return reservation
+    return book
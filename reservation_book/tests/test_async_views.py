@@ -0,0 +1,132 @@
+from datetime import timedelta
+from importlib import reload
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+
+from gambinos import urls as root_urls
+from reservation_book import urls
+from reservation_book.models import (
+    Customer,
+    TableReservation,
+    TimeSlotAvailability,
+)
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True, params=[False, True], ids=["sync", "async"])
+def async_views(request):
+    # urls.py picks the view variants on import; the root URLconf's
+    # include() keeps the patterns it first read
+    with override_settings(ASYNC_VIEWS=request.param):
+        _reload_urls()
+        yield request.param
+    _reload_urls()
+
+
+def _reload_urls():
+    reload(urls)
+    reload(root_urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_client():
+    return AsyncClient()
+
+
+@pytest.fixture
+def staff_async_client(async_client):
+    staff = User.objects.create_user(username="staff", password="pass12345",
+                                     is_staff=True)
+    async_client.force_login(staff)
+    return async_client
+
+
+def _get(client, path, data=None):
+    async def get():
+        return await client.get(path, data or {})
+    return async_to_sync(get)()
+
+
+def test_async_views_setting_picks_the_variant(async_views):
+    for name in ("availability", "ajax_lookup_customer"):
+        view = resolve(reverse(name)).func
+        assert view.__name__.endswith("_async") is async_views
+
+
+def test_availability_feed(async_client, settings):
+    settings.REQUEST_METRICS_SERVER_TIMING = True
+    today = timezone.localdate()
+    TimeSlotAvailability.objects.create(
+        calendar_date=today + timedelta(days=1),
+        number_of_tables_available_19_20=8,
+        total_cust_demand_for_tables_19_20=3)
+
+    resp = _get(async_client, reverse("availability"), {"days": "2"})
+
+    assert resp.status_code == 200
+    days = resp.json()["days"]
+    assert [d["date"] for d in days] == [
+        today.isoformat(), (today + timedelta(days=1)).isoformat()]
+    slot = next(s for s in days[1]["slots"] if s["key"] == "19_20")
+    assert slot["remaining"] == 5
+    assert resp["Server-Timing"].startswith("db;dur=")
+
+
+@pytest.mark.parametrize("days, expected", [("0", 1), ("90", 30),
+                                            ("x", 30)])
+def test_availability_days_is_clamped(async_client, days, expected):
+    resp = _get(async_client, reverse("availability"), {"days": days})
+
+    assert len(resp.json()["days"]) == expected
+
+
+def test_availability_is_get_only(async_client):
+    async def post():
+        return await async_client.post(reverse("availability"))
+    resp = async_to_sync(post)()
+
+    assert resp.status_code == 405
+
+
+def test_async_lookup_requires_staff(async_client):
+    resp = _get(async_client, reverse("ajax_lookup_customer"), {"q": "an"})
+    assert resp.status_code == 302
+    assert reverse("account_login") in resp["Location"]
+
+    guest = User.objects.create_user(username="guest", password="pass12345")
+    async_client.force_login(guest)
+    resp = _get(async_client, reverse("ajax_lookup_customer"), {"q": "an"})
+    assert resp.status_code == 403
+
+
+def test_async_lookup_finds_customers_and_reservations(staff_async_client):
+    anna = Customer.objects.create(first_name="Anna", last_name="Schmidt",
+                                   email="anna@example.com")
+    today = timezone.localdate()
+    ts = TimeSlotAvailability.objects.create(calendar_date=today)
+    booking = TableReservation.objects.create(
+        pk=42, customer=anna, timeslot_availability=ts, reservation_date=today,
+        time_slot="19_20")
+
+    resp = _get(staff_async_client, reverse("ajax_lookup_customer"),
+                {"q": "anna"})
+    assert [r["email"] for r in resp.json()["results"]] == [
+        "anna@example.com"]
+
+    resp = _get(staff_async_client, reverse("ajax_lookup_customer"),
+                {"q": "anna", "mode": "existing"})
+    assert [r["reservation_id"] for r in resp.json()["results"]] == [
+        booking.pk]
+
+    resp = _get(staff_async_client, reverse("ajax_lookup_customer"),
+                {"q": str(booking.pk)})
+    assert resp.json()["results"][0]["first_name"] == "Anna"
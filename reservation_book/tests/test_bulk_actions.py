@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book.models import (
+    Customer,
+    CustomerStats,
+    NoShowEvent,
+    ReservationStats,
+    TableReservation,
+)
+from reservation_book.services.lifecycle import count_reservation_stats
+
+pytestmark = pytest.mark.django_db
+
+
+def test_bulk_no_show_counts_once_and_bars_per_customer(staff_client, book):
+    yesterday = timezone.localdate() - timedelta(days=1)
+    ann = Customer.objects.create(first_name="Ann", last_name="A",
+                                  email="Ann@Example.com")
+    bob = Customer.objects.create(first_name="Bob", last_name="B")
+    missed = [book(ann, yesterday) for _ in range(3)] + [book(bob, yesterday)]
+    future = book(bob, timezone.localdate() + timedelta(days=3),
+                  tables=2)
+
+    resp = staff_client.post(
+        reverse("staff_bulk_no_show"),
+        {"ids": [r.pk for r in missed] + [future.pk, 999999]},
+    )
+
+    data = resp.json()
+    assert data["updated"] == [r.pk for r in missed]
+    assert data["skipped"] == {
+        str(future.pk): "not allowed yet", "999999": "not found"}
+    assert data["barred_customers"] == [ann.pk]
+    assert NoShowEvent.objects.filter(customer=ann).count() == 3
+    assert set(NoShowEvent.objects.values_list(
+        "customer_email", flat=True)) == {"ann@example.com", ""}
+
+    ann.refresh_from_db()
+    bob.refresh_from_db()
+    assert (ann.no_show_count, ann.barred) == (3, True)
+    assert (bob.no_show_count, bob.barred) == (1, False)
+    assert CustomerStats.objects.get(customer=ann).active_reservations == 0
+    assert CustomerStats.objects.get(customer=bob).active_tables_booked == 2
+
+    stats = ReservationStats.objects.get(pk=1)
+    assert {f: getattr(stats, f) for f in ReservationStats.COUNTER_FIELDS
+            } == count_reservation_stats()
+
+    again = staff_client.post(reverse("staff_bulk_no_show"),
+                              {"ids": ",".join(str(r.pk) for r in missed)})
+    assert again.json()["updated"] == []
+    assert NoShowEvent.objects.count() == 4
+
+
+def test_no_show_is_only_for_past_dates(staff_client, book):
+    today = timezone.localdate()
+    cust = Customer.objects.create(first_name="C", last_name="C")
+    # the earliest slot: over from 18:00 on, but still today's service
+    single, bulk = book(cust, today, "17_18"), book(cust, today, "17_18")
+
+    staff_client.post(reverse("mark_no_show", args=[single.pk]))
+    resp = staff_client.post(reverse("staff_bulk_no_show"),
+                             {"ids": [bulk.pk]})
+
+    assert resp.json()["skipped"] == {str(bulk.pk): "not allowed yet"}
+    assert set(TableReservation.objects.values_list("status", flat=True)) \
+        == {TableReservation.STATUS_ACTIVE}
+
+
+def test_bulk_complete_accepts_json_and_only_today(staff_client, book):
+    today = timezone.localdate()
+    cust = Customer.objects.create(first_name="C", last_name="C")
+    tonight = [book(cust, today), book(cust, today, "19_20")]
+    tomorrow = book(cust, today + timedelta(days=1))
+
+    resp = staff_client.post(
+        reverse("staff_bulk_complete"),
+        {"ids": [r.pk for r in tonight] + [tomorrow.pk]},
+        content_type="application/json",
+    )
+
+    data = resp.json()
+    assert data["updated_count"] == 2
+    assert data["skipped"] == {str(tomorrow.pk): "not allowed yet"}
+    assert [r["status"] for r in data["reservations"]] == [
+        TableReservation.STATUS_COMPLETED] * 2
+    assert CustomerStats.objects.get(customer=cust).active_reservations == 1
+
+
+def test_single_and_bulk_complete_store_the_same_fields(staff_client, book):
+    today = timezone.localdate()
+    cust = Customer.objects.create(first_name="C", last_name="C")
+    single, bulk = book(cust, today), book(cust, today, "19_20")
+
+    staff_client.post(reverse("mark_reservation_completed", args=[single.pk]))
+    staff_client.post(reverse("staff_bulk_complete"), {"ids": [bulk.pk]})
+
+    for reservation in (single, bulk):
+        reservation.refresh_from_db()
+        assert reservation.status == TableReservation.STATUS_COMPLETED
+        assert reservation.completed_at is not None
+
+
+def test_bulk_rejects_empty_payload(staff_client):
+    resp = staff_client.post(reverse("staff_bulk_complete"), {"ids": "x"})
+
+    assert resp.status_code == 400
@@ -0,0 +1,216 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from gambinos.settings import cache_settings
+from reservation_book import metrics, signals
+from reservation_book.cache import LocalLRU, Namespace
+from reservation_book.models import TimeSlotAvailability
+from reservation_book.slots import build_next_30_days
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def registry(settings):
+    settings.METRICS_ENABLED = True
+    settings.METRICS_DIR = ""
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+
+@pytest.fixture
+def db_cache(settings):
+    # The production default when REDIS_URL is unset
+    settings.CACHES = cache_settings("db")
+    call_command("createcachetable", verbosity=0)
+    yield
+    # Before settings restores CACHES: the L1 stores outlive the aliases
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def _sample(line_prefix):
+    for line in metrics.render().splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_local_lru_is_bounded_and_expires(monkeypatch):
+    lru = LocalLRU(max_entries=2)
+    lru.set("a", 1, ttl=60)
+    lru.set("b", 2, ttl=60)
+    lru.get("a")  # b is now least recently used
+    lru.set("c", 3, ttl=60)
+
+    assert lru.get("b") == (False, None)
+    assert lru.get("a") == (True, 1)
+
+    later = time.monotonic() + 61
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    assert lru.get("a") == (False, None)
+
+
+def test_local_copies_are_not_shared_with_callers():
+    cache.set("t:rows", [1, 2])
+    rows = cache.get("t:rows")
+    rows.append(3)
+
+    assert cache.get("t:rows") == [1, 2]
+
+
+def test_reads_fall_through_to_the_shared_tier(registry):
+    caches["shared"].set("t:key", "from another worker")
+
+    assert cache.get("t:key") == "from another worker"
+    assert cache.get("t:key") == "from another worker"
+    assert cache.get("t:absent") is None
+
+    assert _sample('gambinos_cache_tier_hits_total{cache="t",tier="l2"}') == 1
+    assert _sample('gambinos_cache_tier_hits_total{cache="t",tier="l1"}') == 1
+    assert _sample(
+        'gambinos_cache_requests_total{cache="t",result="miss"}') == 1
+
+
+def test_shared_tier_errors_are_misses(monkeypatch):
+    def down(*args, **kwargs):
+        raise ConnectionError("cache server gone")
+
+    monkeypatch.setattr(caches["shared"], "get", down)
+    monkeypatch.setattr(caches["shared"], "set", down)
+
+    cache.set("t:key", 1)  # still kept locally
+    assert cache.get("t:key") == 1
+    assert cache.get("t:other", "default") == "default"
+
+
+def test_shared_tier_add_errors_fall_back_to_the_local_tier(monkeypatch):
+    def down(*args, **kwargs):
+        raise ConnectionError("cache server gone")
+
+    monkeypatch.setattr(caches["shared"], "add", down)
+
+    assert cache.add("t:claim", 1) is True
+    assert cache.add("t:claim", 2) is False
+    assert cache.get("t:claim") == 1
+
+
+def test_namespace_invalidates_on_commit(django_capture_on_commit_callbacks):
+    ns = Namespace("t")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert ns.get_or_set("k", compute) == 1
+    assert ns.get_or_set("k", compute) == 1
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        ns.invalidate()
+    assert ns.get_or_set("k", compute) == 1  # not committed yet
+
+    for callback in callbacks:
+        callback()
+    assert ns.get_or_set("k", compute) == 2
+
+
+def test_availability_grid_is_cached_until_a_row_changes(
+        django_assert_num_queries, django_capture_on_commit_callbacks):
+    today = timezone.localdate()
+    ts = TimeSlotAvailability.objects.create(
+        calendar_date=today, number_of_tables_available_19_20=8)
+
+    build_next_30_days()
+    with django_assert_num_queries(0):
+        grid = build_next_30_days()
+    assert grid[0]["slots"][2]["remaining"] == 8
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ts.total_cust_demand_for_tables_19_20 = 3
+        ts.save(update_fields=["total_cust_demand_for_tables_19_20"])
+
+    assert build_next_30_days()[0]["slots"][2]["remaining"] == 5
+
+
+def test_no_show_sweep_runs_once_a_day(monkeypatch):
+    runs = []
+
+    def sweep(**kwargs):
+        runs.append(kwargs)
+        raise RuntimeError("first attempt fails")
+
+    monkeypatch.setattr(signals, "run_no_show_sweep", sweep)
+    staff = SimpleNamespace(is_staff=True)
+
+    signals.run_no_show_sweep_on_staff_login(None, None, staff)
+    assert len(runs) == 1  # failed: the day is not claimed
+
+    def sweep(**kwargs):
+        runs.append(kwargs)
+        return SimpleNamespace(scanned=0, marked_no_show=0,
+                               barred_customers=0)
+
+    monkeypatch.setattr(signals, "run_no_show_sweep", sweep)
+    signals.run_no_show_sweep_on_staff_login(None, None, staff)
+    signals.run_no_show_sweep_on_staff_login(None, None, staff)
+    assert len(runs) == 2
+
+
+def test_db_shared_tier_adds_no_queries_to_hot_reads(
+        db_cache, client, django_assert_num_queries,
+        django_capture_on_commit_callbacks):
+    today = timezone.localdate()
+    ts = TimeSlotAvailability.objects.create(
+        calendar_date=today, number_of_tables_available_19_20=8)
+
+    with django_assert_num_queries(1):
+        build_next_30_days()
+    with django_assert_num_queries(0):
+        build_next_30_days()
+    with django_capture_on_commit_callbacks(execute=True):
+        ts.total_cust_demand_for_tables_19_20 = 3
+        ts.save(update_fields=["total_cust_demand_for_tables_19_20"])
+    with django_assert_num_queries(1):
+        grid = build_next_30_days()
+    assert grid[0]["slots"][2]["remaining"] == 5
+
+    staff = get_user_model().objects.create_user(
+        username="staff", password="pass12345", is_staff=True)
+    client.force_login(staff)
+    for _ in range(2):
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(reverse("staff_dashboard"))
+        sql = [q["sql"] for q in ctx.captured_queries]
+        assert len([s for s in sql if "reservationstats" in s]) == 1
+        assert not [s for s in sql if "reservation_book_cache" in s]
+
+
+def test_no_show_sweep_runs_while_the_shared_tier_is_down(monkeypatch):
+    def down(*args, **kwargs):
+        raise ConnectionError("cache server gone")
+
+    runs = []
+
+    def sweep(**kwargs):
+        runs.append(kwargs)
+        return SimpleNamespace(scanned=0, marked_no_show=0,
+                               barred_customers=0)
+
+    monkeypatch.setattr(caches["shared"], "add", down)
+    monkeypatch.setattr(signals, "run_no_show_sweep", sweep)
+    staff = SimpleNamespace(is_staff=True)
+
+    signals.run_no_show_sweep_on_staff_login(None, None, staff)
+    signals.run_no_show_sweep_on_staff_login(None, None, staff)
+    assert len(runs) == 1
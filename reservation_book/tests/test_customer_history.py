@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book.models import (
+    CancellationEvent,
+    Customer,
+    NoShowEvent,
+    TableReservation,
+)
+from reservation_book.services import history
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def timeline(book):
+    """Customer with one of every entry type on different days."""
+    today = timezone.localdate()
+    cust = Customer.objects.create(first_name="Reg", last_name="Ular")
+    upcoming = book(cust, today + timedelta(days=2))
+    done = book(cust, today - timedelta(days=1),
+                status=TableReservation.STATUS_COMPLETED)
+    missed = book(cust, today - timedelta(days=3), "20_21",
+                  status=TableReservation.STATUS_NO_SHOW)
+    NoShowEvent.objects.create(
+        reservation_id=missed.pk, reservation_date=missed.reservation_date,
+        time_slot="20_21", customer=cust, marked_by_staff=True)
+    CancellationEvent.objects.create(
+        reservation_id=10_000, reservation_date=today - timedelta(days=2),
+        time_slot="19_20", customer=cust, created_at=timezone.now())
+    book(Customer.objects.create(first_name="Other"), today)
+    return cust, upcoming, done, missed
+
+
+def test_timeline_merges_sources_newest_first(timeline):
+    cust, upcoming, done, missed = timeline
+
+    page = history.customer_timeline(cust.pk)
+
+    assert [(e["kind"], e["ref_id"]) for e in page.entries] == [
+        ("reservation", upcoming.pk),
+        ("reservation", done.pk),
+        ("cancellation", 10_000),
+        ("no_show", missed.pk),  # shown once, as the event
+    ]
+    assert history.timeline_counts(cust.pk) == {
+        "reservations": 3, "active": 1, "completed": 1,
+        "cancelled": 1, "no_show": 1,
+    }
+
+
+def test_timeline_keyset_pages_round_trip(timeline):
+    cust = timeline[0]
+    full = history.customer_timeline(cust.pk).entries
+
+    first = history.customer_timeline(cust.pk, page_size=3)
+    second = history.customer_timeline(
+        cust.pk, after=history.entry_key(first.entries[-1]), page_size=3)
+    back = history.customer_timeline(
+        cust.pk, before=history.entry_key(second.entries[0]), page_size=3)
+
+    assert first.has_next and not second.has_next
+    assert first.entries + second.entries == full
+    assert back.entries == first.entries and not back.has_prev
+
+
+def test_history_page_renders_cursor_links(staff_client, timeline,
+                                           monkeypatch):
+    monkeypatch.setattr(history, "TIMELINE_PAGE_SIZE", 2)
+    url = reverse("user_reservation_history", args=[timeline[0].pk])
+
+    resp = staff_client.get(url)
+    older = staff_client.get(f"{url}?{resp.context['next_query']}")
+
+    assert len(resp.context["entries"]) == 2
+    assert [e["kind"] for e in older.context["entries"]] == [
+        "cancellation", "no_show"]
+    assert older.context["prev_query"]
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book.models import (
+    Customer,
+    TableReservation,
+    TimeSlotAvailability,
+)
+from reservation_book.services.customers import SESSION_CUSTOMER_KEY
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+def make_reservation_for(customer):
+    day = timezone.localdate() + timedelta(days=3)
+    ts = TimeSlotAvailability.objects.create(calendar_date=day)
+    return TableReservation.objects.create(
+        customer=customer,
+        timeslot_availability=ts,
+        reservation_date=day,
+        time_slot="18_19",
+    )
+
+
+def test_backfill_links_by_case_insensitive_email():
+    user = User.objects.create_user(username="ann", email="Ann@Example.com",
+                                    password="pass12345")
+    other = Customer.objects.create(first_name="X", last_name="Y",
+                                    email="nobody@example.com")
+    ann = Customer.objects.create(first_name="Ann", last_name="A",
+                                  email="ann@example.com")
+
+    call_command("backfill_customer_users", "--batch-size", "1")
+
+    ann.refresh_from_db()
+    other.refresh_from_db()
+    assert ann.user == user
+    assert other.user is None
+
+
+def test_my_reservations_links_and_caches_customer(client):
+    user = User.objects.create_user(username="ann", email="ann@example.com",
+                                    password="pass12345")
+    customer = Customer.objects.create(first_name="Ann", last_name="A",
+                                       email="ann@example.com")
+    make_reservation_for(customer)
+    client.login(username="ann", password="pass12345")
+
+    resp = client.get(reverse("my_reservations"))
+    assert resp.status_code == 200
+    assert resp.context["customer"] == customer
+
+    customer.refresh_from_db()
+    assert customer.user == user
+    assert client.session[SESSION_CUSTOMER_KEY] == {
+        "user": user.pk, "customer": customer.pk}
+
+
+def test_only_linked_customer_may_edit(client):
+    User.objects.create_user(username="ann", email="ann@example.com",
+                             password="pass12345")
+    mallory = Customer.objects.create(first_name="M", last_name="M",
+                                      email="mallory@example.com")
+    reservation = make_reservation_for(mallory)
+
+    client.login(username="ann", password="pass12345")
+    resp = client.get(reverse("update_reservation", args=[reservation.id]))
+    assert resp.status_code == 302
+    assert resp.url == reverse("my_reservations")
+
+
+def test_anonymous_cannot_cancel(client):
+    customer = Customer.objects.create(first_name="Ann", last_name="A",
+                                       email="ann@example.com")
+    reservation = make_reservation_for(customer)
+
+    client.post(reverse("cancel_reservation", args=[reservation.id]))
+    assert TableReservation.objects.filter(pk=reservation.pk).exists()
@@ -0,0 +1,64 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from reservation_book.models import (
+    Customer,
+    NoShowEvent,
+    ReservationSeries,
+)
+from reservation_book.services.customer_merge import merge_duplicates
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+def test_dry_run_reports_clusters_without_changes():
+    Customer.objects.create(first_name="Ann", last_name="A",
+                            email="ann@example.com")
+    Customer.objects.create(first_name="Ann", last_name="A",
+                            email="ANN@example.com")
+    Customer.objects.create(first_name="Bob", last_name="B",
+                            phone="0171 2345678")
+    Customer.objects.create(first_name="bob", last_name="b",
+                            phone="+49 171 2345678")
+    Customer.objects.create(first_name="Cy", last_name="C",
+                            email="cy@example.com")
+
+    report = merge_duplicates(dry_run=True, batch_size=1)
+
+    assert [len(c.duplicate_ids) for c in report.clusters] == [1, 1]
+    assert Customer.objects.count() == 5
+
+
+def test_merge_moves_history_and_folds_counters(book):
+    user = User.objects.create_user(username="ann", email="ann@example.com",
+                                    password="pass12345")
+    legacy = Customer.objects.create(
+        first_name="Ann", last_name="", email="Ann@Example.com",
+        phone="0171 2345678", cancellations_count=2, no_show_count=1,
+        barred=True)
+    linked = Customer.objects.create(
+        first_name="Ann", last_name="A", email="ann@example.com",
+        user=user, cancellations_count=1)
+    old_booking = book(legacy)
+    series = ReservationSeries.objects.create(customer=legacy)
+    event = NoShowEvent.objects.create(reservation_id=old_booking.pk,
+                                       customer=legacy)
+
+    call_command("merge_duplicate_customers")
+
+    assert list(Customer.objects.values_list("pk", flat=True)) == [linked.pk]
+    linked.refresh_from_db()
+    assert linked.cancellations_count == 3
+    assert linked.no_show_count == 1
+    assert linked.barred is True
+    assert linked.phone == "0171 2345678"
+    assert linked.user == user
+    old_booking.refresh_from_db()
+    series.refresh_from_db()
+    event.refresh_from_db()
+    assert old_booking.customer == linked
+    assert series.customer == linked
+    assert event.customer == linked
@@ -0,0 +1,119 @@
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+
+from reservation_book.models import Customer
+from reservation_book.services.customer_search import (
+    CustomerSearchIndex,
+    customer_index,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def customers():
+    return [
+        Customer.objects.create(first_name="Anna", last_name="Schmidt",
+                                email="anna@example.com",
+                                phone="+49 171 2345678"),
+        Customer.objects.create(first_name="Bernd", last_name="Albers",
+                                email="bernd@example.com"),
+        Customer.objects.create(first_name="Johanna", last_name="Zander",
+                                email="jz@example.org"),
+    ]
+
+
+def test_cold_index_returns_none():
+    assert CustomerSearchIndex().search("anna") is None
+
+
+def test_search_matches_substrings_in_name_order(customers):
+    index = CustomerSearchIndex(max_age=0)
+    index.rebuild()
+
+    names = [r["last_name"] for r in index.search("anna")]
+    assert names == ["Schmidt", "Zander"]
+
+    assert [r["email"] for r in index.search("example.org")] == [
+        "jz@example.org"]
+    assert [r["first_name"] for r in index.search("2345")] == ["Anna"]
+    # Short queries bypass the trigram postings
+    assert [r["last_name"] for r in index.search("nd")] == [
+        "Albers", "Zander"]
+    assert index.search("nobody") == []
+
+
+def test_search_respects_limit(customers):
+    index = CustomerSearchIndex(max_age=0)
+    index.rebuild()
+    assert len(index.search("example", limit=2)) == 2
+
+
+def test_incremental_updates(customers):
+    index = CustomerSearchIndex(max_age=0)
+    index.rebuild()
+
+    anna = customers[0]
+    anna.last_name = "Weber"
+    index.upsert(anna)
+    assert index.search("schmidt") == []
+    assert [r["last_name"] for r in index.search("weber")] == ["Weber"]
+
+    index.remove(anna.pk)
+    assert index.search("weber") == []
+
+
+def test_signals_keep_shared_index_current(customers,
+                                           django_capture_on_commit_callbacks):
+    customer_index.rebuild()
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            Customer.objects.create(first_name="Carla", last_name="Novak",
+                                    email="carla@example.com")
+        assert [r["email"] for r in customer_index.search("novak")] == [
+            "carla@example.com"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Customer.objects.filter(email="carla@example.com").delete()
+        assert customer_index.search("novak") == []
+    finally:
+        customer_index.clear()
+
+
+def test_lookup_view_uses_db_when_index_cold(staff_client, customers):
+    customer_index.clear()
+    resp = staff_client.get(reverse("ajax_lookup_customer"), {"q": "anna"})
+    assert resp.status_code == 200
+    emails = [r["email"] for r in resp.json()["results"]]
+    assert emails == ["anna@example.com", "jz@example.org"]
+
+
+def test_lookup_view_finds_customers_missing_from_the_index(
+        staff_client, customers):
+    customer_index.rebuild()
+    try:
+        # Saved by another worker: this one's index has not seen it yet
+        Customer.objects.create(first_name="Carla", last_name="Novak",
+                                email="carla@example.com")
+
+        resp = staff_client.get(reverse("ajax_lookup_customer"),
+                                {"q": "novak"})
+
+        assert [r["email"] for r in resp.json()["results"]] == [
+            "carla@example.com"]
+    finally:
+        customer_index.clear()
+
+
+def test_cold_lookup_writes_nothing_to_the_cache(staff_client, customers,
+                                                 monkeypatch):
+    customer_index.clear()
+    writes = []
+    monkeypatch.setattr(caches["default"], "set",
+                        lambda key, *args, **kwargs: writes.append(key))
+
+    staff_client.get(reverse("ajax_lookup_customer"), {"q": "anna"})
+    staff_client.get(reverse("ajax_lookup_customer"), {"q": "ann"})
+
+    assert writes == []
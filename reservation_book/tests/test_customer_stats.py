@@ -0,0 +1,73 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book.models import (
+    Customer,
+    CustomerStats,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def stats_for(customer):
+    row = CustomerStats.objects.get(customer=customer)
+    return (row.reservations, row.active_reservations, row.tables_booked,
+            row.active_tables_booked)
+
+
+def test_stats_follow_complete_and_cancel(staff_client, book):
+    ann = Customer.objects.create(first_name="Ann", last_name="A",
+                                  email="ann@example.com")
+    today = timezone.localdate()
+    dinner = book(ann, today, tables=2)
+    later = book(ann, today + timedelta(days=2), tables=3)
+    assert stats_for(ann) == (2, 2, 5, 5)
+
+    staff_client.post(reverse("mark_reservation_completed",
+                              args=[dinner.pk]))
+    assert stats_for(ann) == (2, 1, 5, 3)
+
+    staff_client.post(reverse("cancel_reservation", args=[later.pk]))
+    assert stats_for(ann) == (1, 0, 2, 0)
+
+    out = StringIO()
+    call_command("verify_customer_stats", stdout=out)
+    assert "drifted=0" in out.getvalue()
+
+
+def test_verify_fixes_drift(book):
+    bob = Customer.objects.create(first_name="Bob", last_name="B")
+    book(bob, timezone.localdate(), tables=4)
+    CustomerStats.objects.filter(customer=bob).update(reservations=9)
+
+    call_command("verify_customer_stats", "--fix", stdout=StringIO())
+
+    assert stats_for(bob) == (1, 1, 4, 4)
+
+
+def test_overview_searches_sorts_and_paginates(staff_client, monkeypatch,
+                                               book):
+    from reservation_book.views import staff as staff_views
+    monkeypatch.setattr(staff_views, "CUSTOMER_OVERVIEW_PAGE_SIZE", 1)
+    today = timezone.localdate()
+    ann = Customer.objects.create(first_name="Ann", last_name="Smith")
+    bob = Customer.objects.create(first_name="Bob", last_name="Smith")
+    Customer.objects.create(first_name="Cy", last_name="Jones")
+    book(bob, today)
+    book(bob, today)
+
+    url = reverse("user_reservations_overview")
+    resp = staff_client.get(url, {"q": "smith", "sort": "total",
+                                  "dir": "desc"})
+    assert [c.pk for c in resp.context["customers"]] == [bob.pk]
+    assert resp.context["customers"][0].total_reservations == 2
+
+    resp = staff_client.get(f"{url}?{resp.context['next_query']}")
+    assert [c.pk for c in resp.context["customers"]] == [ann.pk]
+    assert resp.context["customers"][0].total_reservations == 0
+    assert not resp.context["next_query"]
@@ -0,0 +1,49 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book.models import (
+    Customer,
+    ReservationStats,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_dashboard_reads_counters_kept_by_lifecycle(staff_client, book):
+    today = timezone.localdate()
+    ann = Customer.objects.create(first_name="Ann", last_name="A",
+                                  email="ann@example.com")
+    bob = Customer.objects.create(first_name="Bob", last_name="B")
+    book(ann, today + timedelta(days=1))
+    cancelled = book(bob, today + timedelta(days=2), phone=True)
+    missed = book(bob, today - timedelta(days=1))
+
+    staff_client.post(reverse("cancel_reservation", args=[cancelled.pk]))
+    staff_client.post(reverse("mark_no_show", args=[missed.pk]))
+
+    resp = staff_client.get(reverse("staff_dashboard"))
+    ctx = resp.context
+    assert ctx["total_reservations"] == 2
+    assert ctx["upcoming_reservations_count"] == 1
+    assert ctx["phone_reservations_count"] == 0
+    assert ctx["registered_customers_count"] == 2
+    assert ctx["cancelled_reservations_count"] == 1
+    assert ctx["no_show_count"] == 1
+
+    out = StringIO()
+    call_command("recount_reservation_stats", stdout=out)
+    assert "drifted=0" in out.getvalue()
+
+
+def test_recount_corrects_drift():
+    Customer.objects.create(first_name="Cy", last_name="C")
+    ReservationStats.objects.filter(pk=1).update(customers_count=40)
+
+    call_command("recount_reservation_stats", stdout=StringIO())
+
+    assert ReservationStats.get_solo().customers_count == 1
@@ -0,0 +1,55 @@
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from reservation_book.models import (
+    CancellationEvent,
+    Customer,
+    NoShowEvent,
+    TableReservation,
+    TimeSlotAvailability,
+)
+from reservation_book.views.common import _apply_ban_if_needed
+
+pytestmark = pytest.mark.django_db
+
+
+def test_backfill_maps_events_by_reservation_then_email():
+    ann = Customer.objects.create(first_name="Ann", last_name="A",
+                                  email="ann@example.com")
+    bob = Customer.objects.create(first_name="Bob", last_name="B",
+                                  email="bob@example.com")
+    day = timezone.localdate()
+    ts = TimeSlotAvailability.objects.create(calendar_date=day)
+    reservation = TableReservation.objects.create(
+        customer=bob, timeslot_availability=ts, reservation_date=day,
+        time_slot="18_19", status=TableReservation.STATUS_NO_SHOW)
+
+    cancel = CancellationEvent.objects.create(
+        reservation_id=999, customer_email="ANN@example.com ")
+    orphan = CancellationEvent.objects.create(
+        reservation_id=1000, customer_email="gone@example.com")
+    # Email snapshot is stale; the surviving reservation wins
+    no_show = NoShowEvent.objects.create(
+        reservation_id=reservation.id, customer_email="ann@example.com")
+
+    call_command("backfill_event_customers", "--batch-size", "1")
+
+    cancel.refresh_from_db()
+    orphan.refresh_from_db()
+    no_show.refresh_from_db()
+    assert cancel.customer == ann
+    assert orphan.customer is None
+    assert no_show.customer == bob
+
+
+def test_ban_counts_events_by_customer():
+    ann = Customer.objects.create(first_name="Ann", last_name="A",
+                                  email="ann@example.com")
+    for i in range(3):
+        NoShowEvent.objects.create(reservation_id=i + 1, customer=ann)
+
+    assert _apply_ban_if_needed(ann.id, threshold=3) is True
+    ann.refresh_from_db()
+    assert ann.barred
+    assert _apply_ban_if_needed(ann.id, threshold=3) is False
@@ -0,0 +1,95 @@
+import csv
+import io
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient
+from django.urls import reverse
+
+from reservation_book.models import (
+    Customer,
+    NoShowEvent,
+    TableReservation,
+)
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+def test_staff_csv_export_streams_filtered_rows(staff_client, book):
+    ann = Customer.objects.create(first_name="=HYPERLINK()", last_name="A",
+                                  email="ann@example.com",
+                                  phone="+49 171 2345678")
+    active = book(ann)
+    book(ann, status=TableReservation.STATUS_COMPLETED)
+
+    resp = staff_client.get(reverse("staff_export"),
+                            {"kind": "reservations", "status": "active"})
+
+    assert resp.status_code == 200
+    assert resp.streaming
+    rows = list(csv.reader(io.StringIO(
+        b"".join(resp.streaming_content).decode())))
+    assert rows[0][:3] == ["id", "date", "time_slot"]
+    assert len(rows) == 2
+    assert rows[1][0] == str(active.pk)
+    assert "'=HYPERLINK()" in rows[1]
+    assert "+49 171 2345678" in rows[1]
+
+
+def test_export_streams_under_asgi(book):
+    staff = User.objects.create_user(username="staff", password="pass12345",
+                                     is_staff=True)
+    client = AsyncClient()
+    client.force_login(staff)
+    ann = Customer.objects.create(first_name="Ann", last_name="A",
+                                  email="ann@example.com")
+    booked = [book(ann) for _ in range(3)]
+
+    async def export():
+        resp = await client.get(reverse("staff_export"))
+        # A sync iterator would be drained into a list before sending
+        assert resp.is_async
+        return b"".join([part async for part in resp.streaming_content])
+
+    rows = list(csv.reader(io.StringIO(async_to_sync(export)().decode())))
+    assert [row[0] for row in rows[1:]] == [str(r.pk) for r in booked]
+
+
+@pytest.mark.parametrize("param", ["format", "kind", "status", "source"])
+def test_export_errors_do_not_reflect_input(staff_client, param):
+    payload = "<script>alert(1)</script>"
+
+    resp = staff_client.get(reverse("staff_export"), {param: payload})
+
+    assert resp.status_code == 400
+    assert resp["Content-Type"].startswith("text/plain")
+    assert b"<script>" not in resp.content
+
+
+def test_export_command_rejects_status_on_events():
+    NoShowEvent.objects.create(reservation_id=1, customer_email="a@b.c")
+    out = io.StringIO()
+
+    call_command("export_reservations", "--kind", "no_shows", stdout=out)
+    assert out.getvalue().splitlines()[1].startswith("1,1,")
+
+    with pytest.raises(CommandError, match="cannot be filtered by status"):
+        call_command("export_reservations", "--kind", "no_shows",
+                     "--status", "active", stdout=io.StringIO())
+
+
+def test_staff_xlsx_export(staff_client, book):
+    openpyxl = pytest.importorskip("openpyxl")
+    book(Customer.objects.create(first_name="Bo", last_name="B"))
+
+    resp = staff_client.get(reverse("staff_export"), {"format": "xlsx"})
+
+    sheet = openpyxl.load_workbook(
+        io.BytesIO(b"".join(resp.streaming_content))).active
+    rows = list(sheet.values)
+    assert rows[0][0] == "id"
+    assert rows[1][7] == "Bo"
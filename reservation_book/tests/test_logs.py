@@ -0,0 +1,65 @@
+import json
+import logging
+
+import pytest
+
+from reservation_book.logs import JsonFormatter, get_logger
+
+
+@pytest.fixture
+def struct_log(caplog):
+    # "reservation_book" does not propagate to root, where caplog listens
+    parent = logging.getLogger("reservation_book")
+    parent.addHandler(caplog.handler)
+    yield caplog
+    parent.removeHandler(caplog.handler)
+
+
+def test_disabled_level_never_calls_lazy_fields(struct_log):
+    struct_log.set_level("INFO", logger="reservation_book.edit")
+
+    def expensive():
+        raise AssertionError("field evaluated while DEBUG is off")
+
+    get_logger("edit").debug("edit.start", demands=expensive)
+
+    assert struct_log.records == []
+
+
+def test_subsystem_level_and_logfmt_message(struct_log):
+    struct_log.set_level("DEBUG", logger="reservation_book.edit")
+
+    get_logger("edit").debug("edit.after_apply", reservation=7,
+                             note="two words", demands=lambda: {"19_20": 3})
+    get_logger("booking").debug("booking.post")  # still at INFO
+
+    [record] = struct_log.records
+    assert record.name == "reservation_book.edit"
+    assert record.getMessage() == (
+        'edit.after_apply reservation=7 note="two words" '
+        'demands={"19_20":3}')
+    assert record.funcName == "test_subsystem_level_and_logfmt_message"
+
+
+def test_debug_sampling(struct_log, settings):
+    struct_log.set_level("DEBUG", logger="reservation_book.booking")
+    settings.LOG_SAMPLE_RATES = {"booking": 0.0}
+    log = get_logger("booking")
+
+    log.debug("booking.post")
+    log.info("booking.invalid")  # sampling only thins DEBUG events
+
+    assert [r.levelname for r in struct_log.records] == ["INFO"]
+
+
+def test_json_formatter_lifts_fields(struct_log):
+    struct_log.set_level("INFO", logger="reservation_book.booking")
+    get_logger("booking").info("booking.invalid", channel="phone",
+                               errors=["email"])
+
+    data = json.loads(JsonFormatter().format(struct_log.records[0]))
+
+    assert data["event"] == "booking.invalid"
+    assert data["channel"] == "phone"
+    assert data["errors"] == ["email"]
+    assert data["logger"] == "reservation_book.booking"
@@ -0,0 +1,200 @@
+import json
+import time
+from datetime import date, timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book import metrics
+from reservation_book.models import TableReservation, TimeSlotAvailability
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(settings):
+    settings.METRICS_ENABLED = True
+    settings.METRICS_DIR = ""
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+
+def _sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def _booking(day, slot="19_20"):
+    return {
+        "reservation_date": day.isoformat(),
+        "time_slot": slot,
+        "timeslot_availability": day.isoformat(),
+        "duration_hours": 1,
+        "number_of_tables_required_by_patron": 1,
+        "first_name": "Gina",
+        "last_name": "Guest",
+        "email": "guest@example.com",
+    }
+
+
+def test_booking_posts_are_counted_by_result(user_client):
+    day = timezone.localdate() + timedelta(days=3)
+    TimeSlotAvailability.objects.create(
+        calendar_date=day, number_of_tables_available_19_20=5)
+    user_client.post(reverse("make_reservation"), {})
+    user_client.post(reverse("make_reservation"), _booking(day))
+
+    assert TableReservation.objects.filter(reservation_date=day).exists()
+    text = metrics.render()
+    assert _sample(text, 'gambinos_bookings_total{channel="online",'
+                         'result="validation"}') == 1
+    assert _sample(text, 'gambinos_bookings_total{channel="online",'
+                         'result="created"}') == 1
+    assert _sample(text, 'gambinos_booking_seconds_count'
+                         '{channel="online"}') == 2
+
+
+def test_full_slot_counts_as_capacity(user_client):
+    day = timezone.localdate() + timedelta(days=3)
+    TimeSlotAvailability.objects.create(
+        calendar_date=day, number_of_tables_available_19_20=1,
+        total_cust_demand_for_tables_19_20=1)
+
+    user_client.post(reverse("make_reservation"), _booking(day))
+
+    assert _sample(metrics.render(), 'gambinos_bookings_total'
+                   '{channel="online",result="capacity"}') == 1
+
+
+def test_histogram_exposition_is_cumulative():
+    for seconds in (0.003, 0.2, 42):
+        metrics.CANCEL_SECONDS.observe(seconds)
+
+    text = metrics.render()
+    assert "# TYPE gambinos_cancel_seconds histogram" in text
+    assert _sample(text, 'gambinos_cancel_seconds_bucket{le="0.005"}') == 1
+    assert _sample(text, 'gambinos_cancel_seconds_bucket{le="0.25"}') == 2
+    assert _sample(text, 'gambinos_cancel_seconds_bucket{le="+Inf"}') == 3
+    assert _sample(text, "gambinos_cancel_seconds_count") == 3
+    assert _sample(text, "gambinos_cancel_seconds_sum") == pytest.approx(
+        42.203)
+
+
+def test_worker_files_are_summed(settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    other_worker = {
+        "gambinos_bookings_total": {'["phone", "created"]': 4},
+        "gambinos_email_send_seconds": {"[]": [1] + [0] * 11 + [0.004]},
+    }
+    (tmp_path / "99999-1.json").write_text(json.dumps(other_worker))
+
+    metrics.BOOKINGS.inc(channel="phone", result="created")
+    metrics.EMAIL_SEND_SECONDS.observe(0.002)
+
+    text = metrics.render()
+    assert _sample(text, 'gambinos_bookings_total{channel="phone",'
+                         'result="created"}') == 5
+    assert _sample(text, "gambinos_email_send_seconds_count") == 2
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_worker_file_is_not_rewritten_per_update(settings, tmp_path,
+                                                 monkeypatch):
+    settings.METRICS_DIR = str(tmp_path)
+    settings.METRICS_FLUSH_SECONDS = 60
+    writes = []
+    replace = metrics.os.replace
+    monkeypatch.setattr(metrics.os, "replace",
+                        lambda *args: writes.append(args) or replace(*args))
+
+    for _ in range(200):
+        metrics.cache_lookup("customer_session", hit=True)
+    assert len(writes) <= 1  # the flush thread may tick once
+
+    text = metrics.render()  # writes its own file before summing
+    assert _sample(text, 'gambinos_cache_requests_total{'
+                         'cache="customer_session",result="hit"}') == 200
+    metrics.render()
+    assert len(writes) <= 2  # nothing changed: no rewrite
+
+
+def test_disabled_metrics_record_nothing(settings):
+    settings.METRICS_ENABLED = False
+    metrics.cache_lookup("customer_session", hit=True)
+
+    assert "gambinos_cache_requests_total{" not in metrics.render()
+
+
+def test_endpoint_is_closed_to_other_addresses(user_client, client):
+    resp = user_client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.9")
+    assert resp.status_code == 403
+
+    resp = client.get(reverse("metrics"))  # test client is 127.0.0.1
+    assert resp.status_code == 200
+    assert resp["Content-Type"].startswith("text/plain; version=0.0.4")
+
+
+def test_staff_can_scrape_from_anywhere(staff_client):
+
+    resp = staff_client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.9")
+
+    assert resp.status_code == 200
+    assert b"# TYPE gambinos_bookings_total counter" in resp.content
+
+
+def _locked_select(seconds_by_call):
+    # stands in for a SELECT ... FOR UPDATE that waited `seconds`
+    sql = 'SELECT * FROM "reservation_book_timeslotavailability" FOR UPDATE'
+    for seconds in seconds_by_call:
+        metrics._time_row_locks(
+            lambda *args, s=seconds: time.sleep(s), sql, (), False,
+            {})
+
+
+def test_row_locks_are_tagged_by_site_and_date():
+    busy, quiet = date(2030, 5, 3), date(2030, 5, 6)
+    with metrics.row_lock("make_reservation", busy):
+        _locked_select([0.02, 0.02])
+    with metrics.row_lock("cancel_and_release", busy):
+        _locked_select([0.0])
+    with metrics.row_lock("make_reservation", quiet):
+        _locked_select([0.0])
+    _locked_select([0.0])  # untagged
+
+    first, second = metrics.lock_hotspots()
+    assert first["date"] == "2030-05-03" and first["waits"] == 3
+    assert first["sites"] == {"make_reservation": 2, "cancel_and_release": 1}
+    assert first["wait_seconds"] >= 0.04
+    assert first["p95_upper_seconds"] in (0.025, 0.05)
+    assert second["date"] == "2030-05-06"
+
+    text = metrics.render()
+    assert "gambinos_row_lock_wait_by_date_seconds" not in text
+    untagged = _sample(text, 'gambinos_row_lock_wait_seconds_count{table='
+                       '"reservation_book_timeslotavailability",'
+                       'site="other"}')
+    assert untagged == 1
+
+
+def test_past_lock_dates_expire():
+    today = timezone.localdate()
+    for day in (today - timedelta(days=1), today - timedelta(days=30)):
+        with metrics.row_lock("make_reservation", day):
+            _locked_select([0.0])
+
+    assert [row["date"] for row in metrics.lock_hotspots()] == [
+        str(today - timedelta(days=1))]
+
+
+def test_lock_hotspots_page(staff_client):
+    with metrics.row_lock("make_reservation", date(2030, 5, 3)):
+        _locked_select([0.0])
+
+    resp = staff_client.get(reverse("staff_lock_hotspots"))
+
+    assert resp.status_code == 200
+    assert b"2030-05-03" in resp.content
@@ -0,0 +1,72 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from reservation_book.models import Customer
+from reservation_book.services.customer_search import CustomerSearchIndex
+from reservation_book.services.phones import phone_digit_variants, to_e164
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ("0171 2345678", "+491712345678"),
+    ("+49 (171) 234-5678", "+491712345678"),
+    ("0049 171 2345678", "+491712345678"),
+    ("+44 20 7946 0958", "+442079460958"),
+    ("", ""),
+    ("call me", ""),
+])
+def test_to_e164(raw, expected):
+    assert to_e164(raw) == expected
+
+
+def test_phone_digit_variants():
+    assert phone_digit_variants("0171 23") == ["4917123", "17123"]
+    assert phone_digit_variants("+49 171") == ["49171"]
+    assert phone_digit_variants("5678") == ["5678"]
+    assert phone_digit_variants("anna") == []
+    assert phone_digit_variants("12") == []
+
+
+def test_save_keeps_e164_columns_in_sync():
+    c = Customer.objects.create(first_name="A", last_name="B",
+                                email="a@example.com", phone="0171 2345678")
+    assert c.phone_e164 == "+491712345678"
+
+    c.mobile = "030 1234567"
+    c.save(update_fields=["mobile"])
+    c.refresh_from_db()
+    assert c.mobile_e164 == "+49301234567"
+
+
+def test_backfill_command_fills_missing_columns():
+    c = Customer.objects.create(first_name="A", last_name="B",
+                                email="a@example.com", phone="0171 2345678")
+    Customer.objects.filter(pk=c.pk).update(phone_e164="")
+
+    call_command("backfill_phone_e164", "--batch-size", "1")
+
+    c.refresh_from_db()
+    assert c.phone_e164 == "+491712345678"
+
+
+def test_index_matches_national_and_partial_digits():
+    Customer.objects.create(first_name="Anna", last_name="Schmidt",
+                            email="anna@example.com",
+                            mobile="+49 171 2345678")
+    index = CustomerSearchIndex(max_age=0)
+    index.rebuild()
+
+    for q in ("0171 2345", "+491712", "45678"):
+        assert [r["email"] for r in index.search(q)] == ["anna@example.com"]
+
+
+def test_lookup_view_db_fallback_searches_phones(staff_client):
+    Customer.objects.create(first_name="Anna", last_name="Schmidt",
+                            email="anna@example.com", phone="0171/2345678")
+
+    resp = staff_client.get(reverse("ajax_lookup_customer"),
+                            {"q": "+49 171 234"})
+    assert [r["email"] for r in resp.json()["results"]] == [
+        "anna@example.com"]
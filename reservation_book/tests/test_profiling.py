@@ -0,0 +1,71 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import Client
+from django.urls import reverse
+
+from reservation_book.middleware import ProfilingMiddleware
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_SAMPLE_RATE = 0.0
+    settings.PROFILING_TOKEN = "s3cret"
+    return tmp_path
+
+
+def _client(is_staff):
+    # a new Client builds its middleware chain with the current settings
+    client = Client()
+    User.objects.create_user(username="u", email="u@example.com",
+                             password="pass12345", is_staff=is_staff)
+    client.login(username="u", password="pass12345")
+    return client
+
+
+def test_disabled_middleware_removes_itself(settings):
+    settings.PROFILING_ENABLED = False
+    with pytest.raises(MiddlewareNotUsed):
+        ProfilingMiddleware(lambda request: None)
+
+
+def test_staff_query_param_writes_profile_and_sql_sites(profiling):
+    resp = _client(is_staff=True).get(
+        reverse("staff_dashboard"), {"profile": "1"})
+
+    assert resp.status_code == 200
+    stem = resp["X-Profile-Id"]
+    assert (profiling / f"{stem}.prof").stat().st_size > 0
+    summary = (profiling / f"{stem}.txt").read_text()
+    assert "view=staff_dashboard" in summary
+    assert "cumulative" in summary
+    sql = summary.split("SQL by call site", 1)[1]
+    assert "reservation_book/models.py:" in sql  # ReservationStats row
+
+
+def test_query_param_ignored_for_guests(profiling):
+    resp = _client(is_staff=False).get(
+        reverse("make_reservation"), {"profile": "1"})
+
+    assert resp.status_code == 200
+    assert "X-Profile-Id" not in resp
+    assert not list(profiling.iterdir())
+
+
+def test_token_header_and_sampling(profiling, settings):
+    client = Client()
+    assert "X-Profile-Id" not in client.get(
+        reverse("home"), HTTP_X_PROFILE="wrong")
+    assert "X-Profile-Id" in client.get(
+        reverse("home"), HTTP_X_PROFILE="s3cret")
+
+    settings.PROFILING_TOKEN = ""
+    settings.PROFILING_SAMPLE_RATE = 1.0
+    assert "X-Profile-Id" in Client().get(reverse("home"))
+    assert len(list(profiling.glob("*.prof"))) == 2
@@ -0,0 +1,80 @@
+import logging
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book.middleware import QueryBudgetExceeded
+from reservation_book.models import TimeSlotAvailability
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture
+def metrics_log(caplog):
+    # "reservation_book" does not propagate to root, where caplog listens
+    logger = logging.getLogger("reservation_book.requests")
+    logger.addHandler(caplog.handler)
+    caplog.set_level("INFO", logger=logger.name)
+    yield caplog
+    logger.removeHandler(caplog.handler)
+
+
+def test_server_timing_header_and_log_line(user_client, metrics_log,
+                                           settings):
+    settings.REQUEST_METRICS_SERVER_TIMING = True
+    resp = user_client.get(reverse("make_reservation"))
+
+    assert resp.status_code == 200
+    assert resp["Server-Timing"].startswith("db;dur=")
+    assert "total;dur=" in resp["Server-Timing"]
+    line = metrics_log.records[-1].getMessage()
+    assert "view=make_reservation status=200" in line
+
+
+def test_server_timing_is_staff_only_by_default(user_client, client,
+                                                settings):
+    settings.REQUEST_METRICS_SERVER_TIMING = False
+
+    assert "Server-Timing" not in user_client.get(reverse("make_reservation"))
+    assert "Server-Timing" not in client.get(reverse("home"))
+
+    staff = User.objects.create_user(username="staff", password="pass12345",
+                                     is_staff=True)
+    client.force_login(staff)
+    resp = client.get(reverse("staff_dashboard"))
+    assert resp["Server-Timing"].startswith("db;dur=")
+
+
+def test_make_reservation_grid_is_one_query_for_30_days(user_client):
+    today = timezone.localdate()
+    for i in range(30):
+        TimeSlotAvailability.objects.get_or_create(
+            calendar_date=today + timedelta(days=i))
+
+    # Strict budgets are on under tests: this fails if the grid goes N+1
+    resp = user_client.get(reverse("make_reservation"))
+
+    assert len(resp.context["next_30_days"]) == 30
+
+
+def test_exceeding_a_budget_fails_the_request(user_client, settings):
+    settings.QUERY_BUDGETS = {"make_reservation": {"GET": 1}}
+
+    with pytest.raises(QueryBudgetExceeded, match="make_reservation"):
+        user_client.get(reverse("make_reservation"))
+
+
+def test_budget_is_only_a_warning_when_not_strict(user_client, settings,
+                                                  metrics_log):
+    settings.QUERY_BUDGETS = {"make_reservation": 1}
+    settings.QUERY_BUDGETS_STRICT = False
+
+    resp = user_client.get(reverse("make_reservation"))
+
+    assert resp.status_code == 200
+    assert "query budget exceeded" in metrics_log.text
@@ -0,0 +1,118 @@
+from collections import Counter
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+
+from reservation_book.constants import SLOT_LABELS
+from reservation_book.models import (
+    CancellationEvent,
+    Customer,
+    CustomerStats,
+    NoShowEvent,
+    ReservationSeries,
+    ReservationStats,
+    TableReservation,
+    TimeSlotAvailability,
+)
+from reservation_book.services import seeding
+from reservation_book.services.lifecycle import (
+    compute_customer_stats,
+    count_reservation_stats,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_seed_keeps_demand_and_stats_consistent():
+    result = seeding.seed(customers=40, past_days=10, future_days=5,
+                          capacity=8, occupancy=0.75, batch_size=7)
+
+    assert result.reservations == TableReservation.objects.count() > 0
+    assert result.no_shows == NoShowEvent.objects.count()
+
+    slots = list(SLOT_LABELS)
+    demand = {}
+    for r in TableReservation.objects.all():
+        start = slots.index(r.time_slot)
+        for key in slots[start:start + r.duration_hours]:
+            demand[r.reservation_date, key] = (
+                demand.get((r.reservation_date, key), 0)
+                + r.number_of_tables_required_by_patron)
+    for row in TimeSlotAvailability.objects.all():
+        for key in slots:
+            booked = demand.get((row.calendar_date, key), 0)
+            assert row.demand_for(key) == booked <= row.available_for(key)
+
+    stats = ReservationStats.objects.get(pk=1)
+    assert {f: getattr(stats, f) for f in ReservationStats.COUNTER_FIELDS
+            } == count_reservation_stats()
+    stored = {
+        s.customer_id: s.tables_booked for s in CustomerStats.objects.all()}
+    expected = compute_customer_stats(result.customer_ids)
+    assert stored == {pk: v["tables_booked"] for pk, v in expected.items()}
+    assert sum(stored.values()) == TableReservation.objects.aggregate(
+        n=Sum("number_of_tables_required_by_patron"))["n"]
+
+
+def test_seed_series_and_customer_counters():
+    result = seeding.seed(customers=30, past_days=28, future_days=7,
+                          capacity=10, occupancy=0.6, no_show_rate=0.2,
+                          series_rate=0.5)
+
+    assert result.series == ReservationSeries.objects.count() > 0
+    for series in ReservationSeries.objects.prefetch_related("reservations"):
+        rows = sorted(series.reservations.all(),
+                      key=lambda r: r.reservation_date)
+        assert 2 <= len(rows) <= 5
+        assert {(r.time_slot, r.duration_hours, r.customer_id)
+                for r in rows} == {(rows[0].time_slot,
+                                    rows[0].duration_hours,
+                                    series.customer_id)}
+        assert [(r.reservation_date - rows[0].reservation_date).days
+                for r in rows] == list(range(len(rows)))
+
+    no_shows = Counter(NoShowEvent.objects.values_list(
+        "customer_id", flat=True))
+    cancellations = Counter(CancellationEvent.objects.values_list(
+        "customer_id", flat=True))
+    for c in Customer.objects.all():
+        assert c.no_show_count == no_shows[c.pk]
+        assert c.cancellations_count == cancellations[c.pk]
+        assert c.barred == (c.no_show_count >= 3)
+    assert result.barred == Customer.objects.filter(barred=True).count()
+
+
+def test_seed_weekends_run_busier():
+    seeding.seed(customers=20, past_days=28, capacity=20, occupancy=0.5,
+                 series_rate=0)
+    booked = {"weekend": [], "weekday": []}
+    for row in TimeSlotAvailability.objects.all():
+        kind = "weekend" if row.calendar_date.weekday() in (4, 5) \
+            else "weekday"
+        booked[kind].append(sum(row.demand_for(k) for k in SLOT_LABELS))
+    assert (sum(booked["weekend"]) / len(booked["weekend"])
+            > sum(booked["weekday"]) / len(booked["weekday"]))
+
+
+def test_seed_load_command(settings, capsys):
+    settings.DEBUG = True
+    call_command("seed_load", customers=15, days=5, future_days=3,
+                 capacity=6, seed=3)
+    out = capsys.readouterr().out
+    assert "Seeded" in out
+    assert TimeSlotAvailability.objects.count() == 8
+    assert Customer.objects.count() == 15
+    assert TableReservation.objects.exists()
+
+    # the range is taken now: seeding it again would break demand
+    with pytest.raises(CommandError, match="already exist"):
+        call_command("seed_load", customers=5, days=2, future_days=1)
+
+
+def test_seed_load_refuses_without_debug(settings):
+    settings.DEBUG = False
+    with pytest.raises(CommandError, match="DEBUG"):
+        call_command("seed_load", customers=5, days=1)
+    assert not Customer.objects.exists()
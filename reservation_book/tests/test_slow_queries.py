@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from reservation_book import slow_queries
+from reservation_book.models import Customer
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def slow_log(settings, tmp_path):
+    settings.SLOW_QUERY_MS = 0.000001  # everything is slow
+    settings.SLOW_QUERY_FILE = str(tmp_path / "slow.jsonl")
+    settings.SLOW_QUERY_EXPLAIN_INTERVAL = 0
+    slow_queries.SLOW_QUERIES.explained.clear()
+    slow_queries.install(None, connection)  # no-op when already installed
+    return tmp_path / "slow.jsonl"
+
+
+def test_normalize_strips_literals_and_collapses_lists():
+    sql = ("SELECT * FROM \"t\" WHERE a = 'x''y' AND b IN (%s, %s, %s) "
+           "AND c > 12.5 AND total_tables_19_20 = ?")
+
+    assert slow_queries.normalize(sql) == (
+        'SELECT * FROM "t" WHERE a = ? AND b IN (...) AND c > ? '
+        "AND total_tables_19_20 = ?")
+
+
+def test_slow_select_is_recorded_with_site_and_plan(slow_log):
+    list(Customer.objects.filter(email__icontains="ann"))
+
+    [record] = [r for r in slow_queries.read_records(slow_log)
+                if "reservation_book_customer" in r["sql"]]
+    assert "LIKE ?" in record["sql"]
+    assert "ann" not in record["sql"]  # parameters are never stored
+    assert record["site"].startswith(
+        "reservation_book/tests/test_slow_queries.py:")
+    assert record["plan"] and "EXPLAIN failed" not in record["plan"][0]
+
+
+def test_fast_queries_and_disabled_log_write_nothing(slow_log, settings):
+    settings.SLOW_QUERY_MS = 10_000
+    Customer.objects.count()
+
+    assert not slow_log.exists()
+
+
+def test_summary_groups_by_shape():
+    base = {"view": "ajax_lookup_customer", "site": "views.py:1 f",
+            "sql": "SELECT ?", "plan": None, "time": "t"}
+    records = [
+        {**base, "fingerprint": "a", "ms": 300.0},
+        {**base, "fingerprint": "a", "ms": 500.0, "plan": ["SCAN c"]},
+        {**base, "fingerprint": "b", "ms": 250.0},
+    ]
+
+    first, second = slow_queries.summarize(records)
+
+    assert (first["fingerprint"], first["count"]) == ("a", 2)
+    assert first["mean_ms"] == 400.0 and first["max_ms"] == 500.0
+    assert first["plan"] == ["SCAN c"]
+    assert second["fingerprint"] == "b"
+
+
+def test_staff_page(staff_client, slow_log):
+    Customer.objects.filter(last_name__startswith="Sm").exists()
+
+    resp = staff_client.get(reverse("staff_slow_queries"))
+
+    assert resp.status_code == 200
+    assert b"reservation_book_customer" in resp.content
+
+
+def test_guests_are_sent_away(user_client):
+
+    resp = user_client.get(reverse("staff_slow_queries"))
+
+    assert resp.status_code == 302
+
+
+def test_records_carry_the_view_name(user_client, slow_log):
+
+    user_client.get(reverse("make_reservation"))
+
+    views = {r["view"] for r in slow_queries.read_records(slow_log)}
+    assert "make_reservation" in views
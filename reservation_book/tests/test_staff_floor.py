@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book.models import TableReservation
+
+pytestmark = pytest.mark.django_db
+
+
+def test_changes_returns_rows_after_cursor_and_live_ids(staff_client, book):
+    today = timezone.localdate()
+    stale = book(slot="18_19")
+    touched = book(slot="19_20")
+    gone = book(slot="20_21")
+    book(day=today + timedelta(days=1), slot="18_19")  # not tonight
+
+    old = timezone.now() - timedelta(minutes=5)
+    TableReservation.objects.filter(pk=stale.pk).update(updated_at=old)
+    TableReservation.objects.filter(pk=gone.pk).update(updated_at=old)
+    gone.delete()
+
+    resp = staff_client.get(reverse("staff_floor_changes"),
+                            {"since": (old + timedelta(minutes=1))
+                             .isoformat()})
+
+    data = resp.json()
+    assert data["full"] is False
+    assert [r["id"] for r in data["reservations"]] == [touched.pk]
+    assert sorted(data["ids"]) == [stale.pk, touched.pk]
+
+
+def test_bad_cursor_returns_full_snapshot(staff_client, book):
+    first = book(slot="18_19")
+    second = book(slot="17_18")
+
+    data = staff_client.get(reverse("staff_floor_changes"),
+                            {"since": "nonsense"}).json()
+
+    assert data["full"] is True
+    assert [r["id"] for r in data["reservations"]] == [second.pk, first.pk]
+
+
+def test_ajax_complete_returns_updated_row(staff_client, book):
+    reservation = book(slot="18_19")
+
+    resp = staff_client.post(
+        reverse("mark_reservation_completed", args=[reservation.pk]),
+        HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+    )
+
+    data = resp.json()
+    assert data["success"] is True
+    assert data["reservation"]["status"] == TableReservation.STATUS_COMPLETED
+    assert data["reservation"]["can_complete"] is False
+
+
+def test_floor_page_embeds_initial_state(staff_client, book):
+    reservation = book(slot="18_19")
+
+    resp = staff_client.get(reverse("staff_floor"))
+
+    assert resp.status_code == 200
+    state = resp.context["floor_state"]
+    assert [r["id"] for r in state["reservations"]] == [reservation.pk]
+    assert b'id="floor-state"' in resp.content
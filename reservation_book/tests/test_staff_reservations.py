@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from reservation_book.views import staff as staff_views
+from reservation_book.models import TableReservation
+
+pytestmark = pytest.mark.django_db
+
+
+def test_pages_follow_keyset_order(staff_client, monkeypatch, book):
+    monkeypatch.setattr(staff_views, "STAFF_RESERVATIONS_PAGE_SIZE", 2)
+    today = timezone.localdate()
+    tomorrow = today + timedelta(days=1)
+    expected = [
+        book(day=tomorrow, slot="17_18"),
+        book(day=tomorrow, slot="19_20"),
+        book(slot="18_19"),
+        book(slot="18_19"),
+        book(slot="20_21"),
+    ]
+    # outside the default window
+    book(day=today + timedelta(days=30), slot="18_19")
+
+    url = reverse("staff_reservations")
+    seen = []
+    resp = staff_client.get(url)
+    while True:
+        seen += [r.pk for r in resp.context["reservations"]]
+        if not resp.context["next_query"]:
+            break
+        resp = staff_client.get(f"{url}?{resp.context['next_query']}")
+
+    assert seen == [r.pk for r in expected]
+
+    back = staff_client.get(f"{url}?{resp.context['prev_query']}")
+    assert [r.pk for r in back.context["reservations"]] == [
+        expected[2].pk, expected[3].pk]
+
+
+def test_filters_by_source_and_status(staff_client, book):
+    phone = book(slot="18_19", phone=True)
+    book(slot="19_20")
+    done = book(slot="20_21", phone=True)
+    done.status = TableReservation.STATUS_COMPLETED
+    done.save()
+
+    resp = staff_client.get(reverse("staff_reservations"),
+                            {"source": "phone", "status": "active"})
+
+    assert [r.pk for r in resp.context["reservations"]] == [phone.pk]
@@ -1,10 +1,21 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# The read paths with an async variant; ASYNC_VIEWS (set by gambinos.asgi)
+# routes that instead of the sync view.
+if settings.ASYNC_VIEWS:
+    availability_view = views.availability_async
+    lookup_customer_view = views.ajax_lookup_customer_async
+else:
+    availability_view = views.availability
+    lookup_customer_view = views.ajax_lookup_customer
+
 urlpatterns = [
     # Public site
     path("", views.home, name="home"),
     path("menu/", views.menu, name="menu"),
+    path("availability/", availability_view, name="availability"),
 
     # Customer reservation flows
     path("reserve/", views.make_reservation, name="make_reservation"),
@@ -33,6 +44,48 @@ urlpatterns = [
         name="staff_reservations",
     ),
 
+    path(
+        "staff/floor/",
+        views.staff_floor,
+        name="staff_floor",
+    ),
+
+    path(
+        "staff/floor/changes/",
+        views.staff_floor_changes,
+        name="staff_floor_changes",
+    ),
+
+    path(
+        "staff/slow-queries/",
+        views.staff_slow_queries,
+        name="staff_slow_queries",
+    ),
+
+    path(
+        "staff/lock-hotspots/",
+        views.staff_lock_hotspots,
+        name="staff_lock_hotspots",
+    ),
+
+    path(
+        "staff/export/",
+        views.staff_export,
+        name="staff_export",
+    ),
+
+    path(
+        "staff/reservations/bulk/complete/",
+        views.staff_bulk_complete,
+        name="staff_bulk_complete",
+    ),
+
+    path(
+        "staff/reservations/bulk/no-show/",
+        views.staff_bulk_no_show,
+        name="staff_bulk_no_show",
+    ),
+
     path("staff/reservations/<int:reservation_id>/no-show/",
          views.mark_no_show,
          name="mark_no_show"),
@@ -77,7 +130,7 @@ urlpatterns = [
 
     path(
         "ajax/lookup-customer/",
-        views.ajax_lookup_customer,
+        lookup_customer_view,
         name="ajax_lookup_customer",
     ),
 
@@ -101,4 +154,6 @@ urlpatterns = [
          views.onboarding_set_password,
          name="onboarding_set_password",),
 
+    path("metrics/", views.metrics_view, name="metrics"),
+
 ]
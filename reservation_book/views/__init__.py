@@ -0,0 +1,62 @@
+# The view layer, one module per area:
+#
+#   booking     guest booking pages, the availability feed and the staff
+#               phone booking form
+#   staff       staff lists, floor view, status actions, staff management
+#   lookup      customer typeahead
+#   onboarding  sign-up and password setup
+#   ops         metrics, slow-query and lock pages
+#   common      decorators and helpers shared by the above
+#
+# Slot math lives in reservation_book.slots so commands and services can
+# use it without loading any of this.
+#
+# `views.make_reservation` etc. keep working (urls.py uses them), but a
+# submodule is only imported the first time one of its views is looked
+# up, so importing one module doesn't drag in the others.
+
+from importlib import import_module
+
+_VIEWS = {
+    "booking": (
+        "home", "menu", "availability", "availability_async",
+        "my_reservations", "cancel_reservation", "update_reservation",
+        "make_reservation", "create_phone_reservation",
+    ),
+    "staff": (
+        "mark_reservation_completed", "mark_completed", "bar_customer",
+        "unbar_customer", "mark_no_show", "staff_bulk_complete",
+        "staff_bulk_no_show", "staff_reservations", "staff_export",
+        "staff_floor", "staff_floor_changes", "staff_management",
+        "add_staff", "remove_staff", "staff_dashboard",
+        "user_reservations_overview", "user_reservation_history",
+    ),
+    "lookup": ("ajax_lookup_customer", "ajax_lookup_customer_async"),
+    "onboarding": (
+        "signup", "first_login_setup", "onboarding_set_password",
+        "resend_password_setup_link",
+    ),
+    "ops": ("metrics_view", "staff_slow_queries", "staff_lock_hotspots"),
+    "common": (
+        "staff_or_superuser_required", "superuser_required",
+        "async_login_required", "async_require_GET",
+    ),
+}
+_MODULE_FOR = {name: module for module, names in _VIEWS.items()
+               for name in names}
+
+__all__ = sorted(_MODULE_FOR)
+
+
+def __getattr__(name):
+    module = _MODULE_FOR.get(name)
+    if module is None:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULE_FOR))
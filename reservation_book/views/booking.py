@@ -0,0 +1,1414 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_GET
+
+from allauth.account.models import EmailAddress
+
+from reservation_book import metrics
+from reservation_book.constants import SLOT_LABELS
+from reservation_book.forms import EditReservationForm, PhoneReservationForm
+from reservation_book.logs import get_logger
+from reservation_book.models import (
+    CancellationEvent,
+    Customer,
+    TableReservation,
+    TimeSlotAvailability,
+)
+from reservation_book.services.customers import (
+    customer_for_request,
+    link_customer_to_user,
+    remember_customer,
+)
+from reservation_book.services.lifecycle import (
+    reservation_booked,
+    reservation_cancelled,
+    reservation_tables_changed,
+)
+from reservation_book.slots import (
+    abuild_next_30_days,
+    build_next_30_days,
+    capacity_ok,
+    covered_slots,
+    slot_order,
+    timeslot_defaults,
+    to_int,
+    update_ts_demand,
+)
+from reservation_book.views.common import (
+    _auto_mark_no_shows,
+    _cancel_and_release,
+    _normalize_email,
+    _reservation_contact_email,
+    _reservation_contact_name,
+    _reservation_edit_allowed,
+    async_require_GET,
+    staff_or_superuser_required,
+)
+from reservation_book.views.onboarding import _build_set_password_link
+
+# Guest booking pages (reserve, edit, cancel, my reservations) and the
+# staff phone booking form, which shares the capacity and demand logic.
+
+logger = logging.getLogger(__name__)
+booking_log = get_logger("booking")
+edit_log = get_logger("edit")
+customer_log = get_logger("customer")
+
+
+def home(request):
+    return render(request, 'reservation_book/index.html')
+
+
+def menu(request):
+    return render(request, "reservation_book/menu.html")
+
+
+def _availability_days(request):
+    return min(max(to_int(request.GET.get("days"), 30), 1), 30)
+
+
+def _availability_response(grid):
+    return JsonResponse({
+        "days": [
+            {
+                "date": day["calendar_date"].isoformat(),
+                "slots": [
+                    {
+                        "key": slot["key"],
+                        "label": slot["label"],
+                        "remaining": slot["remaining"],
+                    }
+                    for slot in day["slots"]
+                ],
+            }
+            for day in grid
+        ],
+    })
+
+
+@require_GET
+def availability(request):
+    """
+    Remaining tables per slot for the next `days` (1-30, default 30) as
+    JSON. Public and polled; the grid is cached (see slots).
+    """
+    return _availability_response(
+        build_next_30_days(_availability_days(request)))
+
+
+@transaction.non_atomic_requests  # read-only; async views can't be atomic
+@async_require_GET
+async def availability_async(request):
+    """
+    availability for ASGI workers (ASYNC_VIEWS): a cached grid is served
+    without a worker thread, and a cold one comes from one async query.
+    """
+    return _availability_response(
+        await abuild_next_30_days(_availability_days(request)))
+
+
+@login_required
+def my_reservations(request):
+
+    customer = customer_for_request(request)
+
+    today = timezone.localdate()
+    _auto_mark_no_shows(today=today)
+
+    # --- Auto-complete past ACTIVE reservations (keeps UI sane) ---
+    # Only if your project has a status system. If you only rely
+    # on reservation_status, we'll still *display* completed based on date
+    # in the template later, but here we do the canonical status
+    # ransition when possible.
+    if not customer:
+        messages.info(
+            request,
+            "No reservations found yet. Make your "
+            "first booking to see them here.",
+        )
+        reservations = TableReservation.objects.none()
+    else:
+        qs = TableReservation.objects.filter(customer=customer)
+
+        # ✅ Status-based filtering ONLY (no legacy reservation_status)
+        # Cancelled reservations are hard-deleted (mentor requirement),
+        # so they won't appear here anyway.
+        if hasattr(TableReservation, "STATUS_ACTIVE"):
+            allowed = [TableReservation.STATUS_ACTIVE]
+
+            # include completed/no-show if your model defines them
+            if hasattr(TableReservation, "STATUS_COMPLETED"):
+                allowed.append(TableReservation.STATUS_COMPLETED)
+            if hasattr(TableReservation, "STATUS_NO_SHOW"):
+                allowed.append(TableReservation.STATUS_NO_SHOW)
+
+            qs = qs.filter(status__in=allowed)
+
+        reservations = qs.order_by("reservation_date", "time_slot")
+
+        customer_log.debug(
+            "my_reservations.listed",
+            customer=customer.pk,
+            reservations=lambda: list(
+                reservations.values_list("id", "status",
+                                         "reservation_status")),
+        )
+
+    context = {
+        "reservations": reservations,
+        "customer": customer,
+        "has_reservations": reservations.exists(),
+        "today": today,  # useful for template “Completed” rendering if needed
+    }
+    return render(request, "reservation_book/my_reservations.html", context)
+
+
+@metrics.CANCEL_SECONDS.time()
+def cancel_reservation(request, reservation_id):
+    """
+    Cancel a reservation, release demand, write analytics,
+    then HARD DELETE the reservation row.
+
+    IMPORTANT:
+    - Cancelled reservations do NOT remain in TableReservation.
+    - Cancellation analytics are stored in CancellationEvent.
+    - TableReservation has NO `user` FK. Permissions go through the
+      account link: request.user -> Customer.user -> reservation.customer
+    """
+    reservation = get_object_or_404(TableReservation, id=reservation_id)
+
+    today = timezone.localdate()
+    staff_redirect = (
+        "staff_reservations" if request.user.is_staff else "my_reservations"
+    )
+
+    if reservation.status in (
+        TableReservation.STATUS_COMPLETED,
+        TableReservation.STATUS_NO_SHOW,
+    ):
+        messages.error(request, "This reservation cannot be cancelled.")
+        return redirect(staff_redirect)
+
+    if (
+        reservation.status == TableReservation.STATUS_ACTIVE
+        and reservation.reservation_date < today
+    ):
+        messages.error(request, "Past reservations cannot be cancelled.")
+        return redirect(staff_redirect)
+
+    is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+
+    if not _reservation_edit_allowed(request, reservation):
+        msg = "You cannot cancel this reservation."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": msg}, status=403)
+        messages.error(request, msg)
+        return redirect(staff_redirect)
+
+    cancelled_by_staff = bool(request.user.is_staff)
+
+    recipient_email = _reservation_contact_email(reservation)
+    guest_name = _reservation_contact_name(
+        reservation,
+        fallback_user=request.user,
+    )
+
+    res_id = reservation.id
+    res_date = reservation.reservation_date
+    res_slot = reservation.time_slot
+    tables = int(
+        getattr(reservation, "number_of_tables_required_by_patron", 0) or 0
+    )
+    duration_slots = int(getattr(reservation, "duration_hours", 1) or 1)
+
+    customer_email = (
+        getattr(getattr(reservation, "customer", None), "email", "") or ""
+    ).strip().lower()
+
+    customer_id = reservation.customer_id
+
+    try:
+        with transaction.atomic():
+            _cancel_and_release(reservation)
+
+            event, created = CancellationEvent.objects.get_or_create(
+                reservation_id=res_id,
+                defaults={
+                    "created_at": timezone.now(),
+                    "reservation_date": res_date,
+                    "time_slot": res_slot or "",
+                    "tables": tables,
+                    "duration_slots": duration_slots,
+                    "customer_email": customer_email,
+                    "customer_id": customer_id,
+                    "cancelled_by_staff": cancelled_by_staff,
+                },
+            )
+
+            if created and customer_id:
+                Customer.objects.filter(pk=customer_id).update(
+                    cancellations_count=F("cancellations_count") + 1
+                )
+
+            reservation.delete()
+            if created:
+                reservation_cancelled(reservation)
+
+    except Exception:
+        logger.exception("Cancel/delete failed")
+        msg = "Cancellation failed. Please try again."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": msg}, status=500)
+        messages.error(request, msg)
+        return redirect(staff_redirect)
+
+    try:
+        if recipient_email:
+            subject = "Your Gambinos reservation has been cancelled"
+
+            def fmt_day_slot(d, slot):
+                try:
+                    day = d.strftime("%b %d, %Y")
+                except Exception:
+                    day = str(d)
+                return f"{day} at {SLOT_LABELS.get(slot, slot)}"
+
+            def plural_s(n: int) -> str:
+                return "" if n == 1 else "s"
+
+            when_str = fmt_day_slot(res_date, res_slot)
+
+            lines = []
+            if guest_name:
+                lines.append(f"Hello {guest_name},")
+                lines.append("")
+
+            lines.append(
+                (
+                    f"Your reservation for {tables} "
+                    f"table{plural_s(tables)} on {when_str} "
+                    "has been cancelled."
+                )
+            )
+            lines.append("")
+            lines.append(f"Reservation ID: {res_id}")
+            if cancelled_by_staff:
+                lines.append(f"Cancelled by: STAFF ({request.user.username})")
+            else:
+                lines.append(f"Cancelled by: {request.user.username}")
+            lines.append("")
+            lines.append(
+                "Thank you for choosing Gambinos Restaurant & Lounge."
+            )
+
+            send_mail(
+                subject=subject,
+                message="\n".join(lines),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[recipient_email],
+                fail_silently=True,
+            )
+    except Exception:
+        logger.exception("Cancellation email failed")
+
+    if is_ajax:
+        return JsonResponse({"success": True})
+
+    messages.success(request, "Reservation cancelled.")
+    return redirect(staff_redirect)
+
+
+@login_required
+def update_reservation(request, reservation_id):
+    """
+    Customer/staff edit reservation.
+
+    IMPORTANT:
+    TableReservation has NO `user` FK. Permissions are enforced via:
+      request.user -> Customer.user -> reservation.customer
+
+    Notes:
+    - Duration and tables are editable.
+    - Date and time slot are NOT editable in this form.
+    - Demand is updated correctly for multi-hour bookings.
+    """
+    def _safe_next_url(request, default_name="my_reservations"):
+        nxt = request.POST.get("next") or request.GET.get("next")
+        if nxt and url_has_allowed_host_and_scheme(
+            nxt,
+            allowed_hosts={request.get_host()},
+        ):
+            return nxt
+        return reverse(default_name)
+
+    default_return = (
+        "staff_reservations" if request.user.is_staff else "my_reservations"
+    )
+
+    reservation = get_object_or_404(TableReservation, id=reservation_id)
+    today = timezone.localdate()
+    is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+
+    if reservation.status in (
+        TableReservation.STATUS_COMPLETED,
+        TableReservation.STATUS_NO_SHOW,
+    ):
+        msg = "This reservation can no longer be edited."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": msg}, status=400)
+        messages.error(request, msg)
+        return redirect(_safe_next_url(request, default_name=default_return))
+
+    if (
+        reservation.status == TableReservation.STATUS_ACTIVE
+        and reservation.reservation_date < today
+    ):
+        msg = "Past reservations cannot be edited."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": msg}, status=400)
+        messages.error(request, msg)
+        return redirect(_safe_next_url(request, default_name=default_return))
+
+    if not _reservation_edit_allowed(request, reservation):
+        msg = "You are not allowed to edit this reservation."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": msg}, status=403)
+        messages.error(request, msg)
+        return redirect(_safe_next_url(request, default_name=default_return))
+
+    if request.method == "POST":
+        form = EditReservationForm(request.POST, instance=reservation)
+
+        if not form.is_valid():
+            if is_ajax:
+                return JsonResponse(
+                    {"success": False, "error": "Please correct the errors."},
+                    status=400,
+                )
+            messages.error(request, "Please correct the errors below.")
+            return render(
+                request,
+                "reservation_book/edit_reservation.html",
+                {
+                    "form": form,
+                    "reservation": reservation,
+                    "current_slot_label": SLOT_LABELS.get(
+                        reservation.time_slot,
+                        reservation.time_slot,
+                    ),
+                    "slot_labels": SLOT_LABELS,
+                    "next":
+                    _safe_next_url(request, default_name=default_return),
+                },
+            )
+
+        # IMPORTANT:
+        # Do NOT call form.save(commit=False) here.
+        # That mutates the instance before old demand is released.
+        new_duration = form.cleaned_data.get(
+            "duration_hours",
+            reservation.duration_hours,
+        )
+        new_tables = form.cleaned_data.get(
+            "number_of_tables_required_by_patron",
+            reservation.number_of_tables_required_by_patron,
+        )
+
+        # Date and slot stay unchanged in this edit flow
+        new_date = reservation.reservation_date
+        new_slot = reservation.time_slot
+
+        try:
+            _apply_reservation_change(
+                reservation,
+                new_date=new_date,
+                new_start_slot=new_slot,
+                new_duration=new_duration,
+                new_tables_needed=new_tables,
+            )
+        except ValueError as e:
+            msg = str(e)
+            if is_ajax:
+                return JsonResponse({"success": False, "error": msg},
+                                    status=400)
+            messages.error(request, msg)
+            return render(
+                request,
+                "reservation_book/edit_reservation.html",
+                {
+                    "form": form,
+                    "reservation": reservation,
+                    "current_slot_label": SLOT_LABELS.get(
+                        reservation.time_slot,
+                        reservation.time_slot,
+                    ),
+                    "slot_labels": SLOT_LABELS,
+                    "next":
+                    _safe_next_url(request, default_name=default_return),
+                },
+            )
+
+        if is_ajax:
+            return JsonResponse({"success": True})
+
+        messages.success(request, "Your reservation has been updated.")
+        return redirect(_safe_next_url(request, default_name=default_return))
+
+    form = EditReservationForm(instance=reservation)
+    current_slot_label = SLOT_LABELS.get(
+        reservation.time_slot, reservation.time_slot)
+
+    edit_log.debug("edit.form", reservation=reservation.pk,
+                   fields=lambda: list(form.fields))
+
+    return render(
+        request,
+        "reservation_book/edit_reservation.html",
+        {
+            "form": form,
+            "reservation": reservation,
+            "current_slot_label": current_slot_label,
+            "slot_labels": SLOT_LABELS,
+            "next": _safe_next_url(request, default_name=default_return),
+        },
+    )
+
+
+def _slot_demands(ts, slots):
+    return {s: getattr(ts, f"total_cust_demand_for_tables_{s}", None)
+            for s in slots}
+
+
+@transaction.atomic
+def _apply_reservation_change(
+    reservation,
+    *,
+    new_date,
+    new_start_slot,
+    new_duration,
+    new_tables_needed,
+):
+    """
+    Safely edit an existing reservation by:
+    1) loading the original persisted row under lock
+    2) releasing old demand
+    3) validating new capacity
+    4) saving the edited reservation
+    5) re-applying new demand
+
+    Handles same-day same-row edits correctly by refreshing new_ts when
+    old_ts and new_ts refer to the same TimeSlotAvailability row.
+    """
+    # the reservation's own date is only known once its row is read
+    with metrics.row_lock("apply_reservation_change"):
+        original = TableReservation.objects.select_for_update().get(
+            pk=reservation.pk
+        )
+
+    with metrics.row_lock("apply_reservation_change",
+                          original.timeslot_availability_id):
+        old_ts = TimeSlotAvailability.objects.select_for_update().get(
+            pk=original.timeslot_availability_id
+        )
+
+    new_ts, _ = TimeSlotAvailability.objects.get_or_create(
+        calendar_date=new_date,
+        defaults=timeslot_defaults(),
+    )
+    with metrics.row_lock("apply_reservation_change", new_date):
+        new_ts = TimeSlotAvailability.objects.select_for_update().get(
+            pk=new_ts.pk
+        )
+
+    old_slots = covered_slots(
+        original.time_slot,
+        original.duration_hours or 1,
+        until_close=False,
+    )
+    old_tables = to_int(original.number_of_tables_required_by_patron, 0)
+
+    new_slots = covered_slots(
+        new_start_slot,
+        new_duration or 1,
+        until_close=False,
+    )
+    new_tables = to_int(new_tables_needed, 0)
+
+    edit_log.debug(
+        "edit.start",
+        reservation=original.pk,
+        old_date=original.reservation_date,
+        old_slot=original.time_slot,
+        old_duration=original.duration_hours,
+        old_tables=old_tables,
+        new_date=new_date,
+        new_slot=new_start_slot,
+        new_duration=new_duration,
+        new_tables=new_tables,
+    )
+
+    status_active = getattr(TableReservation, "STATUS_ACTIVE", "active")
+    is_active = getattr(original, "status", None) == status_active
+
+    if is_active:
+        edit_log.debug("edit.before_release", day=old_ts.calendar_date,
+                       demands=lambda: _slot_demands(old_ts, old_slots))
+
+        update_ts_demand(old_ts, old_slots, old_tables, delta_sign=-1)
+        old_ts.refresh_from_db()
+
+        edit_log.debug("edit.after_release", day=old_ts.calendar_date,
+                       demands=lambda: _slot_demands(old_ts, old_slots))
+
+        if old_ts.pk == new_ts.pk:
+            new_ts.refresh_from_db()
+
+    ok, bad_slot, avail, demand = capacity_ok(
+        new_ts,
+        new_slots,
+        new_tables,
+    )
+    if not ok:
+        if is_active:
+            update_ts_demand(old_ts, old_slots, old_tables, delta_sign=+1)
+        raise ValueError(
+            (
+                f"Not enough tables for {new_date} "
+                f"slot {SLOT_LABELS.get(bad_slot, bad_slot)}."
+            )
+        )
+
+    original.reservation_date = new_date
+    original.timeslot_availability = new_ts
+    original.time_slot = new_start_slot
+    original.duration_hours = new_duration
+    original.number_of_tables_required_by_patron = new_tables
+    original.save()
+    if new_tables != old_tables:
+        reservation_tables_changed(
+            original.customer_id, original.status, old_tables, new_tables)
+
+    if is_active:
+        update_ts_demand(new_ts, new_slots, new_tables, delta_sign=+1)
+        new_ts.refresh_from_db()
+
+        edit_log.debug("edit.after_apply", day=new_ts.calendar_date,
+                       demands=lambda: _slot_demands(new_ts, new_slots))
+
+    reservation.reservation_date = original.reservation_date
+    reservation.timeslot_availability = original.timeslot_availability
+    reservation.time_slot = original.time_slot
+    reservation.duration_hours = original.duration_hours
+    reservation.number_of_tables_required_by_patron = (
+        original.number_of_tables_required_by_patron
+    )
+
+
+def get_or_create_customer_for_request(request, form):
+    """
+    Ensures we have a Customer record for stats/forecasting.
+
+    Rules:
+    - If user is authenticated: try to map user -> Customer
+    (via your existing helper if present).
+    - Otherwise (or if no mapping): use form fields (email/phone/name)
+    to find/create a Customer.
+    """
+    # 1) If logged in, try to map to an existing Customer
+    user = getattr(request, "user", None)
+    if user and getattr(user, "is_authenticated", False):
+        customer = customer_for_request(request)
+        if customer:
+            return customer
+
+    # 2) Not logged in (or no mapping) -> use form data
+    cd = getattr(form, "cleaned_data", {}) or {}
+
+    first_name = (cd.get("first_name") or cd.get("fname") or "").strip()
+    last_name = (cd.get("last_name") or cd.get("lname") or "").strip()
+
+    # Common field names people use in reservation forms
+    email = (cd.get("email") or cd.get("customer_email") or "").strip()
+    phone = (cd.get("phone") or cd.get("mobile")
+             or cd.get("customer_phone") or "").strip()
+
+    # Prefer lookup by email; otherwise by phone;
+    # otherwise create a very basic record.
+    if email:
+        customer, _ = Customer.objects.get_or_create(
+            email__iexact=email,
+            defaults={
+                "first_name": first_name,
+                "last_name": last_name,
+                "phone": phone,
+            },
+        )
+        return customer
+
+    if phone:
+        customer = Customer.objects.filter(phone=phone).first()
+        if customer:
+            return customer
+        return Customer.objects.create(
+            first_name=first_name,
+            last_name=last_name,
+            phone=phone,
+        )
+
+    # Absolute fallback (should be rare)
+    return Customer.objects.create(
+        first_name=first_name or "Guest",
+        last_name=last_name or "",
+        phone="",
+        email="",
+    )
+
+
+def _booking_outcome(channel, result, started):
+    """Count a booking attempt and time it (commit or rejection)."""
+    metrics.BOOKINGS.inc(channel=channel, result=result)
+    metrics.BOOKING_SECONDS.observe(
+        time.perf_counter() - started, channel=channel)
+
+
+@login_required
+def make_reservation(request):
+    """
+    Customer-facing /reserve/ view.
+
+    Key rules:
+    - duration_hours is treated as "NUMBER OF TIME SLOTS" (not literal hours)
+    - A reservation starting at the last slot has 1 slot max (or 0 if you
+    ever add a “closed” slot) Capacity check + demand deduction happen across
+    ALL affected slots
+    - Multi-day series supported via series_days
+    """
+    next_30_days = build_next_30_days(days=30)
+
+    # Build initial for GET (and as a fallback for POST
+    # if user fields were left blank)
+    initial = {}
+    if request.user.is_authenticated and not request.user.is_staff:
+        initial = {
+            "first_name": request.user.first_name or "",
+            "last_name": request.user.last_name or "",
+            "email": request.user.email or "",
+        }
+
+    if request.method == "POST":
+        started = time.perf_counter()
+        booking_log.debug("booking.post", channel="online",
+                          keys=lambda: list(request.POST))
+
+        reservation_date_str = request.POST.get("reservation_date")
+        time_slot_key = request.POST.get("time_slot")
+
+        if not reservation_date_str or not time_slot_key:
+            messages.error(request, "Missing date or time slot.")
+            _booking_outcome("online", "validation", started)
+            form = PhoneReservationForm(request.POST)
+            return render(
+                request,
+                "reservation_book/make_reservation.html",
+                {"form": form, "next_30_days": next_30_days},
+            )
+
+        try:
+            reservation_date = timezone.datetime.fromisoformat(
+                reservation_date_str).date()
+        except Exception:
+            messages.error(request, "Invalid date.")
+            _booking_outcome("online", "validation", started)
+            form = PhoneReservationForm(request.POST)
+            return render(
+                request,
+                "reservation_book/make_reservation.html",
+                {"form": form, "next_30_days": next_30_days},
+            )
+
+        if time_slot_key not in SLOT_LABELS:
+            messages.error(request, "Invalid time slot.")
+            _booking_outcome("online", "validation", started)
+            form = PhoneReservationForm(request.POST)
+            return render(
+                request,
+                "reservation_book/make_reservation.html",
+                {"form": form, "next_30_days": next_30_days},
+            )
+
+        # IMPORTANT: bind the POST data (not initial)
+        post_data = request.POST.copy()
+
+        # If customer is logged in (not staff), backfill required fields
+        # if blanks came through(this prevents “required” errors if your
+        # modal fields were readonly or not filled)
+        if initial:
+            for k, v in initial.items():
+                if not post_data.get(k):
+                    post_data[k] = v
+
+        form = PhoneReservationForm(post_data)
+        if not form.is_valid():
+            booking_log.info("booking.invalid", channel="online",
+                             errors=lambda: sorted(form.errors))
+            messages.error(request, "Please correct the errors below.")
+            _booking_outcome("online", "validation", started)
+            return render(
+                request,
+                "reservation_book/make_reservation.html",
+                {"form": form, "next_30_days": next_30_days},
+            )
+
+        cleaned = form.cleaned_data
+
+        tables_requested = int(cleaned.get(
+            "number_of_tables_required_by_patron") or 1)
+
+        # duration_hours is treated as "slots"
+        requested_duration_slots = int(cleaned.get("duration_hours") or 1)
+
+        series_days = int(cleaned.get("series_days") or 1)
+        if series_days < 1:
+            series_days = 1
+        if series_days > 14:
+            series_days = 14  # matches your form max
+
+        # Slot math
+        slot_keys = list(SLOT_LABELS.keys())
+        start_index = slot_keys.index(time_slot_key)
+
+        # slots remaining INCLUDING the start slot
+        max_slots_left_today = max(1, len(slot_keys) - start_index)
+
+        # also respect model field choices (prevents "5 is not
+        # one of the available choices")
+        duration_field = TableReservation._meta.get_field("duration_hours")
+        choice_values = [int(v) for (v, _lbl) in (
+            duration_field.choices or []) if str(v).isdigit()]
+        max_choice_allowed = max(
+            choice_values) if choice_values else max_slots_left_today
+
+        duration_slots = max(
+            1, min(requested_duration_slots,
+                   max_slots_left_today, max_choice_allowed))
+
+        end_index = min(start_index + duration_slots, len(slot_keys))
+        affected_slot_keys = slot_keys[start_index:end_index]
+
+        email = (cleaned.get("email") or "").strip().lower()
+        rejected_as = "validation"
+
+        try:
+            with transaction.atomic():
+                # Upsert customer
+                customer, _ = Customer.objects.get_or_create(
+                    email=email,
+                    defaults={
+                        "first_name": cleaned.get("first_name", ""),
+                        "last_name": cleaned.get("last_name", ""),
+                        "phone": cleaned.get("phone", ""),
+                        "mobile": cleaned.get("mobile", ""),
+                    },
+                )
+                if getattr(customer, "barred", False):
+                    rejected_as = "barred"
+                    raise ValueError(
+                        "You can’t make new reservations from this account. "
+                        "Please contact the restaurant if you believe this "
+                        "is a mistake.")
+
+                changed_fields = []
+                for f, v in [
+                    ("first_name", cleaned.get("first_name")),
+                    ("last_name", cleaned.get("last_name")),
+                    ("phone", cleaned.get("phone")),
+                    ("mobile", cleaned.get("mobile")),
+                ]:
+                    if v is not None and v != "" and getattr(customer, f) != v:
+                        setattr(customer, f, v)
+                        changed_fields.append(f)
+                if changed_fields:
+                    customer.save(update_fields=changed_fields)
+
+                # First booking from an account: link it to the customer
+                if (
+                    not request.user.is_staff
+                    and _normalize_email(request.user.email) == email
+                    and link_customer_to_user(customer, request.user)
+                ):
+                    remember_customer(request, customer)
+
+                reservations_created = []
+
+                for day_offset in range(series_days):
+                    day_date = reservation_date + timedelta(days=day_offset)
+
+                    ts_day, _ = TimeSlotAvailability.objects.get_or_create(
+                        calendar_date=day_date,
+                        defaults=timeslot_defaults(),
+                    )
+                    with metrics.row_lock("make_reservation", day_date):
+                        ts_day = TimeSlotAvailability.objects\
+                            .select_for_update().get(pk=ts_day.pk)
+
+                    # Capacity check across ALL affected slots
+                    for k in affected_slot_keys:
+                        cap_field = f"number_of_tables_available_{k}"
+                        demand_field = f"total_cust_demand_for_tables_{k}"
+                        capacity = int(getattr(ts_day, cap_field, 20) or 20)
+                        demand = int(getattr(ts_day, demand_field, 0) or 0)
+                        remaining = max(capacity - demand, 0)
+
+                        if remaining < tables_requested:
+                            _booking_outcome("online", "capacity", started)
+                            messages.error(
+                                request,
+                                f"Not enough tables on \
+                                    {day_date.strftime('%b %d, %Y')} "
+                                f"for {SLOT_LABELS.get(k, k)}. Only \
+                                    {remaining} left."
+                            )
+                            return render(
+                                request,
+                                "reservation_book/make_reservation.html",
+                                {"form": form, "next_30_days": next_30_days},
+                            )
+
+                    # Deduct demand across duration slots
+                    update_fields = []
+                    for k in affected_slot_keys:
+                        dfield = f"total_cust_demand_for_tables_{k}"
+                        existing = int(getattr(ts_day, dfield, 0) or 0)
+                        setattr(ts_day, dfield, existing + tables_requested)
+                        update_fields.append(dfield)
+                    ts_day.save(update_fields=update_fields)
+
+                    # Build kwargs safely (your model has legacy
+                    # fields in some branches)
+                    create_kwargs = dict(
+                        customer=customer,
+                        reservation_date=day_date,
+                        time_slot=time_slot_key,
+                        duration_hours=duration_slots,
+                        number_of_tables_required_by_patron=tables_requested,
+                        timeslot_availability=ts_day,
+                    )
+
+                    # status field varies across your history; handle safely
+                    if hasattr(TableReservation, "STATUS_ACTIVE"):
+                        create_kwargs["status"] = (
+                            TableReservation.STATUS_ACTIVE
+                        )
+                    else:
+                        # many older versions used lower-case 'active'
+                        create_kwargs["status"] = "active"
+
+                    # legacy flags used by /my_reservations/
+                    # in your logs earlier
+                    if hasattr(TableReservation, "reservation_status"):
+                        create_kwargs["reservation_status"] = True
+                    if hasattr(TableReservation, "is_phone_reservation"):
+                        create_kwargs["is_phone_reservation"] = False
+                    if hasattr(TableReservation, "created_by"):
+                        # created_by is usually staff; keep None for customers
+                        create_kwargs["created_by"] = (
+                            request.user if request.user.is_staff else None
+                        )
+
+                    reservation = TableReservation.objects.create(
+                        **create_kwargs)
+                    reservation_booked(reservation)
+                    reservations_created.append(reservation)
+
+        except ValueError as e:
+            # Business rule errors (barred, capacity, invalid slot, etc.)
+            _booking_outcome("online", rejected_as, started)
+            messages.error(request, str(e))
+            return render(
+                request,
+                "reservation_book/make_reservation.html",
+                {"form": form, "next_30_days": next_30_days},
+            )
+
+        except Exception:
+            logger.exception("[MR] reservation create failed")
+            _booking_outcome("online", "error", started)
+            messages.error(
+                request, "Looks like you've been barred for excessive no "
+                "shows or other reasons. Please contact us if you think this "
+                "is a mistake.")
+            return render(
+                request,
+                "reservation_book/make_reservation.html",
+                {"form": form, "next_30_days": next_30_days},
+            )
+
+        _booking_outcome("online", "created", started)
+
+        # Email confirmation
+        try:
+            to_email = customer.email
+            if to_email:
+                context = {
+                    "customer": customer,
+                    "reservations": reservations_created,
+                    "reservation": reservations_created[0]
+                    if reservations_created else None,
+                    "slot_labels": SLOT_LABELS,
+                }
+                message = render_to_string(
+                    "reservation_book/emails/"
+                    "online_reservation_confirmation.txt",
+                    context,
+                )
+                send_mail(
+                    subject="Your Gambinos reservation is confirmed",
+                    message=message,
+                    from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
+                    recipient_list=[to_email],
+                    fail_silently=False,
+                )
+        except Exception:
+            logger.exception("Email failed")
+
+        messages.success(
+            request,
+            f"Reservation{' series' if series_days > 1 else ''} \
+                created successfully!",
+        )
+        return redirect("my_reservations")
+
+    # GET
+    form = PhoneReservationForm(initial=initial)
+    return render(
+        request,
+        "reservation_book/make_reservation.html",
+        {"form": form, "next_30_days": next_30_days},
+    )
+
+
+@staff_or_superuser_required
+def create_phone_reservation(request):
+    """Staff UI for creating reservations for phone-in customers
+    (Option B + time blocks).
+
+    Rules enforced:
+    - Reuse existing Customer by email
+    - Reuse or create auth User
+    - NEVER email passwords
+    - If Customer is NEW (first time in DB) => ALWAYS send
+    set-password onboarding link
+    - Else if User has unusable password => send set-password onboarding link
+    - Else => send login link
+    - Ensure allauth EmailAddress exists and is primary+verified
+    - Supports:
+        * single-day time blocks (duration_hours)
+        * conference series: same block for N consecutive days
+    """
+    User = get_user_model()
+
+    # Always build from *today* (rolling 30 days)
+    next_30_days = build_next_30_days(days=30)
+
+    booking_log.debug(
+        "booking.phone_grid",
+        day0=lambda: next_30_days[0]["calendar_date"] if next_30_days
+        else None,
+        sample_slots=lambda: next_30_days[0]["slots"][:2] if next_30_days
+        else None,
+    )
+
+    if request.method == "POST":
+        started = time.perf_counter()
+        # ------------------------------------------------------------
+        # ✅ PRE-CREATE TSA ROW so ModelChoiceField(to_field_name=...)
+        # can resolve the date-string value during form validation.
+        # ------------------------------------------------------------
+        post = request.POST.copy()
+        ts_val = (post.get("timeslot_availability")
+                  or "").strip()  # expects "YYYY-MM-DD"
+
+        if ts_val:
+            try:
+                selected_day = date.fromisoformat(ts_val)
+            except ValueError:
+                selected_day = None
+
+            if selected_day:
+                TimeSlotAvailability.objects.get_or_create(
+                    calendar_date=selected_day,
+                    defaults=timeslot_defaults(),
+                )
+                # keep hidden reservation_date consistent for cleaned_data
+                post["reservation_date"] = ts_val
+
+        form = PhoneReservationForm(post)
+
+        if not form.is_valid():
+            messages.error(request, "Please correct the errors below.")
+            booking_log.info("booking.invalid", channel="phone",
+                             errors=lambda: sorted(form.errors))
+            _booking_outcome("phone", "validation", started)
+            return render(
+                request,
+                "reservation_book/create_phone_reservation.html",
+                {
+                    "form": form,
+                    "slot_labels": SLOT_LABELS,
+                    "next_30_days": next_30_days,
+                },
+            )
+
+        # contains an UNSAVED Customer instance
+        proto = form.save(commit=False)
+        proto.is_phone_reservation = True
+        proto.created_by = request.user
+
+        # ----------------------------
+        # Normalize + upsert Customer
+        # ----------------------------
+        raw_customer = proto.customer
+        email = _normalize_email(getattr(raw_customer, "email", ""))
+
+        if not email:
+            messages.error(request, "Customer email is required.")
+            _booking_outcome("phone", "validation", started)
+            return render(
+                request,
+                "reservation_book/create_phone_reservation.html",
+                {
+                    "form": form,
+                    "slot_labels": SLOT_LABELS,
+                    "next_30_days": next_30_days,
+                },
+            )
+
+        customer_defaults = {
+            "first_name":
+            (getattr(raw_customer, "first_name", "") or "").strip(),
+            "last_name":
+                (getattr(raw_customer, "last_name", "") or "").strip(),
+            "phone": getattr(raw_customer, "phone", "") or "",
+            "mobile": getattr(raw_customer, "mobile", "") or "",
+        }
+
+        customer, created_customer = Customer.objects.get_or_create(
+            email=email,
+            defaults={**customer_defaults, "email": email},
+        )
+
+        # Barred enforcement (staff phone booking)
+        if getattr(customer, "barred", False):
+            _booking_outcome("phone", "barred", started)
+            messages.error(
+                request, "This customer is barred. New bookings are "
+                "not allowed.")
+            return redirect("staff_dashboard")
+
+        # Only update fields if we have non-empty values
+        # (avoid wiping good data)
+        cust_changed = False
+        for field, val in customer_defaults.items():
+            if val and getattr(customer, field, "") != val:
+                setattr(customer, field, val)
+                cust_changed = True
+        if cust_changed:
+            customer.save()
+
+        # ----------------------------
+        # Booking parameters (READ FROM cleaned_data)
+        # ----------------------------
+        start_date = form.cleaned_data.get("reservation_date")
+        start_slot = form.cleaned_data.get("time_slot")
+        tables_needed = int(form.cleaned_data.get(
+            "number_of_tables_required_by_patron") or 0)
+
+        if not start_date or not start_slot:
+            messages.error(
+                request,
+                "Please click a date/time cell in the availability "
+                "grid before confirming.",
+            )
+            _booking_outcome("phone", "validation", started)
+            return render(
+                request,
+                "reservation_book/create_phone_reservation.html",
+                {
+                    "form": form,
+                    "slot_labels": SLOT_LABELS,
+                    "next_30_days": next_30_days,
+                },
+            )
+
+        slots = slot_order()
+        if start_slot not in slots:
+            messages.error(request, "Invalid time slot selection.")
+            _booking_outcome("phone", "validation", started)
+            return render(
+                request,
+                "reservation_book/create_phone_reservation.html",
+                {
+                    "form": form,
+                    "slot_labels": SLOT_LABELS,
+                    "next_30_days": next_30_days,
+                },
+            )
+
+        start_index = slots.index(start_slot)
+
+        # Duration: explicit duration_hours only (you removed the checkbox)
+        max_choice = max(int(c[0]) for c in TableReservation._meta.get_field(
+            "duration_hours").choices)
+        duration = int(form.cleaned_data.get("duration_hours") or 1)
+        duration = max(1, min(duration, max_choice))
+
+        # checkbox removed → always False
+        until_close = False
+
+        series_days = int(form.cleaned_data.get("series_days") or 1)
+        series_days = max(1, min(series_days, 14))
+
+        affected_slots = slots[start_index: start_index + duration]
+
+        created_reservations = []
+        user = None
+
+        try:
+            with transaction.atomic():
+                # Find or create user (once per booking)
+                user = (
+                    User.objects.filter(email__iexact=email).first()
+                    or User.objects.filter(username__iexact=email).first()
+                )
+
+                if user is None:
+                    user = User.objects.create_user(
+                        username=email,
+                        email=email,
+                        password=None,
+                        first_name=customer.first_name,
+                        last_name=customer.last_name,
+                    )
+                    user.set_unusable_password()
+                    user.save(update_fields=["password"])
+                else:
+                    # Safe sync of missing profile bits
+                    user_changed = False
+                    if not user.first_name and customer.first_name:
+                        user.first_name = customer.first_name
+                        user_changed = True
+                    if not user.last_name and customer.last_name:
+                        user.last_name = customer.last_name
+                        user_changed = True
+                    if not user.email:
+                        user.email = email
+                        user_changed = True
+                    if user_changed:
+                        user.save()
+
+                # Ensure allauth EmailAddress exists
+                # and is usable for auth flows
+                ea, _ = EmailAddress.objects.get_or_create(
+                    user=user,
+                    email=email,
+                    defaults={"primary": True, "verified": True},
+                )
+                needs_ea_update = False
+                if not ea.primary:
+                    ea.primary = True
+                    needs_ea_update = True
+                if not ea.verified:
+                    ea.verified = True
+                    needs_ea_update = True
+                if needs_ea_update:
+                    ea.save(update_fields=["primary", "verified"])
+
+                link_customer_to_user(customer, user)
+
+                # Book N consecutive days
+                for day_offset in range(series_days):
+                    day = start_date + timedelta(days=day_offset)
+
+                    ts, _ = TimeSlotAvailability.objects.get_or_create(
+                        calendar_date=day,
+                        defaults=timeslot_defaults(),
+                    )
+
+                    # Lock row for consistent demand updates
+                    with metrics.row_lock("create_phone_reservation", day):
+                        ts = (
+                            TimeSlotAvailability.objects
+                            .select_for_update()
+                            .get(pk=ts.pk)
+                        )
+
+                    # Capacity check across affected slots
+                    for s in affected_slots:
+                        slot_available = to_int(
+                            getattr(ts,
+                                    f"number_of_tables_available_{s}", 0), 0)
+                        slot_demand = to_int(
+                            getattr(ts,
+                                    f"total_cust_demand_for_tables_{s}", 0), 0)
+                        if slot_demand + tables_needed > slot_available:
+                            raise ValueError(
+                                f"Not enough tables available for {day} \
+                                    in slot {SLOT_LABELS.get(s, s)}."
+                            )
+
+                    # Create ONE reservation row per day
+                    r = TableReservation(
+                        customer=customer,
+                        timeslot_availability=ts,
+                        reservation_date=day,
+                        time_slot=start_slot,
+                        duration_hours=duration,
+                        number_of_tables_required_by_patron=tables_needed,
+                        reservation_status=True,
+                        is_phone_reservation=True,
+                        created_by=request.user,
+                    )
+
+                    # If your model has status constants, keep it consistent
+                    if hasattr(TableReservation, "STATUS_ACTIVE"):
+                        r.status = TableReservation.STATUS_ACTIVE
+
+                    r.save()
+                    reservation_booked(r)
+                    created_reservations.append(r)
+
+                    # Update demand for each affected slot
+                    update_fields = []
+                    for s in affected_slots:
+                        demand_field = f"total_cust_demand_for_tables_{s}"
+                        current = to_int(getattr(ts, demand_field, 0), 0)
+                        setattr(ts, demand_field, current + tables_needed)
+                        update_fields.append(demand_field)
+                    ts.save(update_fields=update_fields)
+
+        except ValueError as e:
+            # only raised by the capacity check
+            _booking_outcome("phone", "capacity", started)
+            messages.error(request, str(e))
+            return render(
+                request,
+                "reservation_book/create_phone_reservation.html",
+                {
+                    "form": form,
+                    "slot_labels": SLOT_LABELS,
+                    "next_30_days": next_30_days,
+                },
+            )
+
+        except Exception:
+            logger.exception("[PHONE] reservation create failed")
+            _booking_outcome("phone", "error", started)
+            messages.error(
+                request, "Something went wrong creating the "
+                "phone reservation.")
+            return render(
+                request,
+                "reservation_book/create_phone_reservation.html",
+                {
+                    "form": form,
+                    "slot_labels": SLOT_LABELS,
+                    "next_30_days": next_30_days,
+                },
+            )
+
+        # ----------------------------
+        _booking_outcome("phone", "created", started)
+
+        # Email decision (Option B)  ✅ (your original block)
+        # ----------------------------
+        login_url = request.build_absolute_uri(reverse("account_login"))
+
+        needs_password_setup = bool(created_customer) or (
+            not user.has_usable_password())
+
+        password_setup_url = None
+        if needs_password_setup:
+            password_setup_url = _build_set_password_link(request, user)
+
+        def _range_pretty(slots_list):
+            if not slots_list:
+                return ""
+            first_label = SLOT_LABELS.get(slots_list[0], slots_list[0])
+            last_label = SLOT_LABELS.get(slots_list[-1], slots_list[-1])
+            try:
+                start_t = first_label.split("–")[0].strip()
+                end_t = last_label.split("–")[1].strip()
+                return f"{start_t}–{end_t}"
+            except Exception:
+                return first_label
+
+        time_range_pretty = (
+            _range_pretty(affected_slots)
+            if duration > 1
+            else SLOT_LABELS.get(start_slot, start_slot)
+        )
+
+        context = {
+            "reservation": created_reservations[0]
+            if created_reservations else proto,
+            "reservations": created_reservations,
+            "time_slot_pretty": time_range_pretty,
+            "tables_needed": tables_needed,
+            "login_url": login_url,
+            "needs_password_setup": needs_password_setup,
+            "password_setup_url": password_setup_url,
+            "series_days": series_days,
+            "duration_hours": duration,
+            "until_close": until_close,
+        }
+
+        message = render_to_string(
+            "reservation_book/emails/phone_reservation_confirmation.txt",
+            context,
+        )
+
+        send_mail(
+            subject="Your reservation at Gambinos Restaurant & Lounge \
+                is confirmed",
+            message=message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[email],
+            fail_silently=False,
+        )
+
+        messages.success(
+            request,
+            f"Phone reservation{' series' if series_days > 1 else ''} \
+                created successfully!",
+        )
+        # keep your staff-facing redirect
+        return redirect("staff_reservations")
+
+    # GET
+    form = PhoneReservationForm()
+    return render(
+        request,
+        "reservation_book/create_phone_reservation.html",
+        {
+            "form": form,
+            "slot_labels": SLOT_LABELS,
+            "next_30_days": next_30_days,
+        },
+    )
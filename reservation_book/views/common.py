@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.db import transaction
+from django.http import HttpResponseForbidden, HttpResponseNotAllowed
+from django.shortcuts import redirect
+from django.utils import timezone
+
+from reservation_book import metrics
+from reservation_book.models import (
+    Customer,
+    NoShowEvent,
+    TableReservation,
+    TimeSlotAvailability,
+)
+from reservation_book.services.customers import (
+    customer_for_user,
+    customer_id_for_request,
+    forget_customer,
+)
+from reservation_book.services.lifecycle import reservation_status_changed
+from reservation_book.slots import covered_slots, timeslot_defaults
+
+# Helpers shared by the view modules: access decorators, cancellation and
+# no-show bookkeeping, and the small lookups several pages need.
+
+
+def _normalize_email(raw: str) -> str:
+    return (raw or "").strip().lower()
+
+
+def _customer_for_logged_in_user(user):
+    """Resolve via the Customer.user link (see services.customers)."""
+    return customer_for_user(user)
+
+
+def staff_or_superuser_required(view_func):
+    """
+    Custom decorator: allow access if user is staff OR superuser.
+    Also requires authenticated and active.
+    """
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect(settings.LOGIN_URL)
+        if not request.user.is_active:
+            messages.error(
+                request, "Account inactive.")
+            return redirect("home")
+
+        if request.user.is_superuser or request.user.is_staff:
+            return view_func(request, *args, **kwargs)
+        messages.error(
+            request, "Staff access required.")
+        return redirect("my_reservations")
+    return wrapper
+
+
+def superuser_required(view_func):
+    """Decorator to restrict view to superusers only"""
+    @login_required
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_superuser:
+            return HttpResponseForbidden("You do not have permission to "
+                                         "access this page.")
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+# Django 4.2's login_required / require_GET only wrap sync views.
+
+
+def async_login_required(view_func):
+    """login_required for async views."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        # request.user is lazy; loading it reads the session and the user
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def async_require_GET(view_func):
+    """require_GET for async views."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return HttpResponseNotAllowed(["GET"])
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def _cancel_and_release(reservation: TableReservation) -> None:
+    """
+    Release table demand for an existing reservation back into
+    TimeSlotAvailability.
+
+    IMPORTANT:
+    This helper no longer changes reservation lifecycle/status.
+    Cancellations are handled by:
+      1) releasing demand
+      2) writing CancellationEvent
+      3) hard-deleting the reservation row
+
+    Completed and no-show reservations are handled elsewhere.
+    """
+    start_slot = getattr(reservation, "time_slot", None)
+    if not start_slot:
+        return
+
+    try:
+        tables_needed = int(
+            getattr(
+                reservation,
+                "number_of_tables_required_by_patron",
+                0,
+            ) or 0
+        )
+    except (TypeError, ValueError):
+        tables_needed = 0
+
+    try:
+        duration = int(getattr(reservation, "duration_hours", 1) or 1)
+    except (TypeError, ValueError):
+        duration = 1
+
+    duration = max(duration, 1)
+
+    affected_slots = covered_slots(
+        start_slot,
+        duration,
+        until_close=False,
+    )
+
+    if not affected_slots or tables_needed <= 0:
+        return
+
+    with transaction.atomic():
+        ts = getattr(reservation, "timeslot_availability", None)
+
+        if ts is None and getattr(reservation, "reservation_date", None):
+            ts, _ = TimeSlotAvailability.objects.get_or_create(
+                calendar_date=reservation.reservation_date,
+                defaults=timeslot_defaults(),
+            )
+
+        if ts is None:
+            return
+
+        with metrics.row_lock("cancel_and_release", ts.pk):
+            ts = TimeSlotAvailability.objects.select_for_update().get(
+                pk=ts.pk)
+
+        update_fields = []
+        for slot in affected_slots:
+            demand_field = f"total_cust_demand_for_tables_{slot}"
+
+            if not hasattr(ts, demand_field):
+                continue
+
+            current = int(getattr(ts, demand_field, 0) or 0)
+            new_val = max(0, current - tables_needed)
+            setattr(ts, demand_field, new_val)
+            update_fields.append(demand_field)
+
+        if update_fields:
+            ts.save(update_fields=update_fields)
+
+
+def _auto_mark_no_shows(today=None):
+    """
+    Past reservations that are still ACTIVE become NO_SHOW automatically.
+    - Cancelled reservations are hard-deleted, so they never appear here.
+    - Completed reservations are excluded.
+    """
+    today = today or timezone.localdate()
+
+    if not hasattr(TableReservation, "STATUS_ACTIVE"):
+        return
+
+    status_active = TableReservation.STATUS_ACTIVE
+    status_no_show = getattr(TableReservation, "STATUS_NO_SHOW", "no_show")
+
+    qs = TableReservation.objects.select_related("customer").filter(
+        reservation_date__lt=today,
+        status=status_active,
+    )
+
+    for r in qs.iterator():
+        with transaction.atomic():
+            with metrics.row_lock("auto_mark_no_shows", r.reservation_date):
+                r2 = (
+                    TableReservation.objects
+                    .select_for_update()
+                    .get(pk=r.pk)
+                )
+
+            if r2.reservation_date >= today:
+                continue
+            if r2.status != status_active:
+                continue
+
+            cust_email = ""
+            if r2.customer_id:
+                cust_email = (
+                    Customer.objects
+                    .filter(pk=r2.customer_id)
+                    .values_list("email", flat=True)
+                    .first()
+                    or ""
+                )
+            cust_email = (cust_email or "").strip().lower()
+
+            event, created = NoShowEvent.objects.get_or_create(
+                reservation_id=r2.id,
+                defaults={
+                    "reservation_date": r2.reservation_date,
+                    "time_slot": r2.time_slot or "",
+                    "tables": int(
+                        getattr(
+                            r2,
+                            "number_of_tables_required_by_patron",
+                            0,
+                        ) or 0
+                    ),
+                    "duration_slots": int(
+                        getattr(r2, "duration_hours", 1) or 1
+                    ),
+                    "customer_email": cust_email,
+                    "customer_id": r2.customer_id,
+                    "marked_by_staff": False,
+                },
+            )
+
+            if not created:
+                continue
+
+            r2.status = status_no_show
+            r2.save(update_fields=["status", "updated_at"])
+            reservation_status_changed(
+                r2.customer_id,
+                r2.number_of_tables_required_by_patron,
+                status_active,
+                status_no_show,
+            )
+
+            if r2.customer_id:
+                with metrics.row_lock("auto_mark_no_shows"):
+                    c = Customer.objects.select_for_update().get(
+                        pk=r2.customer_id)
+                c.no_show_count = int(
+                    getattr(c, "no_show_count", 0) or 0
+                ) + 1
+
+                update_fields = ["no_show_count"]
+                if (
+                    not getattr(c, "barred", False)
+                    and c.no_show_count >= NO_SHOW_BAN_THRESHOLD
+                ):
+                    c.barred = True
+                    update_fields.append("barred")
+
+                c.save(update_fields=update_fields)
+
+
+def _reservation_contact_email(reservation: TableReservation) -> str | None:
+    """
+    Best email to contact the guest for this reservation.
+
+    Since TableReservation has no `user` FK, we use:
+    - reservation.customer.email (preferred)
+    - fallback: None
+    """
+    cust = getattr(reservation, "customer", None)
+    email = (getattr(cust, "email", "") or "").strip()
+    return email or None
+
+
+def _reservation_edit_allowed(request, reservation: TableReservation) -> bool:
+    """
+    Permissions for editing a reservation.
+
+    Rules:
+    - Staff/superuser can edit anything.
+    - Otherwise the logged-in user may edit ONLY reservations of the
+      Customer linked to their account (Customer.user, session-cached).
+    """
+    # Must be logged in (callers may not enforce it)
+    if not getattr(request, "user", None) or not request.user.is_authenticated:
+        return False
+
+    # Staff can always edit
+    if request.user.is_staff or request.user.is_superuser:
+        return True
+
+    if not reservation.customer_id:
+        return False
+
+    customer_id = customer_id_for_request(request)
+    if customer_id is not None and customer_id == reservation.customer_id:
+        return True
+
+    # The cached id may be stale (e.g. customer rows merged); re-resolve once
+    forget_customer(request)
+    return customer_id_for_request(request) == reservation.customer_id
+
+
+def _reservation_contact_name(
+    reservation: TableReservation,
+    fallback_user=None,
+) -> str:
+    """
+    Best display name for the guest.
+
+    Since TableReservation has no `user` FK, we use:
+    - reservation.customer.first_name / last_name (preferred)
+    - fallback_user.get_full_name() or fallback_user.username (if provided)
+    - "" if nothing is available
+    """
+    cust = getattr(reservation, "customer", None)
+    first = (getattr(cust, "first_name", "") or "").strip()
+    last = (getattr(cust, "last_name", "") or "").strip()
+    full = (f"{first} {last}").strip()
+    if full:
+        return full
+
+    if fallback_user is not None:
+        try:
+            name = (fallback_user.get_full_name() or "").strip()
+        except Exception:
+            name = ""
+        if name:
+            return name
+        return (getattr(fallback_user, "username", "") or "").strip()
+
+    return ""
+
+
+def _no_show_allowed(reservation, now=None) -> bool:
+    """No-show can only be set for past service dates."""
+    return reservation.reservation_date < timezone.localdate(now)
+
+
+NO_SHOW_BAN_THRESHOLD = 3  # adjust as needed for your business rules
+
+
+def _apply_ban_if_needed(customer_id: int | None,
+                         threshold: int = 3, window_days: int = 90) -> bool:
+    """
+    Auto-ban customer if they have >= threshold
+    no-shows in the last window_days.
+    Returns True if customer was newly barred.
+
+    The count is a range scan on the (customer, created_at) index.
+    """
+    if not customer_id:
+        return False
+
+    cutoff = timezone.now() - timedelta(days=window_days)
+    count = NoShowEvent.objects.filter(
+        customer_id=customer_id,
+        created_at__gte=cutoff,
+    ).count()
+
+    if count >= threshold:
+        cust = Customer.objects.filter(pk=customer_id).first()
+        if cust and not getattr(cust, "barred", False):
+            cust.barred = True
+            cust.save(update_fields=["barred"])
+            return True
+
+    return False
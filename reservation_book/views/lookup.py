@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import re
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from reservation_book.constants import SLOT_LABELS
+from reservation_book.models import Customer, TableReservation
+from reservation_book.services.customer_search import customer_index
+from reservation_book.services.phones import phone_digit_variants
+from reservation_book.views.common import (
+    async_login_required,
+    async_require_GET,
+)
+
+# Typeahead customer lookup for the staff booking form, called on every
+# keystroke. ajax_lookup_customer is the sync view the WSGI deployment
+# serves; ajax_lookup_customer_async, routed instead when ASYNC_VIEWS is
+# on (gambinos.asgi), runs the same queries on the async ORM. Both build
+# their querysets and rows with the helpers below.
+
+CUSTOMER_LOOKUP_LIMIT = 15
+
+
+def _phone_filter(q: str, prefix: str = "") -> Q:
+    """
+    Match a typed / caller-ID number against the normalized E.164 columns.
+    Full numbers ("+49 171 ...", "0171 ...") become a prefix match that the
+    column index can serve; other digit runs use a substring match.
+    """
+    variants = phone_digit_variants(q)
+    if not variants:
+        return Q(pk__in=[])
+
+    if q.strip().startswith(("+", "0")):
+        lookup, value = "startswith", f"+{variants[0]}"
+    else:
+        lookup, value = "contains", variants[0]
+
+    return (
+        Q(**{f"{prefix}phone_e164__{lookup}": value})
+        | Q(**{f"{prefix}mobile_e164__{lookup}": value})
+    )
+
+
+def _normalize_query(q: str) -> str:
+    """
+    - strips
+    - collapses whitespace
+    - removes whitespace around '@' in emails
+    ("name @gmail.com" → "name@gmail.com")
+    """
+    q = (q or "").strip()
+    q = re.sub(r"\s+", " ", q)
+    q = re.sub(r"\s*@\s*", "@", q)
+    return q
+
+
+def _customers_qs(q):
+    """Customer rows for the lookup when the in-process index can't
+    answer (see ajax_lookup_customer)."""
+    customer_filter = (
+        Q(email__iexact=q)
+        | Q(email__icontains=q)
+        | Q(first_name__icontains=q)
+        | Q(last_name__icontains=q)
+        | Q(phone__icontains=q)
+        | Q(mobile__icontains=q)
+        | _phone_filter(q)
+    )
+
+    return Customer.objects.filter(
+        customer_filter).order_by(
+            "last_name", "first_name")[:CUSTOMER_LOOKUP_LIMIT]
+
+
+def _customer_row(c):
+    return {
+        "type": "customer",
+        "first_name": c.first_name or "",
+        "last_name": c.last_name or "",
+        "email": c.email or "",
+        "phone": c.phone or "",
+        "mobile": c.mobile or "",
+    }
+
+
+def _lookup_params(request):
+    """(normalized q, mode)"""
+    raw_query = request.GET.get("q", "").strip()
+    mode = request.GET.get("mode", "past").lower()
+    return _normalize_query(raw_query), mode
+
+
+def _by_id_qs(q):
+    return (
+        TableReservation.objects
+        .select_related("timeslot_availability", "customer")
+        .filter(id=int(q.strip()))
+    )
+
+
+def _reservation_by_id_row(res_by_id):
+    date_val = res_by_id.reservation_date or (
+        res_by_id.timeslot_availability.calendar_date
+        if res_by_id.timeslot_availability else None
+    )
+    customer_name = ""
+    customer_email = ""
+    customer_phone = ""
+    customer_mobile = ""
+    if res_by_id.customer:
+        customer_name = f"{res_by_id.customer.first_name} \
+            {res_by_id.customer.last_name}".strip(
+        )
+        customer_email = res_by_id.customer.email or ""
+        customer_phone = res_by_id.customer.phone or ""
+        customer_mobile = res_by_id.customer.mobile or ""
+
+    return {
+        "type": "reservation",
+        "reservation_id": res_by_id.id,
+        "first_name": customer_name.split()[0]
+        if customer_name else "",
+        "last_name":
+        " ".join(customer_name.split()[
+                 1:]) if customer_name else "",
+        "email": customer_email,
+        "phone": customer_phone,
+        "mobile": customer_mobile,
+        "reservation_date": date_val.isoformat()
+            if date_val else "",
+        "time_slot": res_by_id.time_slot or "",
+        "pretty_slot":
+            SLOT_LABELS.get(res_by_id.time_slot,
+                            res_by_id.time_slot or ""),
+        "reservation_status":
+            bool(getattr(res_by_id, "reservation_status", True)),
+    }
+
+
+def _existing_qs(q, today):
+    """Mode "existing": active/upcoming reservations."""
+    return (
+        TableReservation.objects
+        .select_related("timeslot_availability", "customer")
+        .filter(status=TableReservation.STATUS_ACTIVE,
+                reservation_date__gte=today)
+        .filter(
+            Q(customer__first_name__icontains=q)
+            | Q(customer__last_name__icontains=q)
+            | Q(customer__email__icontains=q)
+            | _phone_filter(q, prefix="customer__")
+        )
+        .order_by("-reservation_date", "-created_at")[:10]
+    )
+
+
+def _reservation_row(r):
+    date_val = r.reservation_date or (
+        r.timeslot_availability.calendar_date
+        if r.timeslot_availability else None
+    )
+    customer_name = ""
+    customer_name = (
+        f"{r.customer.first_name} {r.customer.last_name}"
+    ).strip()
+
+    return {
+        "type": "reservation",
+        "reservation_id": r.id,
+        "first_name":
+        customer_name.split()[0] if customer_name else "",
+        "last_name":
+        " ".join(customer_name.split()[1:]) if customer_name else "",
+        "email": r.customer.email if r.customer else "",
+        "phone": r.customer.phone if r.customer else "",
+        "mobile": r.customer.mobile if r.customer else "",
+        "reservation_date": date_val.isoformat() if date_val else "",
+        "time_slot": r.time_slot or "",
+        "pretty_slot": SLOT_LABELS.get(r.time_slot, r.time_slot or ""),
+        "reservation_status": (r.status
+                               == TableReservation.STATUS_ACTIVE),
+    }
+
+
+def _existing_rows(reservations, reservation_by_id):
+    return [
+        _reservation_row(r) for r in reservations
+        if not (reservation_by_id
+                and r.id == reservation_by_id["reservation_id"])
+    ]
+
+
+def _unique_customers(candidates):
+    customer_results = []
+    seen_emails = set()
+
+    for c in candidates:
+        email_lower = (c["email"] or "").lower()
+        if email_lower in seen_emails:
+            continue
+        if email_lower:
+            seen_emails.add(email_lower)
+
+        customer_results.append(c)
+
+    return customer_results
+
+
+@login_required
+@require_GET
+def ajax_lookup_customer(request):
+    if not request.user.is_staff:
+        return JsonResponse({"results": []}, status=403)
+
+    q, mode = _lookup_params(request)
+
+    if len(q) < 2:
+        return JsonResponse({"results": []})
+
+    today = timezone.now().date()
+    results = []
+
+    # ------------------- ALWAYS CHECK FOR RESERVATION ID -------------------
+    reservation_by_id = None
+    if q.strip().isdigit():
+        try:
+            res_by_id = _by_id_qs(q).first()
+            if res_by_id:
+                reservation_by_id = _reservation_by_id_row(res_by_id)
+        except (ValueError, OverflowError):
+            pass
+
+    if reservation_by_id:
+        results.append(reservation_by_id)
+
+    # ------------------------------------------------------------------
+    # Mode: existing → active/upcoming reservations
+    # ------------------------------------------------------------------
+    if mode == "existing":
+        results.extend(
+            _existing_rows(_existing_qs(q, today), reservation_by_id))
+        return JsonResponse({"results": results})
+
+    # ------------------------------------------------------------------
+    # Mode: past (default) → customer profiles from Customer model
+    # ------------------------------------------------------------------
+    # Served from the in-process index; None means it is still cold. No
+    # match falls back too: a customer saved by another worker is only in
+    # this worker's index after its next rebuild, and staff on the phone
+    # must still find them. The fallback is one query and not cached: a
+    # cache round trip per keystroke costs more (a write, with the
+    # database cache).
+    candidates = customer_index.search(q, limit=CUSTOMER_LOOKUP_LIMIT)
+
+    if not candidates:
+        candidates = [_customer_row(c) for c in _customers_qs(q)]
+
+    results.extend(_unique_customers(candidates))
+
+    return JsonResponse({"results": results})
+
+
+@transaction.non_atomic_requests  # read-only; async views can't be atomic
+@async_login_required
+@async_require_GET
+async def ajax_lookup_customer_async(request):
+    """ajax_lookup_customer on the async ORM."""
+    if not await sync_to_async(lambda: request.user.is_staff)():
+        return JsonResponse({"results": []}, status=403)
+
+    q, mode = _lookup_params(request)
+
+    if len(q) < 2:
+        return JsonResponse({"results": []})
+
+    today = timezone.now().date()
+    results = []
+
+    reservation_by_id = None
+    if q.strip().isdigit():
+        try:
+            res_by_id = await _by_id_qs(q).afirst()
+            if res_by_id:
+                reservation_by_id = _reservation_by_id_row(res_by_id)
+        except (ValueError, OverflowError):
+            pass
+
+    if reservation_by_id:
+        results.append(reservation_by_id)
+
+    if mode == "existing":
+        reservations = [r async for r in _existing_qs(q, today)]
+        results.extend(_existing_rows(reservations, reservation_by_id))
+        return JsonResponse({"results": results})
+
+    # Off the event loop: short queries scan every entry under the index
+    # lock, which a background rebuild also takes.
+    candidates = await sync_to_async(
+        customer_index.search, thread_sensitive=False)(
+            q, limit=CUSTOMER_LOOKUP_LIMIT)
+
+    if not candidates:
+        candidates = [_customer_row(c) async for c in _customers_qs(q)]
+
+    results.extend(_unique_customers(candidates))
+
+    return JsonResponse({"results": results})
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import (
+    authenticate,
+    get_user_model,
+    login,
+    update_session_auth_hash,
+)
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.forms import SetPasswordForm
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.views.decorators.http import require_http_methods
+
+from allauth.account.models import EmailAddress
+
+from reservation_book.forms import SignUpForm
+from reservation_book.views.common import (
+    _normalize_email,
+    staff_or_superuser_required,
+)
+
+# Sign-up, first-login setup and password onboarding links.
+
+
+def signup(request):
+    if request.method == "POST":
+        form = SignUpForm(request.POST)
+        if form.is_valid():
+            user = form.save()
+            login(request, user)  # log in automatically after signup
+            return redirect("make_reservation")
+    else:
+        form = SignUpForm()
+    return render(request, "registration/signup.html", {"form": form})
+
+
+@login_required
+def first_login_setup(request):
+    """Force new staff to change username and password on first login"""
+    if not request.user.is_staff:
+        return redirect('make_reservation')
+
+    # If username has been changed from email,
+    # they've already completed setup
+    if request.user.username != request.user.email:
+        return redirect('staff_dashboard')
+
+    if request.method == 'POST':
+        password_form = SetPasswordForm(request.user, request.POST)
+        username = request.POST.get('username', '').strip()
+
+        if password_form.is_valid() and username:
+            user = password_form.save()
+            update_session_auth_hash(request, user)  # Keep logged in
+
+            user.username = username
+            user.save()
+
+            messages.success(
+                request, "Password and username updated \
+                    successfully. Welcome!")
+            return redirect('staff_dashboard')
+    else:
+        password_form = SetPasswordForm(request.user)
+
+    return render(request, 'reservation_book/first_login_setup.html', {
+        'password_form': password_form,
+        'current_email': request.user.email,
+    })
+
+
+def _build_set_password_link(request, user):
+    """
+    Builds a one-time onboarding link that lets a user
+    SET their password (not reset-request flow).
+    """
+    uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    return request.build_absolute_uri(
+        reverse("onboarding_set_password", kwargs={
+                "uidb64": uidb64, "token": token})
+    )
+
+
+@require_http_methods(["GET", "POST"])
+def onboarding_set_password(request, uidb64, token):
+    """
+    One-time onboarding link: user sets password, then we log them in.
+    Works even with multiple AUTHENTICATION_BACKENDS configured.
+    """
+    User = get_user_model()
+
+    try:
+        uid = force_str(urlsafe_base64_decode(uidb64))
+        user = User.objects.get(pk=uid)
+    except Exception:
+        user = None
+
+    if user is None or not default_token_generator.check_token(user, token):
+        messages.error(
+            request, "This password setup link is invalid or has expired.")
+        return redirect("account_login")
+
+    if request.method == "POST":
+        form = SetPasswordForm(user, request.POST)
+        if form.is_valid():
+            form.save()
+
+            new_password = form.cleaned_data["new_password1"]
+
+            # Authenticate so Django knows which backend was used
+            # (fixes multi-backend login() errors)
+            authed = authenticate(
+                request, username=user.get_username(), password=new_password)
+            if authed is None and getattr(user, "email", None):
+                authed = authenticate(
+                    request, email=user.email, password=new_password)
+
+            if authed is not None:
+                login(request, authed)
+            else:
+                # Fallback: explicitly specify backend
+                # (keeps you from crashing)
+                login(
+                    request,
+                    user,
+                    backend="allauth.account\
+                        .auth_backends.AuthenticationBackend",
+                )
+
+            messages.success(
+                request, "Password set successfully. You’re now logged in.")
+            return redirect("my_reservations")
+
+    else:
+        form = SetPasswordForm(user)
+
+    return render(
+        request,
+        "reservation_book/onboarding_set_password.html",
+        {"form": form, "user": user},
+    )
+
+
+@staff_or_superuser_required
+@require_http_methods(["POST"])
+def resend_password_setup_link(request):
+    """
+    Staff button: resend the onboarding set-password link to a
+    customer by email.
+    Expected POST field: email
+    """
+
+    email = _normalize_email(request.POST.get("email"))
+    if not email:
+        messages.error(request, "Email is required.")
+        # change if your staff page name differs
+        return redirect("staff_management")
+
+    User = get_user_model()
+    user = (
+        User.objects.filter(email__iexact=email).first()
+        or User.objects.filter(username__iexact=email).first()
+    )
+
+    if not user:
+        messages.error(request, "No user found for that email.")
+        return redirect("staff_management")
+
+    # Ensure EmailAddress row exists for allauth
+    EmailAddress.objects.get_or_create(
+        user=user,
+        email=email,
+        defaults={"primary": True, "verified": True},
+    )
+
+    password_setup_url = _build_set_password_link(request, user)
+
+    # You can reuse your existing phone confirmation template or
+    # create a small staff resend template
+    context = {"password_setup_url": password_setup_url, "user": user}
+    message = render_to_string(
+        "reservation_book/emails/resend_password_setup.txt", context)
+
+    send_mail(
+        subject="Set your password for Gambinos Restaurant & Lounge",
+        message=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+        fail_silently=False,
+    )
+
+    messages.success(request, "Password setup link resent.")
+    return redirect("staff_management")
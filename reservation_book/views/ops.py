@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from reservation_book import metrics, slow_queries
+from reservation_book.views.common import staff_or_superuser_required
+
+# Operational pages: Prometheus scrape, slow-query log, row-lock hot
+# spots.
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Open to staff and to the addresses in
+    METRICS_ALLOWED_IPS (the scraper, usually on the same host).
+    """
+    user = request.user
+    staff = user.is_authenticated and (user.is_staff or user.is_superuser)
+    if not staff and (request.META.get("REMOTE_ADDR")
+                      not in settings.METRICS_ALLOWED_IPS):
+        return HttpResponseForbidden("Metrics are not public.")
+    return HttpResponse(
+        metrics.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@staff_or_superuser_required
+@require_GET
+def staff_slow_queries(request):
+    """Slow-query log (see slow_queries.py), grouped by statement shape."""
+    records = slow_queries.read_records()
+    return render(
+        request,
+        "reservation_book/staff_slow_queries.html",
+        {
+            "shapes": slow_queries.summarize(records)[:100],
+            "record_count": len(records),
+            "threshold_ms": settings.SLOW_QUERY_MS,
+        },
+    )
+
+
+@staff_or_superuser_required
+@require_GET
+def staff_lock_hotspots(request):
+    """
+    Service dates whose availability rows serialize bookings: row-lock
+    wait per date and call site (metrics.row_lock), across all workers
+    when METRICS_DIR is shared. Empty on SQLite, which has no row locks.
+    """
+    return render(
+        request,
+        "reservation_book/staff_lock_hotspots.html",
+        {
+            "hotspots": metrics.lock_hotspots(),
+            "database": connection.vendor,
+        },
+    )
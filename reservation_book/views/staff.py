@@ -0,0 +1,1069 @@
+from __future__ import annotations
+
+import json
+import logging
+import tempfile
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.core.mail import send_mail
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F, IntegerField, Q, Value
+from django.db.models.expressions import ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.http import (
+    FileResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from django.utils.http import urlencode
+from django.views.decorators.http import require_GET, require_POST
+
+from reservation_book.constants import SLOT_LABELS
+from reservation_book.models import (
+    Customer,
+    NoShowEvent,
+    ReservationStats,
+    TableReservation,
+)
+from reservation_book.services import bulk_actions, exports, history
+from reservation_book.services.lifecycle import reservation_status_changed
+from reservation_book.services.pagination import decode_cursor, encode_cursor
+from reservation_book.services.phones import looks_like_phone_query
+from reservation_book.slots import covered_slots
+from reservation_book.views.common import (
+    _apply_ban_if_needed,
+    _auto_mark_no_shows,
+    _normalize_email,
+    _no_show_allowed,
+    NO_SHOW_BAN_THRESHOLD,
+    staff_or_superuser_required,
+    superuser_required,
+)
+from reservation_book.views.lookup import _normalize_query, _phone_filter
+
+# Staff pages: reservations list and export, floor view, bulk and
+# single-row status actions, customer overview and staff management.
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def _staff_action_result(request, level, text, reservation=None):
+    """
+    Finish a staff reservation action. The floor view posts with fetch()
+    and gets JSON (plus the updated row); plain form posts get a flash
+    message and the usual redirect to the staff list.
+    """
+    if request.headers.get("x-requested-with") == "XMLHttpRequest":
+        payload = {"success": level != "error", "message": text}
+        if reservation is not None:
+            payload["reservation"] = _floor_row(reservation)
+        return JsonResponse(payload, status=400 if level == "error" else 200)
+
+    getattr(messages, level)(request, text)
+    return redirect("staff_reservations")
+
+
+@login_required
+@staff_or_superuser_required
+@require_POST
+def mark_reservation_completed(request, reservation_id):
+    """
+    Staff marks reservation as COMPLETED at bill payment.
+    Rule: can ONLY be completed on the reservation date.
+    Answers JSON to ajax posts (floor view).
+    """
+    reservation = get_object_or_404(
+        TableReservation.objects.select_related("customer"),
+        id=reservation_id,
+    )
+
+    today = timezone.localdate()
+    if reservation.reservation_date != today:
+        return _staff_action_result(
+            request, "error",
+            "Complete can only be set on the reservation date.")
+
+    status_active = getattr(TableReservation, "STATUS_ACTIVE", "active")
+    status_completed = getattr(
+        TableReservation, "STATUS_COMPLETED", "completed")
+    status_no_show = getattr(TableReservation, "STATUS_NO_SHOW", "no_show")
+
+    # Only allow completing ACTIVE reservations (not no_show,
+    # not already completed)
+    if getattr(reservation, "status", None) != status_active:
+        if getattr(reservation, "status", None) == status_completed:
+            return _staff_action_result(
+                request, "info", "This reservation is already completed.",
+                reservation)
+        if getattr(reservation, "status", None) == status_no_show:
+            return _staff_action_result(
+                request, "error",
+                "Cannot complete a reservation already marked as No Show.")
+        return _staff_action_result(
+            request, "info", "This reservation is not active.")
+
+    # Same fields as bulk_complete, whichever button staff used
+    updates = ["updated_at", "status", "completed_at"]
+    reservation.mark_completed()
+
+    # Keep legacy boolean TRUE (your legacy meaning is “not cancelled”)
+    if hasattr(reservation, "reservation_status"):
+        if reservation.reservation_status is not True:
+            reservation.reservation_status = True
+            updates.append("reservation_status")
+
+    with transaction.atomic():
+        # Re-check under the row lock so a double submit counts once
+        still_active = (
+            TableReservation.objects.select_for_update()
+            .filter(pk=reservation.pk, status=status_active)
+            .first()
+        )
+        if still_active is None:
+            return _staff_action_result(
+                request, "info", "This reservation is not active.")
+
+        reservation.save(update_fields=updates)
+        reservation_status_changed(
+            reservation.customer_id,
+            reservation.number_of_tables_required_by_patron,
+            status_active,
+            status_completed,
+        )
+
+    return _staff_action_result(
+        request, "success", "Reservation marked as completed.", reservation)
+
+
+@staff_or_superuser_required
+@require_POST
+def mark_completed(request, reservation_id):
+    """
+    Alias view so older templates/urls using 'mark_completed' keep working.
+    """
+    reservation = get_object_or_404(TableReservation, id=reservation_id)
+
+    today = timezone.localdate()
+
+    # ---------- lifecycle guards ----------
+    if reservation.status != TableReservation.STATUS_ACTIVE:
+        messages.error(request, "Only active reservations can be completed.")
+        return redirect("staff_reservations")
+
+    if reservation.reservation_date != today:
+        messages.error(request, "Completion allowed only on reservation date.")
+        return redirect("staff_reservations")
+
+    return mark_reservation_completed(request, reservation_id)
+
+
+@staff_or_superuser_required
+def bar_customer(request, customer_id):
+    if request.method != "POST":
+        return redirect("user_reservations_overview")
+
+    c = get_object_or_404(Customer, pk=customer_id)
+    if not c.barred:
+        c.barred = True
+        c.save(update_fields=["barred"])
+        messages.success(
+            request, f"{c.first_name} {c.last_name} has been barred.")
+    else:
+        messages.info(request, "Customer is already barred.")
+
+    return redirect("user_reservations_overview")
+
+
+@staff_or_superuser_required
+def unbar_customer(request, customer_id):
+    if request.method != "POST":
+        return redirect("user_reservations_overview")
+
+    c = get_object_or_404(Customer, pk=customer_id)
+    if c.barred:
+        c.barred = False
+        c.save(update_fields=["barred"])
+        messages.success(
+            request, f"{c.first_name} {c.last_name} has been unbarred.")
+    else:
+        messages.info(request, "Customer is not barred.")
+
+    return redirect("user_reservations_overview")
+
+
+@staff_or_superuser_required
+def mark_no_show(request, reservation_id):
+    """
+    Staff marks a reservation as NO SHOW.
+    - Does NOT release demand (it's in the past)
+    - Logs a NoShowEvent (idempotent)
+    - Auto-bans customer if repeated no-shows
+    - Answers JSON to ajax posts (floor view)
+    """
+    if request.method != "POST":
+        return redirect("staff_reservations")
+
+    reservation = get_object_or_404(
+        TableReservation.objects.select_related("customer"),
+        id=reservation_id,
+    )
+
+    if not _no_show_allowed(reservation):
+        return _staff_action_result(
+            request, "error",
+            "No-show can only be set for past reservations.")
+
+    # If already no_show, do nothing
+    if getattr(reservation, "status", "") == TableReservation.STATUS_NO_SHOW:
+        return _staff_action_result(
+            request, "info",
+            "This reservation is already marked as No Show.", reservation)
+
+    if reservation.status == TableReservation.STATUS_COMPLETED:
+        return _staff_action_result(
+            request, "error", "Reservation cannot be marked as No Show.")
+
+    # ✅ G: normalize email for consistent analytics joins
+    cust_email = (
+        getattr(getattr(reservation, "customer", None), "email", "") or ""
+    ).strip().lower()
+
+    # Mark reservation as no-show
+    updates = ["status", "updated_at"]
+    reservation.status = TableReservation.STATUS_NO_SHOW
+
+    # Keep legacy flag TRUE so old filters don't hide the record
+    if hasattr(reservation, "reservation_status"):
+        reservation.reservation_status = True
+        updates.append("reservation_status")
+
+    reservation.save(update_fields=updates)
+
+    # --- F2: idempotent event creation (exact field match) ---
+    event, created = NoShowEvent.objects.get_or_create(
+        reservation_id=reservation.id,
+        defaults={
+            "reservation_date": reservation.reservation_date,
+            "time_slot": reservation.time_slot or "",
+            "tables": int(getattr(
+                reservation, "number_of_tables_required_by_patron", 0) or 0),
+            "duration_slots": int(getattr(
+                reservation, "duration_hours", 1) or 1),
+            "customer_email": cust_email,
+            "customer_id": reservation.customer_id,
+            "marked_by_staff": True,  # manual staff action
+        },
+    )
+    # --------------------------------------------------------
+
+    is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+    newly_barred = False
+
+    # Only count and apply ban logic if a NEW no-show event was created
+    if created:
+        if reservation.customer_id:
+            Customer.objects.filter(pk=reservation.customer_id).update(
+                no_show_count=F("no_show_count") + 1
+            )
+        reservation_status_changed(
+            reservation.customer_id,
+            reservation.number_of_tables_required_by_patron,
+            TableReservation.STATUS_ACTIVE,
+            TableReservation.STATUS_NO_SHOW,
+        )
+        newly_barred = _apply_ban_if_needed(
+            reservation.customer_id, threshold=3, window_days=90)
+        if newly_barred:
+            if reservation.customer_id:
+                reservation.customer.barred = True
+            if not is_ajax:
+                messages.warning(
+                    request,
+                    "Customer has been barred due to repeated no-shows.")
+    elif not is_ajax:
+        messages.info(
+            request, "No-show event already existed (no duplicate recorded).")
+
+    text = "Marked as No Show."
+    if created and newly_barred:
+        text += " Customer has been barred due to repeated no-shows."
+    return _staff_action_result(request, "success", text, reservation)
+
+
+def _bulk_ids(request):
+    """
+    Reservation ids from a bulk POST: repeated `ids` form fields,
+    a comma-separated `ids` value, or a JSON body {"ids": [...]}.
+    Returns None when the payload is unusable.
+    """
+    if request.content_type == "application/json":
+        try:
+            raw = json.loads(request.body or b"{}").get("ids")
+        except (ValueError, AttributeError):
+            return None
+        if not isinstance(raw, list):
+            return None
+    else:
+        raw = [
+            part
+            for value in request.POST.getlist("ids")
+            for part in value.split(",")
+            if part.strip()
+        ]
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw))
+    except (TypeError, ValueError):
+        return None
+    if not ids or len(ids) > bulk_actions.MAX_BULK_IDS:
+        return None
+    return ids
+
+
+def _bulk_response(result):
+    payload = result.as_dict()
+    payload["success"] = True
+    payload["reservations"] = [
+        _floor_row(r)
+        for r in TableReservation.objects.select_related("customer")
+        .filter(pk__in=result.updated).order_by("pk")
+    ] if result.updated else []
+    return JsonResponse(payload)
+
+
+@staff_or_superuser_required
+@require_POST
+def staff_bulk_complete(request):
+    """
+    Complete many reservations in one request (end of service).
+    Body: ids=1&ids=2… or JSON {"ids": [...]}; answers a JSON summary
+    of updated and skipped ids.
+    """
+    ids = _bulk_ids(request)
+    if ids is None:
+        return JsonResponse(
+            {"success": False, "message": "Send 1-"
+             f"{bulk_actions.MAX_BULK_IDS} reservation ids."},
+            status=400,
+        )
+    return _bulk_response(bulk_actions.bulk_complete(ids))
+
+
+@staff_or_superuser_required
+@require_POST
+def staff_bulk_no_show(request):
+    """
+    No-show many reservations in one request. Same rules as
+    mark_no_show (past dates only, bans after repeated no-shows),
+    but the ban check runs once per affected customer.
+    """
+    ids = _bulk_ids(request)
+    if ids is None:
+        return JsonResponse(
+            {"success": False, "message": "Send 1-"
+             f"{bulk_actions.MAX_BULK_IDS} reservation ids."},
+            status=400,
+        )
+    return _bulk_response(bulk_actions.bulk_no_show(
+        ids, ban_threshold=NO_SHOW_BAN_THRESHOLD))
+
+# -------------------------------------------------------------------
+# Staff dashboard (cards for Phone Reservations, Customer Stats, etc.)
+# -------------------------------------------------------------------
+
+
+STAFF_RESERVATIONS_PAGE_SIZE = 50
+
+
+STAFF_RESERVATIONS_WINDOW_DAYS = 3  # default range: today ± this many days
+
+
+@staff_or_superuser_required
+def staff_reservations(request):
+    """
+    Staff-facing list of reservations.
+    - Shows ACTIVE + COMPLETED + NO_SHOW
+    - Past ACTIVE reservations remain ACTIVE until staff marks outcome
+      (Completed or No Show).
+    - Filters: ?from=&to= (ISO dates, default today ± a few days),
+      ?status=active|completed|no_show, ?source=phone|online
+    - Keyset pagination on (-reservation_date, time_slot, id) via opaque
+      ?after= / ?before= cursors, so each page costs one bounded query.
+    """
+    today = timezone.localdate()
+    _auto_mark_no_shows(today=today)
+
+    window = timedelta(days=STAFF_RESERVATIONS_WINDOW_DAYS)
+    date_from = _parse_iso_date(request.GET.get("from")) or today - window
+    date_to = _parse_iso_date(request.GET.get("to")) or today + window
+    if date_to < date_from:
+        date_from, date_to = date_to, date_from
+
+    allowed = [
+        TableReservation.STATUS_ACTIVE,
+        TableReservation.STATUS_COMPLETED,
+        TableReservation.STATUS_NO_SHOW,
+    ]
+    status = (request.GET.get("status") or "").strip()
+    if status not in allowed:
+        status = ""
+    source = (request.GET.get("source") or "").strip()
+    if source not in ("phone", "online"):
+        source = ""
+
+    qs = (
+        TableReservation.objects
+        .select_related("customer")
+        .filter(
+            reservation_date__gte=date_from,
+            reservation_date__lte=date_to,
+            status__in=[status] if status else allowed,
+        )
+        .exclude(time_slot__isnull=True)
+        .exclude(time_slot="")
+    )
+    if source:
+        qs = qs.filter(is_phone_reservation=(source == "phone"))
+
+    page_size = STAFF_RESERVATIONS_PAGE_SIZE
+    after = decode_cursor(request.GET.get("after"), 3)
+    before = None if after else decode_cursor(request.GET.get("before"), 3)
+    key = _staff_reservations_key(after or before)
+
+    if before and key:
+        d, slot, pk = key
+        # Walk backwards, then flip the slice back into display order
+        rows = list(
+            qs.filter(
+                Q(reservation_date__gt=d)
+                | Q(reservation_date=d, time_slot__lt=slot)
+                | Q(reservation_date=d, time_slot=slot, id__lt=pk)
+            )
+            .order_by("reservation_date", "-time_slot", "-id")[:page_size + 1]
+        )
+        has_prev = len(rows) > page_size
+        reservations = list(reversed(rows[:page_size]))
+        has_next = True
+    else:
+        if key:
+            d, slot, pk = key
+            qs = qs.filter(
+                Q(reservation_date__lt=d)
+                | Q(reservation_date=d, time_slot__gt=slot)
+                | Q(reservation_date=d, time_slot=slot, id__gt=pk)
+            )
+        rows = list(
+            qs.order_by("-reservation_date", "time_slot", "id")
+            [:page_size + 1]
+        )
+        has_next = len(rows) > page_size
+        reservations = rows[:page_size]
+        has_prev = key is not None
+
+    filters = {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "status": status,
+        "source": source,
+    }
+    base_query = urlencode({k: v for k, v in filters.items() if v})
+    next_query = prev_query = ""
+    if reservations and has_next:
+        last = reservations[-1]
+        next_query = base_query + "&" + urlencode({"after": encode_cursor(
+            last.reservation_date.isoformat(), last.time_slot, last.id)})
+    if reservations and has_prev:
+        first = reservations[0]
+        prev_query = base_query + "&" + urlencode({"before": encode_cursor(
+            first.reservation_date.isoformat(), first.time_slot, first.id)})
+
+    return render(
+        request,
+        "reservation_book/staff_reservations.html",
+        {
+            "reservations": reservations,
+            "slot_labels": SLOT_LABELS,
+            "today": today,
+            "filters": filters,
+            "status_choices": [
+                (value, label)
+                for value, label in TableReservation.STATUS_CHOICES
+                if value in allowed
+            ],
+            "first_query": base_query,
+            "next_query": next_query,
+            "prev_query": prev_query,
+        },
+    )
+
+
+def _parse_iso_date(raw):
+    try:
+        return date.fromisoformat((raw or "").strip())
+    except ValueError:
+        return None
+
+
+def _staff_reservations_key(values):
+    """Cursor values -> (date, time_slot, id), or None if malformed."""
+    if not values:
+        return None
+    d = _parse_iso_date(values[0])
+    try:
+        pk = int(values[2])
+    except ValueError:
+        return None
+    if d is None or values[1] not in SLOT_LABELS:
+        return None
+    return d, values[1], pk
+
+
+def _export_error(exc):
+    # Plain text, so nothing in the message is ever rendered as HTML
+    return HttpResponseBadRequest(
+        str(exc), content_type="text/plain; charset=utf-8")
+
+
+# Parts pulled per thread hop when streaming an export under ASGI
+EXPORT_STREAM_BATCH = 256
+
+
+def _async_stream(parts):
+    """
+    `parts` as an async iterator. Under ASGI, Django 4.2 drains a sync
+    iterator with list() before sending, i.e. builds the whole export in
+    memory. Batches are pulled on the request's sync thread, which owns
+    the cursor's connection.
+    """
+    parts = iter(parts)
+    pull = sync_to_async(lambda: list(islice(parts, EXPORT_STREAM_BATCH)))
+
+    async def stream():
+        while batch := await pull():
+            for part in batch:
+                yield part
+
+    return stream()
+
+
+@staff_or_superuser_required
+@require_GET
+def staff_export(request):
+    """
+    Streaming export for accounting.
+    ?kind=reservations|cancellations|no_shows  &format=csv|xlsx
+    &from=&to= (ISO dates on reservation_date, optional)
+    &status= / &source=phone|online (reservations only)
+
+    CSV rows are streamed straight from a database cursor; XLSX is
+    spooled to a temporary file first and then streamed. Under ASGI both
+    are handed over as async iterators so they stream there too.
+    """
+    asgi = isinstance(request, ASGIRequest)
+    kind = (request.GET.get("kind") or "reservations").strip()
+    fmt = (request.GET.get("format") or "csv").strip().lower()
+    date_from = _parse_iso_date(request.GET.get("from"))
+    date_to = _parse_iso_date(request.GET.get("to"))
+
+    if fmt not in exports.FORMATS:
+        return _export_error(exports.ExportError(
+            f"Unknown format; expected {' or '.join(exports.FORMATS)}"))
+    try:
+        queryset = exports.export_queryset(
+            kind,
+            date_from=date_from,
+            date_to=date_to,
+            status=(request.GET.get("status") or "").strip(),
+            source=(request.GET.get("source") or "").strip(),
+        )
+    except exports.ExportError as exc:
+        return _export_error(exc)
+
+    filename = exports.export_filename(kind, fmt, date_from, date_to)
+    if fmt == "xlsx":
+        spool = tempfile.TemporaryFile()
+        try:
+            exports.write_xlsx(kind, queryset, spool)
+        except exports.ExportError as exc:
+            spool.close()
+            return _export_error(exc)
+        spool.seek(0)
+        response = FileResponse(spool, as_attachment=True, filename=filename)
+        if asgi:
+            # Headers (length, filename) are kept; the spool still closes
+            # with the response
+            response.streaming_content = _async_stream(
+                response.streaming_content)
+        return response
+
+    lines = exports.iter_csv(kind, queryset)
+    response = StreamingHttpResponse(
+        _async_stream(lines) if asgi else lines,
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+FLOOR_POLL_SECONDS = 5
+
+
+# Re-send rows touched this long before the cursor, so a transaction that
+# committed late with an older updated_at is still picked up. The client
+# applies rows idempotently by id.
+FLOOR_CURSOR_OVERLAP = timedelta(seconds=10)
+
+
+def _floor_queryset(day):
+    return (
+        TableReservation.objects
+        .filter(
+            reservation_date=day,
+            status__in=[
+                TableReservation.STATUS_ACTIVE,
+                TableReservation.STATUS_COMPLETED,
+                TableReservation.STATUS_NO_SHOW,
+            ],
+        )
+        .select_related("customer")
+        .only(
+            "id", "reservation_date", "time_slot", "duration_hours",
+            "number_of_tables_required_by_patron", "status",
+            "is_phone_reservation", "updated_at",
+            "customer__first_name", "customer__last_name",
+            "customer__phone", "customer__mobile", "customer__barred",
+        )
+    )
+
+
+def _floor_row(r, now=None):
+    """JSON shape of one reservation on the floor view."""
+    customer = r.customer
+    name = ""
+    phone = ""
+    if customer is not None:
+        name = f"{customer.first_name or ''} {customer.last_name or ''}"
+        phone = customer.phone or customer.mobile or ""
+    is_active = r.status == TableReservation.STATUS_ACTIVE
+    return {
+        "id": r.id,
+        "slots": covered_slots(r.time_slot, r.duration_hours or 1),
+        "time": r.time_range_pretty,
+        "name": name.strip() or f"Reservation #{r.id}",
+        "phone": phone,
+        "tables": r.number_of_tables_required_by_patron,
+        "status": r.status,
+        "status_display": r.status_display,
+        "is_phone": bool(r.is_phone_reservation),
+        "barred": bool(customer and customer.barred),
+        "can_complete": is_active
+        and r.reservation_date == timezone.localdate(),
+        "can_no_show": is_active and _no_show_allowed(r, now),
+    }
+
+
+@staff_or_superuser_required
+def staff_floor(request):
+    """
+    Tonight's service for hosts: today's reservations grouped by each
+    slot they cover. The page renders once, then polls
+    staff_floor_changes for rows touched since its cursor.
+    """
+    now = timezone.now()
+    today = timezone.localdate(now)
+    rows = [
+        _floor_row(r, now)
+        for r in _floor_queryset(today).order_by("time_slot", "id")
+    ]
+
+    return render(
+        request,
+        "reservation_book/staff_floor.html",
+        {
+            "today": today,
+            "slot_labels": SLOT_LABELS,
+            "floor_state": {
+                "cursor": now.isoformat(),
+                "day": today.isoformat(),
+                "slots": [
+                    {"key": key, "label": label}
+                    for key, label in SLOT_LABELS.items()
+                ],
+                "reservations": rows,
+                "poll_seconds": FLOOR_POLL_SECONDS,
+                "changes_url": reverse("staff_floor_changes"),
+                "complete_url": reverse(
+                    "mark_reservation_completed", args=[0]),
+                "no_show_url": reverse("mark_no_show", args=[0]),
+                "bulk_complete_url": reverse("staff_bulk_complete"),
+                "bulk_no_show_url": reverse("staff_bulk_no_show"),
+            },
+        },
+    )
+
+
+@staff_or_superuser_required
+@require_GET
+def staff_floor_changes(request):
+    """
+    Delta feed for the floor view.
+    ?since=<cursor from the last response>
+
+    Returns today's rows with updated_at after the cursor, plus the ids
+    still on today's floor so the client drops cancelled (hard-deleted)
+    and moved reservations. Both queries are served by the
+    (reservation_date, status) index and touch only today's rows.
+    A missing or bad cursor, or a new day, returns a full snapshot.
+    """
+    now = timezone.now()
+    today = timezone.localdate(now)
+
+    since = None
+    raw = request.GET.get("since") or ""
+    try:
+        since = datetime.fromisoformat(raw)
+    except ValueError:
+        since = None
+    if since is not None and timezone.is_naive(since):
+        since = None
+    if since is not None and timezone.localdate(since) != today:
+        since = None
+
+    qs = _floor_queryset(today)
+    changed = qs
+    if since is not None:
+        changed = qs.filter(updated_at__gt=since - FLOOR_CURSOR_OVERLAP)
+
+    return JsonResponse({
+        "cursor": now.isoformat(),
+        "day": today.isoformat(),
+        "full": since is None,
+        "reservations": [
+            _floor_row(r, now) for r in changed.order_by("time_slot", "id")
+        ],
+        "ids": list(qs.values_list("id", flat=True)),
+    })
+
+
+@superuser_required
+def staff_management(request):
+    staff_users = User.objects.filter(
+        is_staff=True).order_by('last_name', 'first_name')
+    return render(request, 'reservation_book/staff_management.html', {
+        'staff_users': staff_users,
+    })
+
+
+@superuser_required
+def add_staff(request):
+    """Add a new staff member or re-activate an existing one"""
+    if request.method == 'POST':
+
+        first_name = (request.POST.get('first_name') or "").strip()
+        last_name = (request.POST.get('last_name') or "").strip()
+        email = _normalize_email(request.POST.get('email'))
+
+        if not all([first_name, last_name, email]):
+            messages.error(request, "All fields are required.")
+            return redirect('staff_management')
+
+        temp_password = get_random_string(length=12)
+
+        existing_user = User.objects.filter(email=email).first()
+
+        if existing_user:
+            if existing_user.is_staff:
+                messages.error(request, "This user is already a staff member.")
+                return redirect('staff_management')
+            else:
+                # Re-activate former staff
+                existing_user.first_name = first_name
+                existing_user.last_name = last_name
+                existing_user.is_staff = True
+                existing_user.is_active = True
+                existing_user.set_password(temp_password)
+                existing_user.save()
+                messages.success(
+                    request, f"Staff member {first_name} {last_name} \
+                        re-activated and new password emailed.")
+        else:
+            # Create new staff
+            User.objects.create_user(
+                username=email,
+                email=email,
+                first_name=first_name,
+                last_name=last_name,
+                password=temp_password,
+                is_staff=True,
+                is_active=True
+            )
+            messages.success(
+                request, f"Staff member {first_name} \
+                    {last_name} added and password emailed.")
+
+        # Send welcome email
+        login_url = request.build_absolute_uri(reverse('account_login'))
+        subject = "Gambino's Restaurant - Staff Account Access"
+        message = f"""
+            Hello {first_name},
+
+            Your staff account for Gambino's Restaurant & Bar has been
+            created (or re-activated).
+
+            Please log in using the details below and change
+            your password immediately:
+
+            Login URL: {login_url}
+            Username: {email}
+            Temporary Password: {temp_password}
+
+            For security, please change your password after logging in.
+
+            Thank you,
+            Management
+        """
+
+        try:
+            send_mail(
+                subject=subject,
+                message=message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[email],
+                fail_silently=False,
+            )
+        except Exception as e:
+            messages.warning(
+                request, f"Staff added but email failed: {str(e)}")
+            logger.error(f"Email failed for {email}: {str(e)}")
+
+        return redirect('staff_management')
+
+    return redirect('staff_management')
+
+
+@superuser_required
+def remove_staff(request, user_id):
+    """Completely remove a staff member from the database"""
+    user = get_object_or_404(User, id=user_id)
+
+    if user.is_superuser:
+        messages.error(request, "Cannot remove a superuser.")
+    elif user == request.user:
+        messages.error(request, "You cannot remove yourself.")
+    else:
+        full_name = user.get_full_name() or user.email
+        user.delete()
+        messages.success(
+            request, f"Staff member {full_name} completely removed.")
+
+    return redirect('staff_management')
+
+
+@staff_or_superuser_required
+def staff_dashboard(request):
+    """
+    Staff landing page. Every card is read from the single
+    ReservationStats row, which the lifecycle hooks keep current; past
+    active bookings are swept to no-show on the first staff login of the
+    day (see signals), not on every dashboard load.
+    """
+    stats = ReservationStats.get_solo()
+
+    context = {
+        "stats": stats,
+        "total_reservations": stats.total_reservations,
+        # Active bookings; past ones leave this state at the daily sweep
+        "upcoming_reservations_count": stats.active_reservations,
+        "phone_reservations_count": stats.phone_reservations,
+        "registered_customers_count": stats.customers_count,
+        # ✅ Mentor requirement: cancellations are deleted,
+        # so count comes from stats table
+        "cancelled_reservations_count": stats.cancelled_count,
+        "no_show_count": stats.no_show_count,
+    }
+
+    return render(
+        request,
+        "reservation_book/staff_dashboard.html",
+        context,
+    )
+
+
+CUSTOMER_OVERVIEW_PAGE_SIZE = 50
+
+
+# ?sort= key -> columns; ?dir=desc flips them. "id" breaks ties so pages
+# are stable.
+CUSTOMER_OVERVIEW_SORTS = {
+    "name": ("last_name", "first_name"),
+    "email": ("email",),
+    "total": ("total_reservations",),
+    "active": ("active_reservations",),
+    "active_tables": ("active_tables_booked",),
+    "cancelled": ("cancelled_reservations",),
+    "no_shows": ("no_show_reservations",),
+    "tables": ("total_tables_booked",),
+    "barred": ("barred",),
+}
+
+
+@staff_or_superuser_required
+def user_reservations_overview(request):
+    """
+    Staff view: overview list of customers
+    and their reservation/counter stats.
+
+    IMPORTANT:
+    - Cancelled reservations are hard-deleted, so "cancelled" must come from
+    Customer.cancellations_count
+      (or CancellationEvent), NOT from TableReservation rows.
+    - No-shows are tracked on Customer.no_show_count and also optionally
+    in NoShowEvent.
+    - Reservation/table counts are read from CustomerStats (one-to-one
+      join, no aggregate over reservations). Server-side search (?q=),
+      sort (?sort=&dir=) and pagination (?page=).
+    """
+    q = _normalize_query(request.GET.get("q") or "")
+    sort = request.GET.get("sort") or "name"
+    if sort not in CUSTOMER_OVERVIEW_SORTS:
+        sort = "name"
+    descending = request.GET.get("dir") == "desc"
+
+    # NOTE: customers without a stats row (never booked) still appear
+    customers = (
+        Customer.objects
+        .annotate(
+            total_reservations_db=Coalesce(F("stats__reservations"), 0),
+            active_reservations=Coalesce(
+                F("stats__active_reservations"), 0),
+            total_tables_booked=Coalesce(F("stats__tables_booked"), 0),
+            active_tables_booked=Coalesce(
+                F("stats__active_tables_booked"), 0),
+            cancelled_reservations=Coalesce(
+                F("cancellations_count"), Value(0)),
+            no_show_reservations=Coalesce(F("no_show_count"), Value(0)),
+            # Total "history" count = existing rows + deleted cancellations
+            total_reservations=ExpressionWrapper(
+                Coalesce(F("stats__reservations"), 0)
+                + Coalesce(F("cancellations_count"), Value(0)),
+                output_field=IntegerField(),
+            ),
+        )
+    )
+
+    if q:
+        match = (
+            Q(first_name__icontains=q)
+            | Q(last_name__icontains=q)
+            | Q(email__icontains=q)
+            | Q(phone__icontains=q)
+            | Q(mobile__icontains=q)
+        )
+        if looks_like_phone_query(q):
+            match |= _phone_filter(q)
+        terms = q.split()
+        if len(terms) == 2:
+            match |= Q(first_name__icontains=terms[0],
+                       last_name__icontains=terms[1])
+        customers = customers.filter(match)
+
+    prefix = "-" if descending else ""
+    customers = customers.order_by(
+        *[prefix + col for col in CUSTOMER_OVERVIEW_SORTS[sort]],
+        prefix + "id",
+    )
+
+    page = Paginator(customers, CUSTOMER_OVERVIEW_PAGE_SIZE).get_page(
+        request.GET.get("page"))
+
+    def query(**params):
+        base = {"q": q, "sort": sort, "dir": "desc" if descending else ""}
+        base.update(params)
+        return urlencode({k: v for k, v in base.items() if v})
+
+    # Clicking the current column flips direction; others start ascending
+    # for text and descending for counts
+    sort_links = {}
+    for key in CUSTOMER_OVERVIEW_SORTS:
+        if key == sort:
+            next_dir = "" if descending else "desc"
+        else:
+            next_dir = "" if key in ("name", "email") else "desc"
+        sort_links[key] = query(sort=key, dir=next_dir, page="")
+
+    return render(
+        request,
+        "reservation_book/user_reservations_overview.html",
+        {
+            "customers": page.object_list,
+            "page_obj": page,
+            "q": q,
+            "sort": sort,
+            "descending": descending,
+            "sort_links": sort_links,
+            "sort_arrow": "▼" if descending else "▲",
+            "prev_query": (
+                query(page=page.previous_page_number())
+                if page.has_previous() else ""
+            ),
+            "next_query": (
+                query(page=page.next_page_number())
+                if page.has_next() else ""
+            ),
+        },
+    )
+
+
+@staff_or_superuser_required
+def user_reservation_history(request, customer_id):
+    """
+    Staff view: reservation history for a given customer as one
+    newest-first timeline of:
+      - Remaining TableReservation rows (active/completed/no_show)
+      - CancellationEvent rows (because cancellations are deleted)
+      - NoShowEvent rows (analytics)
+    Keyset-paginated with ?after= / ?before= cursors (see
+    services/history.py); per-type totals come from aggregates.
+    """
+    history_customer = get_object_or_404(Customer, id=customer_id)
+
+    after = history.parse_key(decode_cursor(request.GET.get("after"), 4))
+    before = None
+    if after is None:
+        before = history.parse_key(
+            decode_cursor(request.GET.get("before"), 4))
+    page = history.customer_timeline(
+        history_customer.pk, after=after, before=before)
+
+    next_query = prev_query = ""
+    if page.entries and page.has_next:
+        next_query = urlencode({"after": encode_cursor(
+            *history.entry_key(page.entries[-1]))})
+    if page.entries and page.has_prev:
+        prev_query = urlencode({"before": encode_cursor(
+            *history.entry_key(page.entries[0]))})
+
+    return render(
+        request,
+        "reservation_book/user_reservation_history.html",
+        {
+            "history_customer": history_customer,
+            "entries": page.entries,
+            "counts": history.timeline_counts(history_customer.pk),
+            "next_query": next_query,
+            "prev_query": prev_query,
+        },
+    )